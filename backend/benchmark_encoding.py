@@ -0,0 +1,80 @@
+"""
+Compare encode time and output size of each encoding profile on the bundled templates.
+
+Renders the template + Peter overlay (the heaviest encode in the pipeline) once per
+template and profile, and prints a table of wall time, output size and bitrate.
+
+Usage:
+    python benchmark_encoding.py
+    python benchmark_encoding.py --profiles fast balanced --templates templates/template1.mp4
+"""
+import argparse
+import asyncio
+import glob
+import os
+import tempfile
+import time
+
+from config import settings
+from video_compiler import overlay_image_on_video, probe_duration, ffmpeg_available
+
+
+async def benchmark(template_paths, profiles, image_path, keep_dir=None):
+    results = []
+    output_dir = keep_dir or tempfile.mkdtemp(prefix="encode_bench_")
+    os.makedirs(output_dir, exist_ok=True)
+    for template_path in template_paths:
+        duration = await probe_duration(template_path) or 0.0
+        for profile in profiles:
+            template_name = os.path.splitext(os.path.basename(template_path))[0]
+            output_path = os.path.join(output_dir, f"{template_name}_{profile}.mp4")
+            start = time.perf_counter()
+            await overlay_image_on_video(template_path, image_path, output_path, encoding_profile=profile)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(output_path)
+            results.append({
+                "template": os.path.basename(template_path),
+                "profile": profile,
+                "seconds": elapsed,
+                "speed": duration / elapsed if elapsed else 0.0,
+                "size_mb": size / (1024 * 1024),
+                "kbps": size * 8 / 1000 / duration if duration else 0.0,
+            })
+            if keep_dir is None:
+                os.remove(output_path)
+    if keep_dir is None:
+        os.rmdir(output_dir)
+    return results
+
+
+def print_table(results):
+    header = f"{'template':<16} {'profile':<10} {'time (s)':>9} {'speed':>7} {'size (MB)':>10} {'kbit/s':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['template']:<16} {r['profile']:<10} {r['seconds']:>9.2f} {r['speed']:>6.2f}x {r['size_mb']:>10.2f} {r['kbps']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark encoding profiles on the video templates")
+    parser.add_argument("--templates", nargs="*", help="Template files (default: every .mp4 in TEMPLATES_DIR)")
+    parser.add_argument("--profiles", nargs="*", default=list(settings.ENCODING_PROFILES), help="Profiles to compare")
+    parser.add_argument("--image", default=os.path.join(settings.ASSETS_DIR, "peter_griffin.png"), help="Overlay image")
+    parser.add_argument("--keep", metavar="DIR", help="Keep the rendered files in DIR")
+    args = parser.parse_args()
+
+    template_paths = args.templates or sorted(glob.glob(os.path.join(settings.TEMPLATES_DIR, "*.mp4")))
+    if not template_paths:
+        parser.error(f"No templates found in {settings.TEMPLATES_DIR}")
+    unknown = [p for p in args.profiles if p not in settings.ENCODING_PROFILES]
+    if unknown:
+        parser.error(f"Unknown profiles: {', '.join(unknown)}")
+    if not asyncio.run(ffmpeg_available()):
+        parser.error("ffmpeg is not available")
+
+    print(f"🏁 Benchmarking {len(args.profiles)} profiles on {len(template_paths)} templates")
+    print_table(asyncio.run(benchmark(template_paths, args.profiles, args.image, args.keep)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import CACHE_REQUESTS
+
+# Memoized file digests keyed by (path, size, mtime) so large templates are hashed once
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Return the SHA-256 hex digest of a file's content.
+    Results are memoized on (path, size, mtime) so unchanged files are only read once.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        if memo_key in _digest_memo:
+            return _digest_memo[memo_key]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def content_key(*parts: Any) -> str:
+    """
+    Build a stable cache key from arbitrary JSON-serializable parts.
+    Unlike Python's built-in hash(), the result is identical across processes and restarts.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheStats:
+    """Hit/miss counters for a cache tier, mirrored to cache_requests_total when named"""
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self.name:
+            CACHE_REQUESTS.inc(cache=self.name, result="hit" if hit else "miss")
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache bounded by entry count"""
+
+    def __init__(self, max_entries: int, name: Optional[str] = None):
+        self.max_entries = max_entries
+        self.stats = CacheStats(name)
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                value = self._entries[key]
+            else:
+                value = None
+        self.stats.record(value is not None)
+        return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    Content-addressed file cache with an idle TTL and a total size limit.
+
+    Each entry is one file named after its key. Reads refresh the file's mtime,
+    so expiry and eviction are both least-recently-used. Writes go through a
+    temporary file and an atomic rename so readers never see partial entries.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl_seconds: int, suffix: str = "", name: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.suffix = suffix
+        self.stats = CacheStats(name)
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
+
+    def get_path(self, key: str) -> Optional[str]:
+        """Return the path of a live entry (refreshing its recency), or None on a miss"""
+        path = self.path_for(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.stats.record(False)
+            return None
+        if self.ttl_seconds and time.time() - stat.st_mtime > self.ttl_seconds:
+            self._remove(path)
+            self.stats.record(False)
+            return None
+        os.utime(path)
+        self.stats.record(True)
+        return path
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_bytes(self, key: str, data: bytes) -> str:
+        temp_path = f"{self.path_for(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        return self.put_file(key, temp_path)
+
+    def put_file(self, key: str, source_path: str) -> str:
+        """Move an already-written file into the cache under key"""
+        path = self.path_for(key)
+        os.replace(source_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Drop expired entries, then the least recently used ones until under max_bytes.
+        The keep path (an entry just written) is never removed.
+        """
+        with self._lock:
+            entries = []
+            kept_bytes = 0
+            now = time.time()
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    # Temporary files (".tmp", ".tmp.mp4", ...) are writes still in progress
+                    if not entry.is_file() or ".tmp" in entry.name:
+                        continue
+                    stat = entry.stat()
+                    if entry.path == keep:
+                        kept_bytes = stat.st_size
+                        continue
+                    if self.ttl_seconds and now - stat.st_mtime > self.ttl_seconds:
+                        self._remove(entry.path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = kept_bytes + sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                self._remove(path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def size_bytes(self) -> int:
+        with os.scandir(self.cache_dir) as it:
+            return sum(entry.stat().st_size for entry in it if entry.is_file())
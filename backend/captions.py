@@ -0,0 +1,182 @@
+import re
+import textwrap
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Defaults of the render pipeline: ~8 words per cue, wrapped at 40 characters per line
+WORDS_PER_CUE = 8
+SECONDS_PER_CUE = 3.0
+LINE_WIDTH = 40
+
+# libass lays SRT subtitles out on a 384x288 canvas; ASS output uses the same one so
+# the style below renders like the force_style the SRT is burned with (see video_compiler)
+ASS_PLAY_RES = (384, 288)
+ASS_STYLE = "Default,Arial,24,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,2,0,2,0,0,200,1"
+
+_SRT_TIMESTAMP = re.compile(r"(\d{2}):(\d{2}):(\d{2})[.,](\d{3})")
+_SRT_TIMING = re.compile(rf"^{_SRT_TIMESTAMP.pattern} --> {_SRT_TIMESTAMP.pattern}")
+
+
+class Cues:
+    """
+    Subtitle cues as parallel arrays: start and end in integer milliseconds
+    (array-backed, 8 bytes each) and the cue text. Serialized in one pass.
+    """
+    __slots__ = ("starts", "ends", "texts")
+
+    def __init__(self, starts: Iterable[int] = (), ends: Iterable[int] = (), texts: Iterable[str] = ()):
+        self.starts = array("q", starts)
+        self.ends = array("q", ends)
+        self.texts = list(texts)
+        if not len(self.starts) == len(self.ends) == len(self.texts):
+            raise ValueError("starts, ends and texts must have the same length")
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __iter__(self) -> Iterator[Tuple[int, int, str]]:
+        return zip(self.starts, self.ends, self.texts)
+
+    def append(self, start_ms: int, end_ms: int, text: str):
+        self.starts.append(start_ms)
+        self.ends.append(end_ms)
+        self.texts.append(text)
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        """Cues as {"start", "end", "text"} dicts with times in seconds"""
+        return [{"start": start / 1000, "end": end / 1000, "text": text} for start, end, text in self]
+
+    def to_srt(self) -> str:
+        starts = format_timestamps(self.starts)
+        ends = format_timestamps(self.ends)
+        blocks = [
+            f"{index}\n{start} --> {end}\n{wrap_text(text)}"
+            for index, (start, end, text) in enumerate(zip(starts, ends, self.texts), 1)
+        ]
+        return "\n\n".join(blocks) + "\n" if blocks else ""
+
+    def to_ass(self, play_res: Tuple[int, int] = ASS_PLAY_RES) -> str:
+        starts = format_timestamps(self.starts, ass=True)
+        ends = format_timestamps(self.ends, ass=True)
+        header = (
+            "[Script Info]\nScriptType: v4.00+\n"
+            f"PlayResX: {play_res[0]}\nPlayResY: {play_res[1]}\nWrapStyle: 0\nScaledBorderAndShadow: yes\n\n"
+            "[V4+ Styles]\n"
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, "
+            "Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, "
+            "MarginL, MarginR, MarginV, Encoding\n"
+            f"Style: {ASS_STYLE}\n\n"
+            "[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        )
+        events = [
+            f"Dialogue: 0,{start},{end},Default,,0,0,0,,{_ass_text(text)}\n"
+            for start, end, text in zip(starts, ends, self.texts)
+        ]
+        return header + "".join(events)
+
+
+def format_timestamps(offsets_ms: Sequence[int], ass: bool = False) -> List[str]:
+    """
+    Format many millisecond offsets at once with integer arithmetic, so there is
+    no float truncation (2.9999s -> 00:00:02,999). SRT: HH:MM:SS,mmm; ASS: H:MM:SS.cc
+    """
+    parts = map(_clock, offsets_ms)
+    if ass:
+        return [f"{h}:{m:02}:{s:02}.{ms // 10:02}" for h, m, s, ms in parts]
+    return [f"{h:02}:{m:02}:{s:02},{ms:03}" for h, m, s, ms in parts]
+
+
+def _clock(offset_ms: int) -> Tuple[int, int, int, int]:
+    hours, rest = divmod(offset_ms, 3_600_000)
+    minutes, rest = divmod(rest, 60_000)
+    seconds, millis = divmod(rest, 1000)
+    return hours, minutes, seconds, millis
+
+
+def format_srt_time(seconds: float) -> str:
+    return format_timestamps([round(seconds * 1000)])[0]
+
+
+def wrap_text(text: str, width: int = LINE_WIDTH) -> str:
+    """Wrap each line of a cue to at most width characters (long words are kept whole)"""
+    return "\n".join(
+        wrapped for line in text.splitlines() for wrapped in textwrap.wrap(line, width=width, break_long_words=False)
+    )
+
+
+def _ass_text(text: str) -> str:
+    # Braces would start override blocks; line breaks are \N inside a Dialogue line
+    return wrap_text(text).replace("{", "\\{").replace("}", "\\}").replace("\n", "\\N")
+
+
+def chunk_words(text: str, words_per_cue: int = WORDS_PER_CUE) -> List[str]:
+    words = text.split()
+    return [" ".join(words[i:i + words_per_cue]) for i in range(0, len(words), words_per_cue)]
+
+
+def cues_from_segments(
+    segments: Sequence[str],
+    duration: Optional[float] = None,
+    words_per_cue: int = WORDS_PER_CUE,
+    seconds_per_cue: float = SECONDS_PER_CUE,
+    weight_by_length: bool = True,
+) -> Cues:
+    """
+    Cues for narration segments (the script's audio_script texts); a cue never spans
+    two segments. With the narration duration, cue boundaries are the cumulative text
+    length scaled onto it (speech time tracks text length), computed in one pass;
+    without weight_by_length every cue gets an equal share. Without a duration every
+    cue lasts seconds_per_cue.
+    """
+    texts = [chunk for segment in segments for chunk in chunk_words(segment, words_per_cue)]
+    if not texts:
+        return Cues()
+    if duration:
+        weights = [len(text) for text in texts] if weight_by_length else [1] * len(texts)
+        total_weight = sum(weights)
+        total_ms = round(duration * 1000)
+        bounds = [total_ms * cumulative // total_weight for cumulative in accumulate(weights, initial=0)]
+    else:
+        step = round(seconds_per_cue * 1000)
+        bounds = range(0, step * (len(texts) + 1), step)
+    return Cues(bounds[:-1], bounds[1:], texts)
+
+
+def cues_from_timings(timings: Sequence[Tuple[float, str]], start: float = 0.0) -> Cues:
+    """Back-to-back cues from (duration in seconds, text) pairs"""
+    bounds = [round(offset * 1000) for offset in accumulate((duration for duration, _ in timings), initial=start)]
+    return Cues(bounds[:-1], bounds[1:], (text for _, text in timings))
+
+
+def parse_srt(content: str) -> Cues:
+    """
+    Read SRT text into cues, tolerating '.' as the millisecond separator and
+    dropping blocks without a valid timing line or text. Numbering is ignored.
+    """
+    cues = Cues()
+    for block in re.split(r"\n{2,}", content.lstrip("\ufeff").replace("\r\n", "\n").strip()):
+        lines = block.strip().splitlines()
+        if len(lines) < 2:
+            continue
+        match = _SRT_TIMING.match(lines[1].strip())
+        text = "\n".join(line for line in lines[2:] if line.strip())
+        if not match or not text:
+            continue
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.groups())
+        cues.append(
+            ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1,
+            ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2,
+            text,
+        )
+    return cues
+
+
+def write_srt(cues: Cues, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(cues.to_srt())
+
+
+def write_ass(cues: Cues, path: str, play_res: Tuple[int, int] = ASS_PLAY_RES):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(cues.to_ass(play_res))
@@ -0,0 +1,64 @@
+import logging
+from typing import Optional
+
+import httpx
+
+from config import settings
+from script import VideoScriptGenerator
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (HTTP/2 support for httpx is optional)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ClientRegistry:
+    """
+    Process-wide HTTP and SDK clients, created once in the app lifespan and reused
+    by every request so connections (and their TLS sessions) stay warm.
+    """
+
+    def __init__(self):
+        self.http: Optional[httpx.AsyncClient] = None
+        self._elevenlabs = None
+        self._script_generator: Optional[VideoScriptGenerator] = None
+
+    async def start(self):
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        timeout = httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+        http2 = settings.HTTP2_ENABLED and HTTP2_AVAILABLE
+        if settings.HTTP2_ENABLED and not HTTP2_AVAILABLE:
+            logger.warning("⚠️ HTTP/2 requested but the 'h2' package is not installed (pip install 'httpx[http2]') - using HTTP/1.1 keep-alive")
+        self.http = httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+        logger.info(f"🔌 Shared HTTP client ready (http2={http2}, max_connections={settings.HTTP_MAX_CONNECTIONS})")
+
+    async def close(self):
+        if self.http is not None:
+            await self.http.aclose()
+        self.http = None
+        self._elevenlabs = None
+
+    @property
+    def elevenlabs(self):
+        """AsyncElevenLabs client sharing the pooled HTTP connections"""
+        if self._elevenlabs is None:
+            from elevenlabs.client import AsyncElevenLabs
+            self._elevenlabs = AsyncElevenLabs(api_key=settings.TTS_API_KEY, httpx_client=self.http)
+        return self._elevenlabs
+
+    @property
+    def script_generator(self) -> VideoScriptGenerator:
+        """Configured Gemini script generator, built on first use"""
+        if self._script_generator is None:
+            self._script_generator = VideoScriptGenerator(api_key=settings.GEMINI_API_KEY)
+        return self._script_generator
+
+
+clients = ClientRegistry()
@@ -1,8 +1,37 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Named x264 encoding profiles. preset/crf trade encode time against size and quality,
+# tune=stillimage suits the mostly static template frames, gop is the keyframe interval.
+DEFAULT_ENCODING_PROFILES = {
+    "fast": {"preset": "veryfast", "crf": 26, "tune": "stillimage", "gop": 250, "pix_fmt": "yuv420p"},
+    "balanced": {"preset": "medium", "crf": 23, "tune": "stillimage", "gop": 120, "pix_fmt": "yuv420p"},
+    "archive": {"preset": "slow", "crf": 18, "tune": "animation", "gop": 60, "pix_fmt": "yuv420p"},
+}
+
+def _encoding_profiles() -> dict:
+    """Built-in profiles merged with the ENCODING_PROFILES (JSON) overrides"""
+    profiles = {name: dict(profile) for name, profile in DEFAULT_ENCODING_PROFILES.items()}
+    for name, overrides in json.loads(os.getenv("ENCODING_PROFILES", "{}")).items():
+        profiles[name] = {**profiles.get(name, {}), **overrides}
+    return profiles
+
+# Seconds each kind of job artifact in OUTPUT_DIR is kept (0 = until evicted by the quota)
+DEFAULT_ARTIFACT_RETENTION = {
+    "video": 7 * 24 * 3600,
+    "audio": 3 * 24 * 3600,
+    "subtitles": 3 * 24 * 3600,
+    "script": 7 * 24 * 3600,
+    "intermediate": 6 * 3600,
+}
+
+def _artifact_retention() -> dict:
+    """Built-in retention TTLs merged with the ARTIFACT_RETENTION_SECONDS (JSON) overrides"""
+    return {**DEFAULT_ARTIFACT_RETENTION, **json.loads(os.getenv("ARTIFACT_RETENTION_SECONDS", "{}"))}
+
 class Settings:
     # API Keys
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
@@ -23,13 +52,102 @@ class Settings:
     TEMPLATES_DIR: str = os.getenv("TEMPLATES_DIR", "./templates")
     ASSETS_DIR: str = os.getenv("ASSETS_DIR", "./assets")
     
+    # Templates: every video in TEMPLATES_DIR is a template, named after its file unless listed here (JSON name -> file)
+    TEMPLATE_NAMES: dict = json.loads(os.getenv(
+        "TEMPLATE_NAMES", '{"lecture": "template1.mp4", "classroom": "template2.mp4", "laboratory": "template3.mp4"}'
+    ))
+    TEMPLATE_RELOAD_INTERVAL_SECONDS: float = float(os.getenv("TEMPLATE_RELOAD_INTERVAL_SECONDS", "10"))
+    
+    # Uploads: templates are transcoded once into a mezzanine format that renders decode and seek cheaply
+    MAX_TEMPLATE_UPLOAD_BYTES: int = int(os.getenv("MAX_TEMPLATE_UPLOAD_BYTES", str(2 * 1024 ** 3)))  # 2GB
+    MAX_IMAGE_UPLOAD_BYTES: int = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", str(20 * 1024 ** 2)))  # 20MB
+    MEZZANINE_WIDTH: int = int(os.getenv("MEZZANINE_WIDTH", "1280"))
+    MEZZANINE_HEIGHT: int = int(os.getenv("MEZZANINE_HEIGHT", "720"))
+    MEZZANINE_FPS: int = int(os.getenv("MEZZANINE_FPS", "25"))
+    MEZZANINE_GOP_SECONDS: float = float(os.getenv("MEZZANINE_GOP_SECONDS", "1"))  # Keyframe spacing
+    MEZZANINE_CRF: int = int(os.getenv("MEZZANINE_CRF", "18"))  # Near-transparent, it is re-encoded by every render
+    OVERLAYS_DIR: str = os.getenv("OVERLAYS_DIR", os.path.join(ASSETS_DIR, "overlays"))  # Uploaded overlay images
+    OVERLAY_MAX_SIZE: int = int(os.getenv("OVERLAY_MAX_SIZE", "1024"))  # Longest side of a normalized overlay, in pixels
+    
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./videos.db")
+    JOB_STORE_BACKEND: str = os.getenv("JOB_STORE_BACKEND", "sqlite").lower()  # sqlite or memory
+    JOB_TTL_SECONDS: int = int(os.getenv("JOB_TTL_SECONDS", str(7 * 24 * 3600)))  # Finished jobs kept for a week
+    JOB_PRUNE_INTERVAL_SECONDS: int = int(os.getenv("JOB_PRUNE_INTERVAL_SECONDS", "3600"))
+    JOB_STALE_SECONDS: int = int(os.getenv("JOB_STALE_SECONDS", str(6 * 3600)))  # Unfinished jobs with no update for this long are failed
+    
+    # Output storage lifecycle
+    # ARTIFACT_RETENTION_SECONDS (JSON) overrides per-category TTLs, e.g. {"video": 86400}
+    ARTIFACT_RETENTION_SECONDS: dict = _artifact_retention()
+    OUTPUT_MAX_BYTES: int = int(os.getenv("OUTPUT_MAX_BYTES", str(20 * 1024 ** 3)))  # Job artifacts quota (0 = unlimited)
+    JANITOR_INTERVAL_SECONDS: int = int(os.getenv("JANITOR_INTERVAL_SECONDS", "900"))
+    
+    # Downloads
+    DOWNLOAD_SIGNING_KEY: str = os.getenv("DOWNLOAD_SIGNING_KEY", "")  # HMAC key for pre-signed stream URLs (unset = disabled)
+    SIGNED_URL_TTL_SECONDS: int = int(os.getenv("SIGNED_URL_TTL_SECONDS", "3600"))
     
     # Video Generation Settings
     MAX_VIDEO_DURATION: int = int(os.getenv("MAX_VIDEO_DURATION", "60"))
     DEFAULT_VOICE_ID: str = os.getenv("DEFAULT_VOICE_ID", "LjreBZhXeL6R2WLwGI3Z")  # Voice ID from audio.py
     
+    # Video Compilation
+    # "single_pass" renders overlay + subtitles + audio in one ffmpeg call,
+    # "multi_pass" keeps the legacy overlay -> merge -> burn chain
+    VIDEO_COMPILE_MODE: str = os.getenv("VIDEO_COMPILE_MODE", "single_pass").lower()
+    
+    # Render cache for pre-rendered template + Peter overlay bases (used by multi_pass, and
+    # by single_pass only when ffmpeg lacks libass and the base can be stream-copied)
+    RENDER_CACHE_ENABLED: bool = os.getenv("RENDER_CACHE_ENABLED", "True").lower() == "true"
+    RENDER_CACHE_DIR: str = os.getenv("RENDER_CACHE_DIR", os.path.join(OUTPUT_DIR, "render_cache"))
+    RENDER_CACHE_MAX_BYTES: int = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+    
+    # Script cache (in-memory LRU + on-disk tier) so repeat topics skip Gemini
+    SCRIPT_CACHE_ENABLED: bool = os.getenv("SCRIPT_CACHE_ENABLED", "True").lower() == "true"
+    SCRIPT_CACHE_DIR: str = os.getenv("SCRIPT_CACHE_DIR", os.path.join(OUTPUT_DIR, "script_cache"))
+    SCRIPT_CACHE_MEMORY_ENTRIES: int = int(os.getenv("SCRIPT_CACHE_MEMORY_ENTRIES", "256"))
+    SCRIPT_CACHE_MAX_BYTES: int = int(os.getenv("SCRIPT_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+    SCRIPT_CACHE_TTL_SECONDS: int = int(os.getenv("SCRIPT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    
+    # TTS audio cache (content-addressed, size-bounded LRU on disk)
+    TTS_CACHE_ENABLED: bool = os.getenv("TTS_CACHE_ENABLED", "True").lower() == "true"
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", os.path.join(OUTPUT_DIR, "tts_cache"))
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    TTS_CACHE_TTL_SECONDS: int = int(os.getenv("TTS_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    
+    # Shared HTTP client pool (ElevenLabs and other outbound APIs)
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "True").lower() == "true"
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "120"))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+    
+    # Job Scheduling
+    JOB_QUEUE_MAX_SIZE: int = int(os.getenv("JOB_QUEUE_MAX_SIZE", "100"))
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", str((os.cpu_count() or 1) * 2)))
+    MAX_CONCURRENT_RENDERS: int = int(os.getenv("MAX_CONCURRENT_RENDERS", str(os.cpu_count() or 1)))
+    MAX_CONCURRENT_SCRIPT_REQUESTS: int = int(os.getenv("MAX_CONCURRENT_SCRIPT_REQUESTS", "8"))
+    MAX_CONCURRENT_TTS_REQUESTS: int = int(os.getenv("MAX_CONCURRENT_TTS_REQUESTS", "4"))
+    JOB_RETRY_AFTER_SECONDS: int = int(os.getenv("JOB_RETRY_AFTER_SECONDS", "30"))
+    MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "100"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", str((os.cpu_count() or 1) * 2)))  # Videos per batch in flight at once
+    
+    # Progress Events
+    SSE_KEEPALIVE_SECONDS: float = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))  # Idle interval before a keep-alive / store re-check
+    
+    # Video Encoding
+    # ENCODING_PROFILES (JSON) adds or overrides profiles, e.g. {"fast": {"crf": 28}}
+    ENCODING_PROFILES: dict = _encoding_profiles()
+    DEFAULT_ENCODING_PROFILE: str = os.getenv("DEFAULT_ENCODING_PROFILE", "fast")
+    TEMPLATE_ENCODING_PROFILES: dict = json.loads(os.getenv("TEMPLATE_ENCODING_PROFILES", "{}"))  # Template name -> profile
+    ENCODING_THREADS: int = int(os.getenv("ENCODING_THREADS", "0"))  # x264 threads per render (0 = auto)
+    # "auto" picks libx264, then libopenh264, then mpeg4; hardware encoders (h264_nvenc, h264_qsv,
+    # h264_videotoolbox) are only used when named here
+    VIDEO_ENCODER: str = os.getenv("VIDEO_ENCODER", "auto")
+    
+    # Stage Timing
+    STAGE_TIMING_WINDOW: int = int(os.getenv("STAGE_TIMING_WINDOW", "500"))  # Recent samples per stage used for percentiles
+    
     # Ensure directories exist
     def __post_init__(self):
         os.makedirs(self.UPLOAD_DIR, exist_ok=True)
@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import time
+from email.utils import formatdate
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from cache import file_digest
+from config import settings
+
+# Finished videos never change under their ID, so clients and CDNs may cache them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+STREAM_CHUNK_SIZE = 256 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the file"""
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into an inclusive (start, end).
+    Returns None when the header should be ignored (malformed or multi-range),
+    in which case the whole file is served.
+    """
+    match = _RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def strong_etag(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, per RFC 9110)"""
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+async def _iter_file(path: str, start: int, end: int, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def ranged_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    inline: bool = False,
+    digest: Optional[str] = None,
+) -> Response:
+    """
+    Serve a file with HTTP Range support (206 Partial Content), a strong ETag from
+    the content hash, conditional GET (304) and immutable caching headers.
+    Pass digest when the content hash is already known to skip hashing the file.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = strong_etag(digest or await asyncio.to_thread(file_digest, path))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+    if filename:
+        headers["Content-Disposition"] = f'{"inline" if inline else "attachment"}; filename="{filename}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A stale If-Range validator means the client's partial copy is outdated: send the whole file
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        start, end = 0, size - 1
+        status_code = 200
+    headers["Content-Length"] = str(end - start + 1)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(_iter_file(path, start, end), status_code=status_code, headers=headers, media_type=media_type)
+
+
+def _signature(video_id: str, expires: int) -> str:
+    message = f"{video_id}:{expires}".encode("utf-8")
+    return hmac.new(settings.DOWNLOAD_SIGNING_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def sign_video_url(video_id: str, ttl_seconds: Optional[int] = None) -> Tuple[str, int]:
+    """Pre-signed streaming URL for a finished video and its expiry (epoch seconds)"""
+    expires = int(time.time()) + (ttl_seconds or settings.SIGNED_URL_TTL_SECONDS)
+    return f"/api/video/{video_id}/stream?expires={expires}&signature={_signature(video_id, expires)}", expires
+
+
+def verify_video_signature(video_id: str, expires: int, signature: str) -> bool:
+    if not settings.DOWNLOAD_SIGNING_KEY or expires < time.time():
+        return False
+    return hmac.compare_digest(_signature(video_id, expires), signature)
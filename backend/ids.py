@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+
+from cache import content_key
+
+# Crockford base32, as used by ULIDs (no I, L, O, U)
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+_last_ulid = (0, 0)
+_ulid_lock = threading.Lock()
+
+
+def ulid() -> str:
+    """
+    26-character ULID: 48-bit millisecond timestamp + 80 random bits.
+    IDs sort by creation time, and IDs created in the same millisecond stay
+    ordered by incrementing the random part.
+    """
+    global _last_ulid
+    with _ulid_lock:
+        timestamp = int(time.time() * 1000)
+        last_timestamp, last_random = _last_ulid
+        if timestamp <= last_timestamp:
+            timestamp, randomness = last_timestamp, (last_random + 1) & ((1 << 80) - 1)
+        else:
+            randomness = int.from_bytes(os.urandom(10), "big")
+        _last_ulid = (timestamp, randomness)
+
+    value = (timestamp << 80) | randomness
+    chars = []
+    for _ in range(26):
+        chars.append(_ULID_ALPHABET[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_job_id(prefix: str) -> str:
+    """Collision-free, time-ordered ID for a new job, e.g. video_01J9Z3..."""
+    return f"{prefix}_{ulid().lower()}"
+
+
+def stable_id(prefix: str, *parts) -> str:
+    """
+    Deterministic ID for content-derived artifacts: the same inputs give the same ID
+    across processes and restarts (unlike Python's salted hash()).
+    """
+    return f"{prefix}_{content_key(*parts)[:16]}"
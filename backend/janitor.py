@@ -0,0 +1,220 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from job_store import JobStore, TERMINAL_STATUSES, job_store, worker_alive
+
+logger = logging.getLogger(__name__)
+
+# Per-job artifacts in OUTPUT_DIR, classified by file name. Order matters:
+# intermediates are matched before the final .mp3/.mp4 they are named after.
+ARTIFACT_PATTERNS: List[Tuple[str, "re.Pattern[str]"]] = [
+    ("intermediate", re.compile(r"^(?P<job>.+?)(?:_temp\.mp4|_with_audio\.mp4|_seg\d+\.\w+)$")),
+    ("intermediate", re.compile(r"^(?P<job>.+?)(?:\.\w+)?\.(?:part|tmp|concat\.txt)$")),
+    ("script", re.compile(r"^(?P<job>.+)_script\.(?:txt|json)$")),
+    ("subtitles", re.compile(r"^(?P<job>.+)\.srt$")),
+    ("audio", re.compile(r"^(?P<job>.+)\.mp3$")),
+    ("video", re.compile(r"^(?P<job>.+)\.mp4$")),
+]
+
+# Subdirectories of OUTPUT_DIR bounded by their own LRU eviction (RENDER_CACHE_MAX_BYTES,
+# SCRIPT_CACHE_MAX_BYTES, TTS_CACHE_MAX_BYTES); reported, never touched here
+CACHE_DIRS = {
+    "render_cache": settings.RENDER_CACHE_DIR,
+    "script_cache": settings.SCRIPT_CACHE_DIR,
+    "tts_cache": settings.TTS_CACHE_DIR,
+}
+
+
+def classify(filename: str) -> Tuple[str, Optional[str]]:
+    """Return (category, job id) for a file in OUTPUT_DIR, or ("other", None)"""
+    for category, pattern in ARTIFACT_PATTERNS:
+        match = pattern.match(filename)
+        if match:
+            return category, match.group("job")
+    return "other", None
+
+
+def _dir_size(path: str) -> Tuple[int, int]:
+    """(files, bytes) under a directory, recursively"""
+    files = size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                pass
+    return files, size
+
+
+class OutputJanitor:
+    """
+    Keeps OUTPUT_DIR bounded:
+    - artifacts older than their category's retention TTL are deleted
+    - when job artifacts exceed max_bytes, completed videos (with their audio,
+      subtitles and script) are evicted least recently downloaded first
+    - intermediates left behind by failed or crashed jobs are removed
+    Files belonging to jobs that are still running are never touched.
+    """
+
+    def __init__(self, output_dir: str, store: JobStore, retention: Dict[str, int], max_bytes: int):
+        self.output_dir = output_dir
+        self.store = store
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        artifacts = []
+        with os.scandir(self.output_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                category, job_id = classify(entry.name)
+                artifacts.append({
+                    "path": entry.path,
+                    "category": category,
+                    "job_id": job_id,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                })
+        return artifacts
+
+    def _job_active(self, job_id: Optional[str], records: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+        """
+        A job is active while its record has not reached a terminal status and the worker
+        running it is alive. Unfinished jobs of a crashed or restarted worker are not.
+        """
+        if job_id is None:
+            return False
+        if job_id not in records:
+            records[job_id] = self.store.get(job_id)
+        record = records[job_id]
+        return record is not None and record["status"] not in TERMINAL_STATUSES and worker_alive(record.get("worker"))
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def remove_intermediates(self, job_id: str) -> int:
+        """Delete one job's intermediate files (used on both the success and failure paths)"""
+        removed = 0
+        for artifact in self._scan():
+            if artifact["job_id"] == job_id and artifact["category"] == "intermediate":
+                removed += self._remove(artifact["path"])
+        return removed
+
+    def sweep(self, startup: bool = False) -> Dict[str, int]:
+        """
+        One cleanup pass. On startup every intermediate of a job that is not running
+        (finished, or owned by a worker that is gone) is an orphan of a crash or failure,
+        regardless of age.
+        """
+        with self._lock:
+            now = time.time()
+            records: Dict[str, Optional[Dict[str, Any]]] = {}
+            removed = {"orphaned": 0, "expired": 0, "evicted": 0, "bytes": 0}
+            remaining = []
+
+            for artifact in self._scan():
+                ttl = self.retention.get(artifact["category"], 0)
+                expired = bool(ttl) and now - artifact["mtime"] > ttl
+                # Intermediates past their TTL belong to a job that crashed without reaching a terminal status
+                in_use = self._job_active(artifact["job_id"], records) and not (artifact["category"] == "intermediate" and expired)
+                if artifact["category"] == "other" or in_use:
+                    remaining.append(artifact)
+                    continue
+                if startup and artifact["category"] == "intermediate" and not expired:
+                    reason = "orphaned"
+                elif expired:
+                    reason = "expired"
+                else:
+                    remaining.append(artifact)
+                    continue
+                if self._remove(artifact["path"]):
+                    removed[reason] += 1
+                    removed["bytes"] += artifact["size"]
+                    if artifact["category"] == "video":
+                        self._mark_removed(artifact["job_id"], records)
+
+            evicted, evicted_bytes = self._enforce_quota(remaining, records)
+            removed["evicted"] = evicted
+            removed["bytes"] += evicted_bytes
+        return removed
+
+    def _enforce_quota(self, artifacts: List[Dict[str, Any]], records: Dict[str, Optional[Dict[str, Any]]]) -> Tuple[int, int]:
+        """Evict completed videos and their sibling artifacts, least recently used first, until under max_bytes"""
+        total = sum(a["size"] for a in artifacts if a["category"] != "other")
+        if not self.max_bytes or total <= self.max_bytes:
+            return 0, 0
+
+        by_job: Dict[str, List[Dict[str, Any]]] = {}
+        for artifact in artifacts:
+            if artifact["job_id"] is not None:
+                by_job.setdefault(artifact["job_id"], []).append(artifact)
+
+        candidates = []
+        for job_id, files in by_job.items():
+            video = next((a for a in files if a["category"] == "video"), None)
+            if video is None or self._job_active(job_id, records):
+                continue
+            last_used = max(video["mtime"], (records.get(job_id) or {}).get("last_accessed_at") or 0)
+            candidates.append((last_used, job_id, files))
+
+        evicted = evicted_bytes = 0
+        for _, job_id, files in sorted(candidates, key=lambda c: c[0]):
+            if total <= self.max_bytes:
+                break
+            for artifact in files:
+                if self._remove(artifact["path"]):
+                    total -= artifact["size"]
+                    evicted_bytes += artifact["size"]
+            self._mark_removed(job_id, records)
+            evicted += 1
+            logger.info(f"🧹 Evicted video {job_id} to stay under the {self.max_bytes / (1024 ** 3):.1f}GB output quota")
+        return evicted, evicted_bytes
+
+    def _mark_removed(self, job_id: str, records: Dict[str, Optional[Dict[str, Any]]]):
+        """Record on the job that its video was deleted, so downloads report it as gone"""
+        if records.get(job_id) is not None:
+            self.store.save(job_id, message="Video expired and was removed from the server", removed_at=time.time())
+
+    def usage(self) -> Dict[str, Any]:
+        """Disk usage of OUTPUT_DIR by artifact category, plus the self-bounded caches"""
+        categories: Dict[str, Dict[str, int]] = {
+            name: {"files": 0, "bytes": 0} for name in ("video", "audio", "subtitles", "script", "intermediate", "other")
+        }
+        for artifact in self._scan():
+            categories[artifact["category"]]["files"] += 1
+            categories[artifact["category"]]["bytes"] += artifact["size"]
+        artifact_bytes = sum(c["bytes"] for name, c in categories.items() if name != "other")
+
+        for name, path in CACHE_DIRS.items():
+            files, size = _dir_size(path) if os.path.isdir(path) else (0, 0)
+            categories[name] = {"files": files, "bytes": size}
+
+        return {
+            "output_dir": os.path.abspath(self.output_dir),
+            "total_bytes": sum(c["bytes"] for c in categories.values()),
+            "artifact_bytes": artifact_bytes,
+            "quota_bytes": self.max_bytes,
+            "quota_used": round(artifact_bytes / self.max_bytes, 3) if self.max_bytes else None,
+            "retention_seconds": self.retention,
+            "categories": categories,
+        }
+
+
+janitor = OutputJanitor(settings.OUTPUT_DIR, job_store, settings.ARTIFACT_RETENTION_SECONDS, settings.OUTPUT_MAX_BYTES)
@@ -0,0 +1,51 @@
+import asyncio
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Set
+
+
+def format_sse(data: Dict[str, Any], event: str = "status") -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class JobEventBroker:
+    """
+    In-process pub/sub of job status updates, keyed by video id.
+
+    Every subscriber gets its own bounded queue. A slow consumer only loses its
+    oldest pending updates, never blocks the publisher, and only the latest
+    status matters to a progress display anyway.
+    """
+
+    def __init__(self, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def publish(self, video_id: str, event: Dict[str, Any]):
+        for queue in list(self._subscribers.get(video_id, ())):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    @contextmanager
+    def subscribe(self, video_id: str) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        self._subscribers.setdefault(video_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(video_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[video_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+job_events = JobEventBroker()
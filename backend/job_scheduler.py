@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from metrics import STAGE_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class SchedulerUnavailableError(Exception):
+    """Raised when a job is submitted while the scheduler is not running"""
+
+
+class JobScheduler:
+    """
+    Bounded priority queue feeding a fixed pool of async workers.
+
+    Each pipeline stage (script generation, TTS, rendering) has its own concurrency
+    limit so a burst of jobs cannot start more ffmpeg processes or external API
+    calls than the box and the API quotas can handle.
+    Lower priority values run first; jobs with equal priority run in submission order.
+    """
+
+    def __init__(self, max_queue_size: int, workers: int, stage_limits: Dict[str, int]):
+        self.max_queue_size = max_queue_size
+        self.workers = workers
+        self.stage_limits = dict(stage_limits)
+        self._stage_semaphores: Dict[str, asyncio.Semaphore] = {
+            name: asyncio.Semaphore(limit) for name, limit in self.stage_limits.items()
+        }
+        self._stage_active: Dict[str, int] = {name: 0 for name in self.stage_limits}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._waiting: Dict[str, Tuple[int, int]] = {}
+        self._counter = itertools.count()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running_jobs = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    @property
+    def running_jobs(self) -> int:
+        return self._running_jobs
+
+    def stage_active(self, name: str) -> int:
+        return self._stage_active.get(name, 0)
+
+    async def start(self):
+        """Start the worker pool (called from the app lifespan)"""
+        if self.is_running:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue_size)
+        self._worker_tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"🧵 Job scheduler started: {self.workers} workers, queue size {self.max_queue_size}, stage limits {self.stage_limits}")
+
+    async def stop(self):
+        """Cancel the worker pool; queued jobs are dropped"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._waiting.clear()
+        logger.info("🧵 Job scheduler stopped")
+
+    def submit(self, job_id: str, func: Callable[..., Awaitable[Any]], *args, priority: int = 0) -> int:
+        """
+        Queue a job and return its 1-based queue position.
+        Raises QueueFullError when the queue is at capacity.
+        """
+        if not isinstance(priority, int):
+            # Orders are compared against every queued job: one non-int would break the whole heap
+            raise TypeError(f"Job priority must be an int, got {priority!r}")
+        if not self.is_running:
+            raise SchedulerUnavailableError("Job scheduler is not running")
+        order = (priority, next(self._counter))
+        try:
+            self._queue.put_nowait((order, job_id, func, args))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self.max_queue_size} jobs waiting)")
+        self._waiting[job_id] = order
+        return self.queue_position(job_id)
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, or None if it is not waiting"""
+        order = self._waiting.get(job_id)
+        if order is None:
+            return None
+        return 1 + sum(1 for other in self._waiting.values() if other < order)
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """Hold one slot of a stage's concurrency limit for the duration of the block"""
+        semaphore = self._stage_semaphores[name]
+        wait_start = time.perf_counter()
+        async with semaphore:
+            STAGE_WAIT.observe(time.perf_counter() - wait_start, stage=name)
+            self._stage_active[name] += 1
+            try:
+                yield
+            finally:
+                self._stage_active[name] -= 1
+
+    async def _worker(self, worker_index: int):
+        while True:
+            _, job_id, func, args = await self._queue.get()
+            self._waiting.pop(job_id, None)
+            self._running_jobs += 1
+            try:
+                await func(*args)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Worker {worker_index} job {job_id} raised: {str(e)}")
+            finally:
+                self._running_jobs -= 1
+                self._queue.task_done()
+
+
+scheduler = JobScheduler(
+    max_queue_size=settings.JOB_QUEUE_MAX_SIZE,
+    workers=settings.JOB_WORKERS,
+    stage_limits={
+        "script": settings.MAX_CONCURRENT_SCRIPT_REQUESTS,
+        "tts": settings.MAX_CONCURRENT_TTS_REQUESTS,
+        "render": settings.MAX_CONCURRENT_RENDERS,
+    },
+)
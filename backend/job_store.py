@@ -0,0 +1,356 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from ids import ulid
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which a job never changes again and may be pruned
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Fields stored in their own columns; anything else goes into the JSON data column
+JOB_COLUMNS = ("status", "progress", "message", "error", "created_at", "updated_at")
+
+# Extra fields that must be unique across records when set
+UNIQUE_FIELDS = ("idempotency_key",)
+
+
+# Identifies this process across restarts: a container restarts with the same pid but a new boot id
+_BOOT_ID = ulid()
+
+
+class DuplicateKeyError(Exception):
+    """Raised when a save would give two records the same value of a UNIQUE_FIELDS field"""
+
+
+def current_worker() -> str:
+    """Owner tag saved on the records this process runs (pid:boot id)"""
+    return f"{os.getpid()}:{_BOOT_ID}"
+
+
+def worker_alive(worker: Optional[str]) -> bool:
+    """Whether the process that owns a record is still running (the store is shared per host)"""
+    if not worker:
+        return False
+    if worker == current_worker():
+        return True
+    pid, _, _ = worker.partition(":")
+    if not pid.isdigit() or int(pid) == os.getpid():
+        # Our pid with another boot id is a previous run of this process
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """
+    Storage interface for video job status records.
+
+    A record is a flat dict with the JOB_COLUMNS fields plus any extra keys
+    saved alongside them. Statuses are stored as their string values.
+    """
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save(self, video_id: str, touch: bool = True, **fields) -> Dict[str, Any]:
+        """
+        Create or update a job, merging fields into the existing record. created_at is kept from the first save.
+        With touch=False an existing record keeps its updated_at (bookkeeping that is not job progress).
+        """
+        raise NotImplementedError
+
+    def list(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """List jobs, newest first, optionally filtered by status"""
+        raise NotImplementedError
+
+    def find(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Return the record whose extra field equals value, if any"""
+        raise NotImplementedError
+
+    def delete(self, video_id: str) -> bool:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def prune(self, ttl_seconds: int) -> int:
+        """Delete finished jobs not updated within ttl_seconds. Returns the number removed."""
+        raise NotImplementedError
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that have not reached a terminal status"""
+        raise NotImplementedError
+
+    def fail_interrupted(self, message: str, stale_seconds: Optional[int] = None) -> List[str]:
+        """
+        Mark unfinished jobs failed when the worker that owned them is gone (a restart or crash),
+        or with stale_seconds, when they have not been updated for that long. Their Idempotency-Key
+        is released so a retry starts a new job. Returns the ids of the failed jobs.
+        """
+        cutoff = (datetime.now() - timedelta(seconds=stale_seconds)).isoformat() if stale_seconds else None
+        failed = []
+        for record in self.unfinished():
+            stale = cutoff is not None and record["updated_at"] < cutoff
+            if worker_alive(record.get("worker")) and not stale:
+                continue
+            self.save(record["video_id"], status="failed", message=message, error=message, idempotency_key=None)
+            failed.append(record["video_id"])
+        return failed
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _normalize(fields: Dict[str, Any], touch: bool = True) -> Dict[str, Any]:
+        normalized = dict(fields)
+        status = normalized.get("status")
+        if status is not None and hasattr(status, "value"):
+            normalized["status"] = status.value
+        now = datetime.now().isoformat()
+        if touch:
+            normalized.setdefault("updated_at", now)
+        normalized.setdefault("created_at", now)
+        return normalized
+
+
+class MemoryJobStore(JobStore):
+    """Process-local store, used for tests and single-worker development"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._jobs.get(video_id)
+            return dict(record) if record else None
+
+    def save(self, video_id: str, touch: bool = True, **fields) -> Dict[str, Any]:
+        fields = self._normalize(fields, touch)
+        with self._lock:
+            for field in UNIQUE_FIELDS:
+                value = fields.get(field)
+                if value is not None and any(r.get(field) == value for key, r in self._jobs.items() if key != video_id):
+                    raise DuplicateKeyError(f"{field} already in use")
+            record = self._jobs.get(video_id)
+            if record:
+                fields["created_at"] = record["created_at"]
+                record.update(fields)
+            else:
+                record = {"video_id": video_id, "error": None, "updated_at": fields["created_at"], **fields}
+                self._jobs[video_id] = record
+            return dict(record)
+
+    def list(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = [dict(r) for r in self._jobs.values() if status is None or r.get("status") == status]
+        records.sort(key=lambda r: r["created_at"], reverse=True)
+        return records[:limit] if limit else records
+
+    def find(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for record in self._jobs.values():
+                if record.get(field) == value:
+                    return dict(record)
+        return None
+
+    def delete(self, video_id: str) -> bool:
+        with self._lock:
+            return self._jobs.pop(video_id, None) is not None
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def prune(self, ttl_seconds: int) -> int:
+        cutoff = (datetime.now() - timedelta(seconds=ttl_seconds)).isoformat()
+        with self._lock:
+            expired = [
+                video_id for video_id, r in self._jobs.items()
+                if r.get("status") in TERMINAL_STATUSES and r["updated_at"] < cutoff
+            ]
+            for video_id in expired:
+                del self._jobs[video_id]
+        return len(expired)
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self._jobs.values() if r.get("status") not in TERMINAL_STATUSES]
+
+
+class SQLiteJobStore(JobStore):
+    """
+    SQLite-backed store shared by every uvicorn worker on the host.
+    WAL mode lets status polls read while a worker writes.
+    """
+
+    def __init__(self, path: str, table: str = "jobs"):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid job store table name: {table}")
+        self.path = path
+        self.table = table
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                video_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                data TEXT NOT NULL DEFAULT '{{}}'
+            );
+            CREATE INDEX IF NOT EXISTS idx_{table}_status ON {table} (status, updated_at);
+            CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table} (created_at);
+        """)
+        for field in UNIQUE_FIELDS:
+            self._conn.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_{field} ON {table} ({self._json_field(field)}) "
+                f"WHERE {self._json_field(field)} IS NOT NULL"
+            )
+
+    @staticmethod
+    def _json_field(field: str) -> str:
+        if not field.isidentifier():
+            raise ValueError(f"Invalid field name: {field}")
+        return f"json_extract(data, '$.{field}')"
+
+    @staticmethod
+    def _row_to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = json.loads(row["data"])
+        record.update({key: row[key] for key in row.keys() if key != "data"})
+        return record
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT * FROM {self.table} WHERE video_id = ?", (video_id,)).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def save(self, video_id: str, touch: bool = True, **fields) -> Dict[str, Any]:
+        fields = self._normalize(fields, touch)
+        columns = {key: fields.pop(key) for key in JOB_COLUMNS if key in fields}
+        data = json.dumps(fields, default=str)
+        with self._lock:
+            try:
+                self._upsert(video_id, columns, data)
+            except sqlite3.IntegrityError as e:
+                if "UNIQUE" in str(e):
+                    raise DuplicateKeyError(str(e))
+                raise
+            row = self._conn.execute(f"SELECT * FROM {self.table} WHERE video_id = ?", (video_id,)).fetchone()
+        return self._row_to_record(row)
+
+    def _upsert(self, video_id: str, columns: Dict[str, Any], data: str):
+        self._conn.execute(
+            f"""
+            INSERT INTO {self.table} (video_id, status, progress, message, error, created_at, updated_at, data)
+            VALUES (:video_id, COALESCE(:status, 'pending'), COALESCE(:progress, 0), :message, :error, :created_at, COALESCE(:updated_at, :created_at), :data)
+            ON CONFLICT (video_id) DO UPDATE SET
+                status = COALESCE(:status, {self.table}.status),
+                progress = COALESCE(:progress, {self.table}.progress),
+                message = COALESCE(:message, {self.table}.message),
+                error = CASE WHEN :has_error THEN :error ELSE {self.table}.error END,
+                updated_at = COALESCE(:updated_at, {self.table}.updated_at),
+                data = json_patch({self.table}.data, :data)
+            """,
+            {
+                "video_id": video_id,
+                "status": columns.get("status"),
+                "progress": columns.get("progress"),
+                "message": columns.get("message"),
+                "error": columns.get("error"),
+                "has_error": "error" in columns,
+                "created_at": columns["created_at"],
+                "updated_at": columns.get("updated_at"),
+                "data": data,
+            },
+        )
+
+    def list(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT * FROM {self.table}"
+        params: List[Any] = []
+        if status is not None:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def find(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT * FROM {self.table} WHERE {self._json_field(field)} = ? LIMIT 1", (value,)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def delete(self, video_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE video_id = ?", (video_id,))
+        return cursor.rowcount > 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def prune(self, ttl_seconds: int) -> int:
+        cutoff = (datetime.now() - timedelta(seconds=ttl_seconds)).isoformat()
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE status IN ({placeholders}) AND updated_at < ?",
+                (*TERMINAL_STATUSES, cutoff),
+            )
+        return cursor.rowcount
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM {self.table} WHERE status NOT IN ({placeholders})", TERMINAL_STATUSES
+            ).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_store(backend: str, database_url: str, table: str = "jobs") -> JobStore:
+    """Build the configured job store backend ("sqlite" or "memory"). table names the SQLite table."""
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "sqlite":
+        if not database_url.startswith("sqlite:///"):
+            raise ValueError(f"Unsupported DATABASE_URL for sqlite job store: {database_url}")
+        return SQLiteJobStore(database_url[len("sqlite:///"):], table=table)
+    raise ValueError(f"Unknown JOB_STORE_BACKEND: {backend}")
+
+
+job_store = create_job_store(settings.JOB_STORE_BACKEND, settings.DATABASE_URL)
+
+# Batch records (aggregate of many video jobs) live alongside the jobs in their own table
+batch_store = create_job_store(settings.JOB_STORE_BACKEND, settings.DATABASE_URL, table="batches")
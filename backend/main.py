@@ -1,42 +1,181 @@
-from fastapi import FastAPI, HTTPException, Body, File, UploadFile, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Body, File, UploadFile, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
-from typing import Optional, List, Dict
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any
 import uvicorn
-import httpx
 import os
-import subprocess
 import json
 import traceback
 import asyncio
 import logging
+import time
 from datetime import datetime
 from pathlib import Path
 
 from models import (
     VideoRequest, VideoResponse, ScriptResponse, StatusResponse,
-    VideoStatus, TTSRequest, TTSResponse, SubtitleResponse, ErrorResponse
+    VideoStatus, TTSRequest, TTSResponse, SubtitleResponse, ErrorResponse,
+    BatchVideoRequest, BatchVideoItem, BatchResponse
 )
 from config import settings
-from script import VideoScriptGenerator
-from video_compiler import overlay_image_on_video, merge_audio_with_video, burn_subtitles_on_video, transcript_txt_to_srt
+from script import script_cache
+from clients import clients
+from tts import TTSCache, tts_cache, synthesize_segments, synthesize_with_http
+from video_compiler import (
+    overlay_image_on_video, merge_audio_with_video, burn_subtitles_on_video,
+    compile_video_single_pass, compile_video_from_base, probe_duration,
+    ProgressCallback, resolve_encoding_profile
+)
+from toolchain import toolchain
+from captions import cues_from_segments, write_srt
+from template_registry import template_registry, TemplateInfo
+from uploads import (
+    UploadError, receive_upload, discard_upload, remove_stale_uploads, check_template_upload, ingest_template,
+    check_overlay_upload, ingest_overlay, overlay_path, list_overlays
+)
+from render_cache import render_cache
+from job_scheduler import scheduler, QueueFullError, SchedulerUnavailableError
+from job_store import job_store, batch_store, JobStore, DuplicateKeyError, TERMINAL_STATUSES, current_worker
+from ids import new_job_id, stable_id
+from janitor import janitor
+from cache import content_key, file_digest
+from downloads import ranged_file_response, sign_video_url, verify_video_signature
+from job_events import job_events, format_sse
+from stage_timing import JobTimer, stage_stats, planned_stages, estimated_remaining
+from metrics import (
+    registry as metrics_registry, CONTENT_TYPE_LATEST, HTTP_REQUESTS, HTTP_DURATION, JOBS_FINISHED,
+    QUEUE_DEPTH, RUNNING_JOBS, STAGE_ACTIVE, JOB_STORE_SIZE
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PETER_IMAGE = os.path.join(settings.ASSETS_DIR, "peter_griffin.png")
+# Render cache warm-ups queue behind every video request (VideoRequest.priority is 0-9)
+WARMUP_PRIORITY = 10
+
+def fail_interrupted_jobs(message: str, stale_seconds: Optional[int] = None):
+    """Fail jobs and batches whose worker died (or that went stale), so polls and SSE reach a final state"""
+    for store, kind in ((job_store, "jobs"), (batch_store, "batches")):
+        failed = store.fail_interrupted(message, stale_seconds)
+        if failed:
+            logger.warning(f"⚠️ Marked {len(failed)} unfinished {kind} failed: {message}")
+
+async def prune_job_store_periodically():
+    """Drop finished jobs older than JOB_TTL_SECONDS so the store does not grow without bound"""
+    while True:
+        try:
+            await asyncio.to_thread(fail_interrupted_jobs, "Interrupted: worker stopped or job timed out", settings.JOB_STALE_SECONDS)
+            removed = await asyncio.to_thread(job_store.prune, settings.JOB_TTL_SECONDS)
+            removed_batches = await asyncio.to_thread(batch_store.prune, settings.JOB_TTL_SECONDS)
+            if removed or removed_batches:
+                logger.info(f"🧹 Pruned {removed} finished jobs and {removed_batches} batches from the job store")
+        except Exception as e:
+            logger.error(f"❌ Job store pruning failed: {str(e)}")
+        await asyncio.sleep(settings.JOB_PRUNE_INTERVAL_SECONDS)
+
+async def clean_outputs_periodically():
+    """Apply artifact retention and the output quota; the first pass also removes intermediates orphaned by crashes"""
+    startup = True
+    while True:
+        try:
+            removed = await asyncio.to_thread(janitor.sweep, startup)
+            if removed["orphaned"] or removed["expired"] or removed["evicted"]:
+                logger.info(
+                    f"🧹 Output cleanup: {removed['orphaned']} orphaned, {removed['expired']} expired, "
+                    f"{removed['evicted']} videos evicted ({removed['bytes'] / (1024 * 1024):.1f}MB freed)"
+                )
+        except Exception as e:
+            logger.error(f"❌ Output cleanup failed: {str(e)}")
+        startup = False
+        await asyncio.sleep(settings.JANITOR_INTERVAL_SECONDS)
+
+def render_cache_entries(template_names: List[str]):
+    """(template path, image, encoding profile) render cache entries for the usable templates among template_names"""
+    templates = [template_registry.get(name) for name in template_names]
+    return [
+        (template.path, PETER_IMAGE, resolve_encoding_profile(template_name=template.name))
+        for template in templates if template is not None and template.available
+    ]
+
+def render_cache_in_use() -> bool:
+    """
+    Whether jobs render from cached template + Peter bases. With libass, single_pass burns
+    subtitles in the same encode as the overlay, while a cached base would still need a
+    second lossy encode to burn them; so the cache only serves multi_pass and the
+    no-libass path, where the base is stream-copied under a soft subtitle track.
+    """
+    return (
+        settings.RENDER_CACHE_ENABLED
+        and toolchain.current.ffmpeg_available
+        and (settings.VIDEO_COMPILE_MODE != "single_pass" or not toolchain.current.burn_subtitles)
+    )
+
+async def warm_changed_templates(template_names: List[str]):
+    """Pre-render bases for templates added or replaced while running"""
+    if render_cache_in_use():
+        await render_cache.warm(render_cache_entries(template_names))
+
+def schedule_template_warmup(template_name: str):
+    """Queue a render cache warm-up behind waiting videos instead of rendering on the request path"""
+    if not render_cache_in_use():
+        return
+    try:
+        scheduler.submit(new_job_id("warmup"), warm_changed_templates, [template_name], priority=WARMUP_PRIORITY)
+    except (QueueFullError, SchedulerUnavailableError) as e:
+        # The first job using the template renders its base instead
+        logger.warning(f"⚠️ Render cache warmup for {template_name} not queued: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    # Probe ffmpeg's version, encoders and filters once; jobs read the cached result
+    await toolchain.detect()
+    # Jobs left unfinished by a previous run can never complete: fail them before serving
+    await asyncio.to_thread(fail_interrupted_jobs, "Interrupted by restart")
+    # Index TEMPLATES_DIR once; afterwards it is only rescanned when files change
+    await asyncio.to_thread(template_registry.scan)
+    stale_uploads = remove_stale_uploads()
+    if stale_uploads:
+        logger.info(f"🧹 Removed {stale_uploads} interrupted uploads")
+    warmup_task = None
+    if render_cache_in_use():
+        # Warm the template + Peter render cache off the request path
+        entries = render_cache_entries([template.name for template in template_registry.list()])
+        logger.info(f"🔥 Warming render cache for {len(entries)} templates")
+        warmup_task = asyncio.create_task(render_cache.warm(entries))
+    template_watch_task = asyncio.create_task(
+        template_registry.watch(settings.TEMPLATE_RELOAD_INTERVAL_SECONDS, on_change=warm_changed_templates)
+    )
+    await clients.start()
+    await scheduler.start()
+    prune_task = asyncio.create_task(prune_job_store_periodically())
+    janitor_task = asyncio.create_task(clean_outputs_periodically())
+    yield
+    prune_task.cancel()
+    janitor_task.cancel()
+    template_watch_task.cancel()
+    for task in list(batch_tasks):
+        task.cancel()
+    await scheduler.stop()
+    await clients.close()
+    job_store.close()
+    batch_store.close()
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+
 app = FastAPI(
     title="Educational Video Generator API",
     description="Backend for creating educational videos with Peter Griffin voice",
     version="0.1.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
-# Global video status store
-video_status_store: Dict[str, dict] = {}
-
 # Enable CORS for frontend communication
 app.add_middleware(
     CORSMiddleware,
@@ -46,6 +185,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Scrape-time gauges read straight from the scheduler and job store
+QUEUE_DEPTH.set_function(lambda: scheduler.queue_depth)
+RUNNING_JOBS.set_function(lambda: scheduler.running_jobs)
+for stage_name in ("script", "tts", "render"):
+    STAGE_ACTIVE.set_function(lambda stage_name=stage_name: scheduler.stage_active(stage_name), stage=stage_name)
+JOB_STORE_SIZE.set_function(job_store.count)
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    """Count and time every request, labelled by route template to keep cardinality bounded"""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_DURATION.observe(time.perf_counter() - start, method=request.method, route=route_path)
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=str(status_code))
+
 # Create necessary directories
 os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
@@ -54,29 +215,80 @@ os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 app.mount("/static/outputs", StaticFiles(directory=settings.OUTPUT_DIR), name="outputs")
 app.mount("/static/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
-def update_video_status(video_id: str, status: VideoStatus, progress: int, message: str, error: str = None):
-    """Update video status in the global store with logging"""
+def status_event(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Subset of a job record pushed to progress subscribers"""
+    return {
+        "video_id": record["video_id"],
+        "status": record["status"],
+        "progress": record["progress"],
+        "message": record["message"],
+        "error": record.get("error"),
+        "current_step": record.get("current_step"),
+        "estimated_remaining": estimated_remaining(record),
+        "updated_at": record["updated_at"]
+    }
+
+# Fields of a status event that change with the clock or with bookkeeping saves alone
+VOLATILE_EVENT_FIELDS = ("estimated_remaining", "updated_at")
+
+def same_status(event: Dict[str, Any], other: Dict[str, Any]) -> bool:
+    """Whether two status events show the same state (ignoring the ETA countdown and timestamps)"""
+    return all(event.get(key) == other.get(key) for key in event.keys() | other.keys() if key not in VOLATILE_EVENT_FIELDS)
+
+def update_video_status(video_id: str, status: VideoStatus, progress: int, message: str, error: str = None, **fields):
+    """Update video status (plus any extra record fields) in the job store with logging, and push it to event subscribers"""
     logger.info(f"🎬 Video {video_id}: {status.value} - {progress}% - {message}")
     if error:
         logger.error(f"❌ Video {video_id} Error: {error}")
     
-    video_status_store[video_id] = {
-        "status": status,
-        "progress": progress,
-        "message": message,
-        "error": error,
-        "updated_at": datetime.now().isoformat(),
-        "created_at": video_status_store.get(video_id, {}).get("created_at", datetime.now().isoformat())
-    }
+    now = datetime.now().isoformat()
+    if status == VideoStatus.COMPLETED:
+        fields.setdefault("completed_at", now)
+    record = job_store.save(
+        video_id,
+        status=status,
+        progress=progress,
+        message=message,
+        error=error,
+        updated_at=now,
+        worker=current_worker(),
+        **fields
+    )
+    job_events.publish(video_id, status_event(record))
+    if status in (VideoStatus.COMPLETED, VideoStatus.FAILED):
+        JOBS_FINISHED.inc(status=status.value)
+
+def render_progress_reporter(video_id: str, timer: JobTimer, target_seconds: Optional[float], start_progress: int, end_progress: int) -> Optional[ProgressCallback]:
+    """
+    Map ffmpeg's encoded output time onto a slice of the job's progress range,
+    refreshing the ETA from the render's own rate.
+    Status is only updated when the whole-number progress actually moves.
+    """
+    if not target_seconds:
+        return None
+    last_progress = start_progress
+    
+    def report(encoded_seconds: float):
+        nonlocal last_progress
+        fraction = min(encoded_seconds / target_seconds, 1.0)
+        progress = start_progress + int(fraction * (end_progress - start_progress))
+        if progress > last_progress:
+            last_progress = progress
+            update_video_status(
+                video_id, VideoStatus.COMPILING_VIDEO, progress, f"Rendering video ({int(fraction * 100)}%)...",
+                **timer.progress(fraction)
+            )
+    
+    return report
 
-async def generate_video_background(video_id: str, prompt: str, template: str = "lecture"):
+async def generate_video_background(video_id: str, prompt: str, template: str = "lecture", encoding_profile: Optional[str] = None, overlay_image: Optional[str] = None):
     """Background task to generate the complete video"""
+    timer = JobTimer(video_id, stages=planned_stages(render_cache_in_use(), settings.VIDEO_COMPILE_MODE))
     try:
         logger.info(f"🎬 Starting video generation for {video_id} with prompt: '{prompt}'")
         
         # Step 1: Generate Script
         update_video_status(video_id, VideoStatus.GENERATING_SCRIPT, 10, "Generating Peter Griffin script...")
-        await asyncio.sleep(1)  # Simulate processing time
         
         # Check if Gemini API key is configured
         if not settings.GEMINI_API_KEY:
@@ -85,18 +297,21 @@ async def generate_video_background(video_id: str, prompt: str, template: str =
             raise Exception(error_msg)
         
         logger.info(f"📝 Using Gemini API for script generation")
-        generator = VideoScriptGenerator()
+        generator = clients.script_generator
         
         try:
-            script_data = generator.generate_script(prompt, duration=settings.MAX_VIDEO_DURATION)
+            async with scheduler.stage("script"):
+                with timer.stage("script"):
+                    script_data = await generator.generate_script_async(prompt, duration=settings.MAX_VIDEO_DURATION)
             
-            # Extract script text
+            # Extract script text, keeping the narration segments for per-segment TTS
             if isinstance(script_data, dict) and 'audio_script' in script_data:
-                script_text = " ".join([segment.get('text', '') for segment in script_data.get('audio_script', [])])
+                script_segments = [segment.get('text', '') for segment in script_data.get('audio_script', [])]
             elif isinstance(script_data, dict) and 'key_sections' in script_data:
-                script_text = " ".join([section.get('narration_text', '') for section in script_data.get('key_sections', [])])
+                script_segments = [section.get('narration_text', '') for section in script_data.get('key_sections', [])]
             else:
-                script_text = str(script_data)
+                script_segments = [str(script_data)]
+            script_text = " ".join(script_segments)
                 
         except Exception as e:
             error_msg = f"Script generation failed: {str(e)}"
@@ -112,40 +327,37 @@ async def generate_video_background(video_id: str, prompt: str, template: str =
         update_video_status(video_id, VideoStatus.GENERATING_VOICE, 30, "Creating Peter Griffin voice audio...")
         
         # Step 2: Generate Audio (TTS)
-        await asyncio.sleep(2)  # Simulate TTS processing
-        
         audio_path = os.path.join(settings.OUTPUT_DIR, f"{video_id}.mp3")
         
         # Use the existing audio.py module for TTS generation
         logger.info(f"🎤 Using ElevenLabs API for TTS generation via audio module")
         try:
-            from elevenlabs.client import ElevenLabs
-            
-            # Use the same configuration as audio.py
-            client = ElevenLabs(api_key=settings.TTS_API_KEY)
+            # Shared AsyncElevenLabs client (pooled connections, created once per process)
+            client = clients.elevenlabs
             
             # Use the voice ID from audio.py (LjreBZhXeL6R2WLwGI3Z)
             voice_id = "LjreBZhXeL6R2WLwGI3Z"
             
             logger.info(f"🎤 Generating TTS with voice_id: {voice_id}")
             
-            # Generate audio using the same settings as audio.py
-            audio = client.text_to_speech.convert(
-                voice_id=voice_id,
-                text=script_text[:2000],  # Limit text length
-                output_format="mp3_44100_128",        # High quality MP3
-                model_id="eleven_multilingual_v2",   # Recommended model
-                voice_settings={
-                    "stability": 0.6,
-                    "similarity_boost": 0.8
-                }
-            )
-            
-            # Save the audio file
-            with open(audio_path, "wb") as f:
-                f.write(b"".join(audio))
+            # Generate audio using the same settings as audio.py. Segments are synthesized
+            # concurrently and cached individually, then joined losslessly into one track.
+            # Each ElevenLabs call takes its own tts stage slot (see tts._synthesize_cached)
+            with timer.stage("tts"):
+                cached_segments = await synthesize_segments(
+                    client,
+                    script_segments,
+                    output_path=audio_path,
+                    voice_id=voice_id,
+                    model_id="eleven_multilingual_v2",   # Recommended model
+                    voice_settings={
+                        "stability": 0.6,
+                        "similarity_boost": 0.8
+                    },
+                    output_format="mp3_44100_128"        # High quality MP3
+                )
             
-            logger.info(f"🎤 TTS audio generated and saved to {audio_path}")
+            logger.info(f"🎤 TTS audio generated ({cached_segments}/{len(script_segments)} segments from cache) and saved to {audio_path}")
                     
         except Exception as e:
             error_msg = f"TTS generation failed: {str(e)}"
@@ -155,40 +367,26 @@ async def generate_video_background(video_id: str, prompt: str, template: str =
         update_video_status(video_id, VideoStatus.COMPILING_VIDEO, 60, "Generating subtitles...")
         
         # Step 3: Generate Subtitles
-        await asyncio.sleep(1)
+        # Cues are built from the narration segments in memory, timed against the narration
+        # length (read from the MP3 headers), and written once
+        audio_duration = await probe_duration(audio_path)
         subtitles_path = os.path.join(settings.OUTPUT_DIR, f"{video_id}.srt")
-        transcript_txt_to_srt(script_path, subtitles_path, duration_per_line=3.0)
-        logger.info(f"📝 Subtitles generated and saved to {subtitles_path}")
+        with timer.stage("subtitles"):
+            cues = cues_from_segments(script_segments, duration=audio_duration)
+            write_srt(cues, subtitles_path)
+        logger.info(f"📝 {len(cues)} subtitle cues generated and saved to {subtitles_path}")
         
         update_video_status(video_id, VideoStatus.COMPILING_VIDEO, 80, "Compiling final video with subtitles...")
         
         # Step 4: Video Compilation
-        await asyncio.sleep(2)
-        
-        # Map template names to actual files
-        template_map = {
-            "lecture": "template1.mp4",  # Use real template instead of mock
-            "classroom": "template2.mp4",
-            "laboratory": "template3.mp4"
-        }
-        
-        # Get template file path
-        template_file = template_map.get(template, "template1.mp4")  # Default to template1
-        template_video = os.path.join(settings.TEMPLATES_DIR, template_file)
-        peter_image = os.path.join(settings.ASSETS_DIR, "peter_griffin.png")
-        
-        # Validate template exists and is not empty
-        if not os.path.exists(template_video):
-            error_msg = f"Template '{template_file}' not found at {template_video}"
-            logger.error(f"❌ {error_msg}")
-            raise Exception(error_msg)
-        
-        # Check template file size (should be > 1MB for real video)
-        template_size = os.path.getsize(template_video)
-        if template_size < 1024 * 1024:  # Less than 1MB
-            error_msg = f"Template '{template_file}' appears to be invalid (size: {template_size} bytes)"
+        # Template path, dimensions and length come from the registry, validated when the file was indexed
+        template_info = template_registry.get(template)
+        if template_info is None or not template_info.available:
+            error_msg = f"Template '{template}' not available" + (f": {template_info.error}" if template_info else "")
             logger.error(f"❌ {error_msg}")
             raise Exception(error_msg)
+        template_video = template_info.path
+        peter_image = overlay_image or PETER_IMAGE
         
         # Validate Peter Griffin image exists
         if not os.path.exists(peter_image):
@@ -196,7 +394,8 @@ async def generate_video_background(video_id: str, prompt: str, template: str =
             logger.error(f"❌ {error_msg}")
             raise Exception(error_msg)
         
-        logger.info(f"📹 Using template: {template_file} (size: {template_size / (1024*1024):.1f}MB)")
+        encoding_profile = resolve_encoding_profile(encoding_profile, template)
+        logger.info(f"📹 Using template: {template_info.file} ({template_info.width}x{template_info.height}, {template_info.duration}s), encoding profile: {encoding_profile}")
         logger.info(f"🖼️ Using Peter Griffin image: {os.path.basename(peter_image)}")
         
         # Final video paths
@@ -207,33 +406,82 @@ async def generate_video_background(video_id: str, prompt: str, template: str =
         try:
             logger.info(f"📹 Starting video compilation process")
             
-            # Check if we have ffmpeg available for real video processing
-            try:
-                subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)
-                ffmpeg_available = True
+            # ffmpeg availability was detected at startup (see toolchain)
+            ffmpeg_available = toolchain.current.ffmpeg_available
+            if ffmpeg_available:
                 logger.info(f"🎬 FFmpeg detected - using real video compilation")
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                ffmpeg_available = False
+            else:
                 logger.warning(f"⚠️ FFmpeg not available - using mock compilation")
             
-            if ffmpeg_available:
-                # Real video compilation with ffmpeg
-                logger.info(f"📹 Step 1: Overlaying Peter Griffin image on template")
-                overlay_image_on_video(template_video, peter_image, temp_video_path)
+            # Output length follows the narration: templates are trimmed to it at the input
+            # (so only the needed seconds are decoded/encoded) and it is the progress target
+            if audio_duration:
+                logger.info(f"🎤 Narration is {audio_duration:.1f}s - rendering only that much of the template")
+            
+            # Limit concurrent ffmpeg renders
+            async with scheduler.stage("render"):
+                if render_cache_in_use():
+                    # Template + Peter overlay comes from the render cache, only audio and subtitles are rendered per job
+                    logger.info(f"📹 Step 1: Fetching cached template + Peter Griffin base render")
+                    with timer.stage("overlay"):
+                        base_video_path = await render_cache.get_or_render(template_video, peter_image, encoding_profile=encoding_profile, dimensions=template_info.dimensions)
                 
-                logger.info(f"🎤 Step 2: Merging audio with video")
-                merge_audio_with_video(temp_video_path, audio_path, with_audio_path)
+                    logger.info(f"📝 Step 2: Burning subtitles and muxing audio onto cached base")
+                    with timer.stage("render"):
+                        await compile_video_from_base(
+                            base_video_path, audio_path, subtitles_path, final_video_path,
+                            on_progress=render_progress_reporter(video_id, timer, audio_duration, 80, 99),
+                            encoding_profile=encoding_profile,
+                            duration=audio_duration
+                        )
                 
-                logger.info(f"📝 Step 3: Burning subtitles on video")
-                burn_subtitles_on_video(with_audio_path, subtitles_path, final_video_path, audio_path)
+                    logger.info(f"✅ Real video compilation completed successfully")
+                elif ffmpeg_available and settings.VIDEO_COMPILE_MODE == "single_pass":
+                    # Overlay, subtitles and audio rendered in one ffmpeg invocation
+                    logger.info(f"📹 Rendering final video in a single pass (overlay + subtitles + audio)")
+                    with timer.stage("render"):
+                        await compile_video_single_pass(
+                            template_video, peter_image, audio_path, subtitles_path, final_video_path,
+                            on_progress=render_progress_reporter(video_id, timer, audio_duration, 80, 99),
+                            encoding_profile=encoding_profile,
+                            duration=audio_duration,
+                            dimensions=template_info.dimensions
+                        )
                 
-                logger.info(f"✅ Real video compilation completed successfully")
-            else:
-                # Mock implementation when ffmpeg is not available
-                logger.info(f"📹 Creating mock final video at {final_video_path}")
-                with open(final_video_path, "wb") as f:
-                    f.write(b"mock_final_video_with_peter_griffin_explanation")
-                logger.info(f"✅ Mock video compilation completed")
+                    logger.info(f"✅ Real video compilation completed successfully")
+                elif ffmpeg_available:
+                    # Real video compilation with ffmpeg
+                    logger.info(f"📹 Step 1: Overlaying Peter Griffin image on template")
+                    with timer.stage("overlay"):
+                        overlay_duration = audio_duration or template_info.duration
+                        await overlay_image_on_video(
+                            template_video, peter_image, temp_video_path,
+                            on_progress=render_progress_reporter(video_id, timer, overlay_duration, 80, 90),
+                            encoding_profile=encoding_profile,
+                            duration=audio_duration,
+                            dimensions=template_info.dimensions
+                        )
+                
+                    logger.info(f"🎤 Step 2: Merging audio with video")
+                    with timer.stage("merge"):
+                        await merge_audio_with_video(temp_video_path, audio_path, with_audio_path)
+                
+                    logger.info(f"📝 Step 3: Burning subtitles on video")
+                    with timer.stage("burn"):
+                        await burn_subtitles_on_video(
+                            with_audio_path, subtitles_path, final_video_path, audio_path,
+                            on_progress=render_progress_reporter(video_id, timer, audio_duration, 90, 99),
+                            encoding_profile=encoding_profile,
+                            validate=False
+                        )
+                
+                    logger.info(f"✅ Real video compilation completed successfully")
+                else:
+                    # Mock implementation when ffmpeg is not available
+                    logger.info(f"📹 Creating mock final video at {final_video_path}")
+                    with open(final_video_path, "wb") as f:
+                        f.write(b"mock_final_video_with_peter_griffin_explanation")
+                    logger.info(f"✅ Mock video compilation completed")
             
         except Exception as e:
             logger.error(f"❌ Video compilation failed: {str(e)}")
@@ -241,19 +489,148 @@ async def generate_video_background(video_id: str, prompt: str, template: str =
             raise e  # Re-raise the exception instead of creating fallback
         
         # Clean up temporary files
-        for temp_file in [temp_video_path, with_audio_path]:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        janitor.remove_intermediates(video_id)
         
-        update_video_status(video_id, VideoStatus.COMPLETED, 100, "Video generation completed successfully!")
-        logger.info(f"🎉 Video generation completed for {video_id}")
+        total_seconds = timer.finish()
+        # Hash once here so downloads can send a strong ETag without reading the file
+        video_sha256 = await asyncio.to_thread(file_digest, final_video_path)
+        update_video_status(video_id, VideoStatus.COMPLETED, 100, "Video generation completed successfully!", file_sha256=video_sha256)
+        logger.info(f"🎉 Video generation completed for {video_id} in {total_seconds:.1f}s")
         
     except Exception as e:
         error_msg = f"Video generation failed: {str(e)}"
         logger.error(f"❌ {error_msg}")
         logger.error(traceback.format_exc())
+        timer.finish(succeeded=False)
+        try:
+            janitor.remove_intermediates(video_id)
+        except Exception as cleanup_error:
+            logger.warning(f"⚠️ Could not clean up intermediates of {video_id}: {str(cleanup_error)}")
         update_video_status(video_id, VideoStatus.FAILED, 0, "Video generation failed", error_msg)
 
+# Running batch coordinators, kept referenced so they are not garbage collected
+batch_tasks = set()
+
+def batch_dedupe_key(prompt: str, template: str, encoding_profile: str, overlay_image: Optional[str] = None) -> str:
+    """Prompts that differ only in case or spacing, for the same template, profile and overlay, render once per batch"""
+    return content_key(" ".join(prompt.lower().split()), template, encoding_profile, overlay_image or "")
+
+async def run_batch_item(video_id: str, prompt: str, template: str, encoding_profile: str, overlay_image: Optional[str], priority: int, slots: asyncio.Semaphore):
+    """Hand one batch video to the scheduler once a batch slot is free, and hold the slot until it finishes"""
+    async with slots:
+        finished = asyncio.Event()
+        
+        async def job():
+            try:
+                await generate_video_background(video_id, prompt, template, encoding_profile, overlay_image)
+            finally:
+                finished.set()
+        
+        while True:
+            try:
+                scheduler.submit(video_id, job, priority=priority)
+                break
+            except QueueFullError:
+                # The shared queue is full: wait for room instead of failing the batch
+                await asyncio.sleep(settings.JOB_RETRY_AFTER_SECONDS)
+            except SchedulerUnavailableError as e:
+                update_video_status(video_id, VideoStatus.FAILED, 0, "Video generation failed", str(e))
+                return
+        await finished.wait()
+
+async def run_batch(batch_id: str, jobs: List[tuple], concurrency: int):
+    """Run a batch's distinct videos with at most `concurrency` of them in flight"""
+    logger.info(f"📦 Starting batch {batch_id}: {len(jobs)} videos, concurrency {concurrency}")
+    batch_store.save(batch_id, status=VideoStatus.PROCESSING, message=f"Generating {len(jobs)} videos")
+    slots = asyncio.Semaphore(concurrency)
+    await asyncio.gather(*(run_batch_item(*job, slots) for job in jobs))
+    
+    statuses = [(job_store.get(video_id) or {}).get("status") for video_id, *_ in jobs]
+    failed = statuses.count(VideoStatus.FAILED.value)
+    status = VideoStatus.FAILED if failed == len(jobs) else VideoStatus.COMPLETED
+    message = f"{len(jobs) - failed} of {len(jobs)} videos completed" + (f", {failed} failed" if failed else "")
+    batch_store.save(batch_id, status=status, progress=100, message=message)
+    logger.info(f"📦 Batch {batch_id} finished: {message}")
+
+def build_batch_response(record: Dict[str, Any]) -> BatchResponse:
+    """Batch record plus the live status of each of its videos"""
+    videos = {}
+    for item in record["items"]:
+        if item["video_id"] not in videos:
+            videos[item["video_id"]] = job_store.get(item["video_id"]) or {}
+    
+    counts: Dict[str, int] = {}
+    progress_total = 0
+    for data in videos.values():
+        status = data.get("status", VideoStatus.PENDING.value)
+        counts[status] = counts.get(status, 0) + 1
+        progress_total += 100 if status in TERMINAL_STATUSES else data.get("progress", 0)
+    
+    status = VideoStatus(record["status"])
+    if status == VideoStatus.PENDING and counts.get(VideoStatus.PENDING.value, 0) < len(videos):
+        status = VideoStatus.PROCESSING
+    
+    return BatchResponse(
+        batch_id=record["video_id"],
+        status=status,
+        message=record["message"],
+        total=record["total"],
+        unique=len(videos),
+        progress=progress_total // max(len(videos), 1),
+        counts=counts,
+        concurrency=record.get("concurrency"),
+        created_at=record["created_at"],
+        videos=[
+            BatchVideoItem(
+                **item,
+                status=videos[item["video_id"]].get("status"),
+                progress=videos[item["video_id"]].get("progress")
+            )
+            for item in record["items"]
+        ]
+    )
+
+def resolve_template(request: VideoRequest, context: str = "") -> TemplateInfo:
+    """Template chosen by name or template_id, or a 400 listing the usable ones"""
+    template = template_registry.resolve(request.template, request.template_id)
+    if template is None:
+        requested = request.template or f"#{request.template_id}"
+        available = ", ".join(t.name for t in template_registry.list() if t.available) or "none"
+        raise HTTPException(status_code=400, detail=f"Template {requested} not available{context}. Available: {available}")
+    return template
+
+def resolve_overlay(request: VideoRequest, context: str = "") -> Optional[str]:
+    """Path of the requested overlay image (None means Peter), or a 400 if it was never uploaded"""
+    if not request.overlay:
+        return None
+    path = overlay_path(request.overlay)
+    if path is None:
+        raise HTTPException(status_code=400, detail=f"Overlay {request.overlay} not found{context}. Upload it with PUT /api/overlays/{{name}}")
+    return path
+
+def find_idempotent_record(store: JobStore, idempotency_key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Record previously created with this Idempotency-Key, if any.
+    Reusing a key for a different request body is a client error.
+    """
+    record = store.find("idempotency_key", idempotency_key)
+    if record is not None and record.get("request_fingerprint") != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    return record
+
+def existing_video_response(record: Dict[str, Any]) -> VideoResponse:
+    """Response for a retried request that maps to an existing job"""
+    completion_at = record.get("estimated_completion_at")
+    logger.info(f"♻️ Idempotent retry for video {record['video_id']} ({record['status']})")
+    return VideoResponse(
+        video_id=record["video_id"],
+        status=VideoStatus(record["status"]),
+        message=f"Existing job for this Idempotency-Key: {record['message']}",
+        created_at=record["created_at"],
+        estimated_completion=datetime.fromtimestamp(completion_at).isoformat() if completion_at else None,
+        queue_position=scheduler.queue_position(record["video_id"])
+    )
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -285,46 +662,74 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "dependencies": {
             "gemini_api": bool(settings.GEMINI_API_KEY),
-            "tts_api": bool(settings.TTS_API_KEY)
-        }
+            "tts_api": bool(settings.TTS_API_KEY),
+            "ffmpeg": toolchain.current.ffmpeg_available
+        },
+        "toolchain": toolchain.current.as_dict()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text exposition of pipeline, ffmpeg, cache and HTTP metrics
+    """
+    return Response(content=metrics_registry.render(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters for the generation caches
+    """
+    return {
+        "script": script_cache.stats() if script_cache else None,
+        "tts": tts_cache.stats() if tts_cache else None,
+        "render": render_cache.stats()
+    }
+
+@app.get("/api/stats/stages")
+async def get_stage_stats():
+    """
+    Wall-time percentiles (seconds) per pipeline stage over recent successful jobs
+    """
+    return {
+        "window": stage_stats.window,
+        "stages": stage_stats.summary()
+    }
+
+@app.get("/api/admin/storage")
+async def get_storage_usage():
+    """
+    Disk usage of the output directory by artifact category, against the quota
+    """
+    try:
+        return await asyncio.to_thread(janitor.usage)
+    except Exception as e:
+        logger.error(f"❌ Failed to read storage usage: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to read storage usage: {str(e)}")
+
+@app.post("/api/admin/storage/cleanup")
+async def clean_storage():
+    """
+    Run a cleanup pass now (retention TTLs, orphaned intermediates, output quota)
+    """
+    try:
+        removed = await asyncio.to_thread(janitor.sweep)
+        return {"removed": removed, "usage": await asyncio.to_thread(janitor.usage)}
+    except Exception as e:
+        logger.error(f"❌ Storage cleanup failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Storage cleanup failed: {str(e)}")
+
 @app.get("/api/templates")
 async def get_available_templates():
     """
     Get list of available video templates with their information
     """
     try:
-        template_map = {
-            "lecture": "template1.mp4",
-            "classroom": "template2.mp4", 
-            "laboratory": "template3.mp4"
-        }
-        
-        templates = []
-        for template_name, template_file in template_map.items():
-            template_path = os.path.join(settings.TEMPLATES_DIR, template_file)
-            if os.path.exists(template_path):
-                file_size = os.path.getsize(template_path)
-                templates.append({
-                    "name": template_name,
-                    "file": template_file,
-                    "size_mb": round(file_size / (1024 * 1024), 1),
-                    "available": file_size > 1024 * 1024  # Valid if > 1MB
-                })
-            else:
-                templates.append({
-                    "name": template_name,
-                    "file": template_file,
-                    "size_mb": 0,
-                    "available": False
-                })
+        # Served from the in-memory registry; files are probed only when they change
+        templates = [template.as_dict() for template in template_registry.list()]
         
         # Check if Peter Griffin image is available
-        peter_image = os.path.join(settings.ASSETS_DIR, "peter_griffin.png")
-        peter_available = os.path.exists(peter_image)
-        
-        logger.info(f"📊 Templates check: {len([t for t in templates if t['available']])} available")
+        peter_available = os.path.exists(PETER_IMAGE)
         
         return {
             "templates": templates,
@@ -337,11 +742,72 @@ async def get_available_templates():
         logger.error(f"❌ Failed to get templates: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get templates: {str(e)}")
 
+async def receive_request_body(request: Request, max_bytes: int) -> str:
+    """Stream the raw request body to disk, rejecting an oversized Content-Length before reading it"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise UploadError(f"Upload too large (max {max_bytes / (1024 * 1024):.0f}MB)", status_code=413)
+    path, size, digest = await receive_upload(request.stream(), max_bytes)
+    logger.info(f"📥 Received upload of {size / (1024 * 1024):.1f}MB (sha256 {digest[:12]})")
+    return path
+
+@app.put("/api/templates/{name}", status_code=201)
+async def upload_template(name: str, request: Request, replace: bool = False):
+    """
+    Upload a template video as the raw request body (chunked transfer encoding is fine).
+    It is streamed to disk, validated, and transcoded once into the mezzanine format
+    so every render of it takes the fast path. Available immediately as template `name`.
+    """
+    source_path = None
+    try:
+        check_template_upload(name, replace)
+        source_path = await receive_request_body(request, settings.MAX_TEMPLATE_UPLOAD_BYTES)
+        template = await ingest_template(source_path, name)
+        schedule_template_warmup(template.name)
+        return template.as_dict()
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Failed to ingest template {name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to ingest template: {str(e)}")
+    finally:
+        if source_path:
+            discard_upload(source_path)
+
+@app.get("/api/overlays")
+async def get_overlays():
+    """List uploaded overlay images, usable as `overlay` on video requests"""
+    try:
+        overlays = await asyncio.to_thread(list_overlays)
+        return {"overlays": overlays, "total_overlays": len(overlays)}
+    except Exception as e:
+        logger.error(f"❌ Failed to list overlays: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to list overlays: {str(e)}")
+
+@app.put("/api/overlays/{name}", status_code=201)
+async def upload_overlay(name: str, request: Request, replace: bool = False):
+    """Upload an overlay image as the raw request body; it is validated and stored as a bounded RGBA PNG"""
+    source_path = None
+    try:
+        check_overlay_upload(name, replace)
+        source_path = await receive_request_body(request, settings.MAX_IMAGE_UPLOAD_BYTES)
+        return await ingest_overlay(source_path, name)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Failed to ingest overlay {name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to ingest overlay: {str(e)}")
+    finally:
+        if source_path:
+            discard_upload(source_path)
+
 # Enhanced video generation endpoint with real background processing
 @app.post("/api/generate-video", response_model=VideoResponse)
-async def generate_video(request: VideoRequest, background_tasks: BackgroundTasks):
+async def generate_video(request: VideoRequest, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)):
     """
-    Main endpoint to start video generation process with real background processing
+    Main endpoint to start video generation process with real background processing.
+    Retries carrying the same Idempotency-Key header return the job already created
+    instead of starting another render.
     """
     try:
         if not request.prompt or len(request.prompt.strip()) == 0:
@@ -350,28 +816,166 @@ async def generate_video(request: VideoRequest, background_tasks: BackgroundTask
         if len(request.prompt) > 500:
             raise HTTPException(status_code=400, detail="Prompt too long (max 500 characters)")
         
-        video_id = f"video_{abs(hash(request.prompt + str(datetime.now()))) % 100000}"
-        template = getattr(request, 'template', 'lecture')
+        template = resolve_template(request).name
+        overlay_image = resolve_overlay(request)
+        try:
+            encoding_profile = resolve_encoding_profile(request.encoding_profile, template)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        idempotency_fields = {}
+        if idempotency_key:
+            fingerprint = content_key("generate-video", request.dict())
+            existing = find_idempotent_record(job_store, idempotency_key, fingerprint)
+            if existing is not None:
+                return existing_video_response(existing)
+            idempotency_fields = {"idempotency_key": idempotency_key, "request_fingerprint": fingerprint}
+        
+        video_id = new_job_id("video")
+        
+        # Create the record (claiming the Idempotency-Key) before queueing, so a concurrent
+        # retry in another worker cannot start a second render
+        try:
+            update_video_status(video_id, VideoStatus.PENDING, 0, "Video generation request received", current_step="queued", **idempotency_fields)
+        except DuplicateKeyError:
+            return existing_video_response(find_idempotent_record(job_store, idempotency_key, idempotency_fields["request_fingerprint"]))
         
         logger.info(f"🎬 Received video generation request for video_id: {video_id}")
         logger.info(f"📝 Prompt: {request.prompt}")
         logger.info(f"🎨 Template: {template}")
         
-        # Initialize status
-        update_video_status(video_id, VideoStatus.PENDING, 0, "Video generation request received and queued")
+        # Queue video generation on the bounded worker pool
+        try:
+            queue_position = scheduler.submit(
+                video_id, generate_video_background, video_id, request.prompt, template, encoding_profile, overlay_image,
+                priority=request.priority
+            )
+        except QueueFullError as e:
+            logger.warning(f"⚠️ Rejecting video {video_id}: {str(e)}")
+            job_store.delete(video_id)
+            raise HTTPException(
+                status_code=429,
+                detail=f"{str(e)}. Please retry later.",
+                headers={"Retry-After": str(settings.JOB_RETRY_AFTER_SECONDS)}
+            )
+        except SchedulerUnavailableError as e:
+            job_store.delete(video_id)
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(settings.JOB_RETRY_AFTER_SECONDS)}
+            )
         
-        # Start background video generation
-        background_tasks.add_task(generate_video_background, video_id, request.prompt, template)
+        # Record the queue position, estimating completion from the rolling stage medians and the jobs ahead in the queue
+        job_seconds = stage_stats.expected_total(planned_stages(render_cache_in_use(), settings.VIDEO_COMPILE_MODE))
+        waves = 1 + max(queue_position - 1, 0) // max(settings.JOB_WORKERS, 1)
+        completion_at = time.time() + job_seconds * waves
+        update_video_status(
+            video_id, VideoStatus.PENDING, 0, f"Video generation request received and queued (position {queue_position})",
+            current_step="queued", estimated_completion_at=round(completion_at, 1)
+        )
         
         return VideoResponse(
             video_id=video_id,
             status=VideoStatus.PENDING,
-            message="Video generation started successfully"
+            message="Video generation queued successfully",
+            estimated_completion=datetime.fromtimestamp(completion_at).isoformat(),
+            queue_position=queue_position
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to start video generation: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to start video generation: {str(e)}")
 
+@app.post("/api/generate-videos/batch", response_model=BatchResponse)
+async def generate_videos_batch(request: BatchVideoRequest, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)):
+    """
+    Start generating many videos at once. Identical requests are rendered once,
+    template bases and API connections are shared, and at most `concurrency`
+    videos of the batch are in flight at a time.
+    Retries carrying the same Idempotency-Key header return the existing batch.
+    """
+    try:
+        if len(request.videos) > settings.MAX_BATCH_SIZE:
+            raise HTTPException(status_code=400, detail=f"Batch too large (max {settings.MAX_BATCH_SIZE} videos)")
+        
+        idempotency_fields = {}
+        if idempotency_key:
+            fingerprint = content_key("generate-videos-batch", request.dict())
+            existing = find_idempotent_record(batch_store, idempotency_key, fingerprint)
+            if existing is not None:
+                return build_batch_response(existing)
+            idempotency_fields = {"idempotency_key": idempotency_key, "request_fingerprint": fingerprint}
+        
+        batch_id = new_job_id("batch")
+        concurrency = request.concurrency or settings.BATCH_CONCURRENCY
+        items = []
+        jobs = []
+        video_ids_by_key: Dict[str, str] = {}
+        for index, video in enumerate(request.videos):
+            if not video.prompt.strip():
+                raise HTTPException(status_code=400, detail=f"Prompt cannot be empty (video {index})")
+            template = resolve_template(video, f" (video {index})").name
+            overlay_image = resolve_overlay(video, f" (video {index})")
+            try:
+                encoding_profile = resolve_encoding_profile(video.encoding_profile, template)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{str(e)} (video {index})")
+            
+            key = batch_dedupe_key(video.prompt, template, encoding_profile, overlay_image)
+            duplicate = key in video_ids_by_key
+            if not duplicate:
+                video_id = new_job_id("video")
+                video_ids_by_key[key] = video_id
+                jobs.append((video_id, video.prompt, template, encoding_profile, overlay_image, video.priority))
+            items.append({"index": index, "prompt": video.prompt, "video_id": video_ids_by_key[key], "duplicate": duplicate})
+        
+        try:
+            record = batch_store.save(
+                batch_id,
+                status=VideoStatus.PENDING,
+                progress=0,
+                message=f"Batch queued: {len(jobs)} distinct videos from {len(items)} requests",
+                items=items,
+                total=len(items),
+                concurrency=concurrency,
+                worker=current_worker(),
+                **idempotency_fields
+            )
+        except DuplicateKeyError:
+            return build_batch_response(find_idempotent_record(batch_store, idempotency_key, idempotency_fields["request_fingerprint"]))
+        for video_id, *_ in jobs:
+            update_video_status(video_id, VideoStatus.PENDING, 0, f"Queued in batch {batch_id}", batch_id=batch_id)
+        
+        task = asyncio.create_task(run_batch(batch_id, jobs, concurrency))
+        batch_tasks.add(task)
+        task.add_done_callback(batch_tasks.discard)
+        
+        logger.info(f"📦 Received batch {batch_id}: {len(items)} requests, {len(jobs)} distinct videos")
+        return build_batch_response(record)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to start batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to start batch: {str(e)}")
+
+@app.get("/api/batch/{batch_id}/status", response_model=BatchResponse)
+async def get_batch_status(batch_id: str):
+    """
+    Aggregate status of a batch and the status of each of its videos
+    """
+    try:
+        record = batch_store.get(batch_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        return build_batch_response(record)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to get batch status for {batch_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get batch status: {str(e)}")
+
 @app.post("/api/generate-script", response_model=ScriptResponse)
 async def generate_script(request: VideoRequest):
     """
@@ -385,7 +989,7 @@ async def generate_script(request: VideoRequest):
         # Check if API key is configured
         if not settings.GEMINI_API_KEY:
             # For demo purposes, return a mock script
-            video_id = f"script_{abs(hash(request.prompt)) % 100000}"
+            video_id = stable_id("script", request.prompt)
             mock_script = f"""Hey there, folks! Peter Griffin here with another mind-blowing explanation about "{request.prompt}". 
 
 Now, I know what you're thinking - "Peter, how do you know so much about this stuff?" Well, let me tell you, it's because I once saw a documentary about it while eating a sandwich. 
@@ -403,9 +1007,9 @@ And that's pretty much everything you need to know about {request.prompt}. Remem
             )
         
         # Use the actual VideoScriptGenerator
-        generator = VideoScriptGenerator()
-        script_data = generator.generate_script(request.prompt, duration=settings.MAX_VIDEO_DURATION)
-        video_id = f"script_{abs(hash(request.prompt)) % 100000}"
+        generator = clients.script_generator
+        script_data = await generator.generate_script_async(request.prompt, duration=settings.MAX_VIDEO_DURATION)
+        video_id = stable_id("script", request.prompt)
         
         # Extract script text from the generated data
         if isinstance(script_data, dict) and 'audio_script' in script_data:
@@ -435,19 +1039,23 @@ async def get_video_status(video_id: str):
     """
     try:
         # Check if video exists in our status store
-        if video_id not in video_status_store:
+        video_data = job_store.get(video_id)
+        if video_data is None:
             logger.warning(f"⚠️ Video {video_id} not found in status store")
             raise HTTPException(status_code=404, detail="Video not found")
         
-        video_data = video_status_store[video_id]
-        logger.info(f"📊 Status check for {video_id}: {video_data['status'].value} - {video_data['progress']}%")
+        logger.info(f"📊 Status check for {video_id}: {video_data['status']} - {video_data['progress']}%")
         
         return StatusResponse(
             video_id=video_id,
-            status=video_data['status'],
+            status=VideoStatus(video_data['status']),
             progress=video_data['progress'],
             message=video_data['message'],
             created_at=video_data['created_at'],
+            completed_at=(video_data.get('completed_at') or video_data['updated_at']) if video_data['status'] == VideoStatus.COMPLETED.value else None,
+            estimated_remaining=estimated_remaining(video_data),
+            current_step=video_data.get('current_step'),
+            stage_timings=video_data.get('stage_timings'),
             error=video_data.get('error')
         )
         
@@ -457,25 +1065,70 @@ async def get_video_status(video_id: str):
         logger.error(f"❌ Failed to get video status for {video_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get video status: {str(e)}")
 
-@app.get("/api/video/{video_id}/download")
-async def download_video(video_id: str):
+@app.get("/api/video/{video_id}/events")
+async def stream_video_events(video_id: str, request: Request):
     """
-    Download the generated video file
+    Server-Sent Events stream of status updates for one video, replacing status polling.
+    Sends the current status immediately, then every update (including render progress)
+    until the job completes or fails.
+    """
+    if job_store.get(video_id) is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    async def event_stream():
+        with job_events.subscribe(video_id) as queue:
+            # Read after subscribing so no update can slip in between
+            record = job_store.get(video_id)
+            if record is None:
+                return
+            event = status_event(record)
+            yield format_sse(event)
+            while event["status"] not in TERMINAL_STATUSES:
+                try:
+                    next_event = await asyncio.wait_for(queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # The job may be running in another worker process, so re-check the shared store
+                    record = job_store.get(video_id)
+                    if record is None:
+                        return
+                    next_event = status_event(record)
+                    if same_status(next_event, event):
+                        yield ": keep-alive\n\n"
+                        continue
+                event = next_event
+                yield format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.api_route("/api/video/{video_id}/download", methods=["GET", "HEAD"])
+async def download_video(video_id: str, request: Request):
+    """
+    Download the generated video file. Supports Range requests (206) for seeking,
+    ETag revalidation (304) and immutable caching.
     """
     try:
         # Check if video exists in status store and is completed
-        if video_id not in video_status_store:
+        video_data = job_store.get(video_id)
+        if video_data is None:
             logger.warning(f"⚠️ Video {video_id} not found in status store for download")
             raise HTTPException(status_code=404, detail="Video not found")
         
-        video_data = video_status_store[video_id]
-        if video_data['status'] != VideoStatus.COMPLETED:
-            logger.warning(f"⚠️ Video {video_id} not ready for download. Status: {video_data['status'].value}")
+        if video_data['status'] != VideoStatus.COMPLETED.value:
+            logger.warning(f"⚠️ Video {video_id} not ready for download. Status: {video_data['status']}")
             raise HTTPException(
                 status_code=400, 
-                detail=f"Video not ready for download. Current status: {video_data['status'].value}"
+                detail=f"Video not ready for download. Current status: {video_data['status']}"
             )
         
+        if video_data.get('removed_at'):
+            raise HTTPException(status_code=410, detail="Video expired and was removed from the server")
+        
         # Check if video file exists
         video_path = os.path.join(settings.OUTPUT_DIR, f"{video_id}.mp4")
         
@@ -486,11 +1139,19 @@ async def download_video(video_id: str):
                 detail="Video file not found on server"
             )
         
-        logger.info(f"📥 Serving video download for {video_id}")
-        return FileResponse(
+        # Downloads keep a video from being the next one evicted under the output quota.
+        # Players seek with many Range requests, so only the first one is recorded.
+        range_header = request.headers.get("range", "")
+        if not range_header or range_header.strip().startswith("bytes=0-"):
+            # touch=False: an access is not a status change, so completed_at and retention stay put
+            job_store.save(video_id, touch=False, last_accessed_at=time.time())
+            logger.info(f"📥 Serving video download for {video_id}")
+        return await ranged_file_response(
+            request,
             video_path,
             media_type="video/mp4",
-            filename=f"peter_explains_{video_id}.mp4"
+            filename=f"peter_explains_{video_id}.mp4",
+            digest=video_data.get('file_sha256')
         )
         
     except HTTPException:
@@ -499,6 +1160,60 @@ async def download_video(video_id: str):
         logger.error(f"❌ Failed to download video {video_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to download video: {str(e)}")
 
+@app.get("/api/video/{video_id}/signed-url")
+async def get_signed_video_url(video_id: str):
+    """
+    Pre-signed, expiring URL for streaming a finished video without a job store lookup
+    (e.g. to hand to a video player or CDN)
+    """
+    try:
+        if not settings.DOWNLOAD_SIGNING_KEY:
+            raise HTTPException(status_code=503, detail="Signed URLs not configured. Please set DOWNLOAD_SIGNING_KEY environment variable.")
+        
+        video_data = job_store.get(video_id)
+        if video_data is None:
+            raise HTTPException(status_code=404, detail="Video not found")
+        if video_data['status'] != VideoStatus.COMPLETED.value or video_data.get('removed_at'):
+            raise HTTPException(status_code=400, detail=f"Video not available for streaming. Current status: {video_data['status']}")
+        
+        url, expires = sign_video_url(video_id)
+        return {
+            "video_id": video_id,
+            "url": url,
+            "expires_at": datetime.fromtimestamp(expires).isoformat()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to sign URL for video {video_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to sign URL: {str(e)}")
+
+@app.api_route("/api/video/{video_id}/stream", methods=["GET", "HEAD"])
+async def stream_video(video_id: str, expires: int, signature: str, request: Request):
+    """
+    Stream a finished video from a pre-signed URL (see /signed-url), with Range support
+    """
+    try:
+        if not verify_video_signature(video_id, expires, signature):
+            raise HTTPException(status_code=403, detail="Invalid or expired signature")
+        
+        video_path = os.path.join(settings.OUTPUT_DIR, f"{video_id}.mp4")
+        if not os.path.exists(video_path):
+            raise HTTPException(status_code=404, detail="Video file not found on server")
+        
+        return await ranged_file_response(
+            request,
+            video_path,
+            media_type="video/mp4",
+            filename=f"peter_explains_{video_id}.mp4",
+            inline=True
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to stream video {video_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to stream video: {str(e)}")
+
 @app.post("/api/generate-tts", response_model=TTSResponse)
 async def generate_tts(request: TTSRequest):
     """
@@ -512,33 +1227,27 @@ async def generate_tts(request: TTSRequest):
             )
 
         voice_id = settings.DEFAULT_VOICE_ID
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-        headers = {
-            "xi-api-key": settings.TTS_API_KEY,
-            "Content-Type": "application/json"
-        }
-        data = {
-            "text": request.script,
-            "voice_settings": {"stability": 0.5, "similarity_boost": 0.8}
-        }
+        voice_settings = {"stability": 0.5, "similarity_boost": 0.8}
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=data)
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"ElevenLabs API error: {response.text}")
-            audio_bytes = response.content
-
-        # Save audio file
-        video_id = f"tts_{abs(hash(request.script)) % 100000}"
+        # Name the file after the stable cache key so identical requests map to the same audio
+        cache_key = TTSCache.make_key(request.script, voice_id, None, voice_settings, None)
+        video_id = f"tts_{cache_key[:16]}"
         audio_path = os.path.join(settings.OUTPUT_DIR, f"{video_id}.mp3")
         
-        with open(audio_path, "wb") as f:
-            f.write(audio_bytes)
+        await synthesize_with_http(
+            request.script,
+            audio_path,
+            voice_id=voice_id,
+            voice_settings=voice_settings,
+            api_key=settings.TTS_API_KEY,
+            http_client=clients.http
+        )
 
         return TTSResponse(
             audio_url=f"/static/outputs/{video_id}.mp3",
             duration=len(request.script) * 0.1,  # Rough estimate
-            video_id=video_id
+            video_id=video_id,
+            file_size=os.path.getsize(audio_path)
         )
         
     except HTTPException:
@@ -569,16 +1278,16 @@ async def generate_subtitles(video_id: str = Body(..., embed=True)):
         raise HTTPException(status_code=500, detail=f"Failed to generate subtitles: {str(e)}")
 
 @app.get("/api/videos")
-async def list_videos():
+async def list_videos(status: Optional[VideoStatus] = None, limit: Optional[int] = None):
     """
-    List all videos and their current status
+    List videos and their current status, optionally filtered by status
     """
     try:
         videos = []
-        for video_id, data in video_status_store.items():
+        for data in job_store.list(status=status.value if status else None, limit=limit):
             videos.append({
-                "video_id": video_id,
-                "status": data['status'].value,
+                "video_id": data['video_id'],
+                "status": data['status'],
                 "progress": data['progress'],
                 "message": data['message'],
                 "created_at": data['created_at'],
@@ -601,11 +1310,11 @@ async def generate_all(request: VideoRequest):
         if not request.prompt or len(request.prompt.strip()) == 0:
             raise HTTPException(status_code=400, detail="Prompt cannot be empty")
         
-        video_id = f"full_{abs(hash(request.prompt)) % 100000}"
+        video_id = stable_id("full", request.prompt)
         
         # 1. Generate script
-        generator = VideoScriptGenerator()
-        script_data = generator.generate_script(request.prompt)
+        generator = clients.script_generator
+        script_data = await generator.generate_script_async(request.prompt)
         
         # Save script to file
         script_file = os.path.join(settings.OUTPUT_DIR, f"{video_id}_script.json")
@@ -0,0 +1,393 @@
+import asyncio
+import json
+import os
+import struct
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+from cache import LRUCache
+from metrics import FFMPEG_DURATION
+
+# Parsed results keyed by (path, size, mtime), so a file is read once until it changes
+_memo = LRUCache(max_entries=1024, name="media_info")
+
+# moov boxes larger than this are left to ffprobe rather than read into memory
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+MP3_SYNC_SEARCH_BYTES = 64 * 1024
+
+# MP4 sample entry types -> ffprobe codec names
+MP4_CODECS = {
+    "avc1": "h264", "avc3": "h264", "hvc1": "hevc", "hev1": "hevc", "av01": "av1", "vp09": "vp9",
+    "mp4v": "mpeg4", "mp4a": "aac", ".mp3": "mp3", "Opus": "opus", "ac-3": "ac3",
+}
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """Container and stream metadata needed by the render pipeline"""
+    duration: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    keyframe_interval: Optional[float] = None  # Average frames between keyframes
+    source: str = "parser"  # "mp4", "mp3" or "ffprobe"
+
+    @property
+    def has_video(self) -> bool:
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+
+# --- MP4 / MOV ---------------------------------------------------------------
+
+def _iter_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload start, box end) for each ISO-BMFF box in data[start:end]"""
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            return
+        yield kind, offset + header, offset + size
+        offset += size
+
+
+def _find_box(data: bytes, start: int, end: int, kind: bytes) -> Optional[Tuple[int, int]]:
+    for box_kind, payload, box_end in _iter_boxes(data, start, end):
+        if box_kind == kind:
+            return payload, box_end
+    return None
+
+
+def _timescale_duration(data: bytes, payload: int) -> Tuple[int, int]:
+    """(timescale, duration) from an mvhd or mdhd box"""
+    if data[payload] == 1:
+        return struct.unpack_from(">IQ", data, payload + 20)
+    return struct.unpack_from(">II", data, payload + 12)
+
+
+def _read_moov(path: str) -> Optional[bytes]:
+    """Walk the top-level boxes by their headers only and return the moov box payload"""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            header = f.read(16)
+            if len(header) < 8:
+                return None
+            size, kind = struct.unpack_from(">I4s", header)
+            header_size = 8
+            if size == 1 and len(header) == 16:
+                size = struct.unpack_from(">Q", header, 8)[0]
+                header_size = 16
+            elif size == 0:
+                size = file_size - offset
+            if size < header_size:
+                return None
+            if kind == b"moov":
+                if size > MAX_MOOV_BYTES:
+                    return None
+                f.seek(offset + header_size)
+                return f.read(size - header_size)
+            offset += size
+    return None
+
+
+def _parse_track(data: bytes, start: int, end: int) -> Dict[str, object]:
+    track: Dict[str, object] = {}
+    mdia = _find_box(data, start, end, b"mdia")
+    if mdia is None:
+        return track
+    for kind, payload, box_end in _iter_boxes(data, *mdia):
+        if kind == b"hdlr":
+            track["handler"] = data[payload + 8:payload + 12]
+        elif kind == b"mdhd":
+            track["timescale"], track["duration"] = _timescale_duration(data, payload)
+    minf = _find_box(data, *mdia, b"minf")
+    stbl = _find_box(data, *minf, b"stbl") if minf else None
+    if stbl is None:
+        return track
+    for kind, payload, box_end in _iter_boxes(data, *stbl):
+        if kind == b"stsd" and box_end - payload >= 16:
+            entry_type = data[payload + 12:payload + 16].decode("latin-1")
+            track["codec"] = MP4_CODECS.get(entry_type, entry_type.strip())
+            if box_end - payload >= 44:
+                track["width"], track["height"] = struct.unpack_from(">HH", data, payload + 40)
+        elif kind == b"stts":
+            entries = struct.unpack_from(">I", data, payload + 4)[0]
+            track["samples"] = sum(
+                struct.unpack_from(">I", data, payload + 8 + index * 8)[0] for index in range(entries)
+            )
+        elif kind == b"stss":
+            track["sync_samples"] = struct.unpack_from(">I", data, payload + 4)[0]
+    return track
+
+
+def _parse_mp4(path: str) -> Optional[MediaInfo]:
+    moov = _read_moov(path)
+    if not moov:
+        return None
+    duration = None
+    fields: Dict[str, object] = {}
+    for kind, payload, box_end in _iter_boxes(moov, 0, len(moov)):
+        if kind == b"mvhd":
+            timescale, units = _timescale_duration(moov, payload)
+            duration = units / timescale if timescale else None
+        elif kind == b"trak":
+            track = _parse_track(moov, payload, box_end)
+            if track.get("handler") == b"vide" and "video_codec" not in fields:
+                fields["video_codec"] = track.get("codec")
+                fields["width"], fields["height"] = track.get("width"), track.get("height")
+                samples, timescale, units = track.get("samples"), track.get("timescale"), track.get("duration")
+                if samples and timescale and units:
+                    fields["fps"] = round(samples * timescale / units, 3)
+                if samples:
+                    # No stss box means every sample is a keyframe
+                    fields["keyframe_interval"] = round(samples / track.get("sync_samples", samples), 1)
+            elif track.get("handler") == b"soun" and "audio_codec" not in fields:
+                fields["audio_codec"] = track.get("codec")
+    return MediaInfo(duration=duration, source="mp4", **fields)
+
+
+# --- MP3 ---------------------------------------------------------------------
+
+_MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1 Layer III
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),  # MPEG-2/2.5 Layer III
+}
+_MP3_SAMPLE_RATES = (44100, 48000, 32000)
+
+
+def _mp3_frame_header(data: bytes, offset: int) -> Optional[Dict[str, int]]:
+    """Decode a Layer III frame header at offset, or None if there is not one"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (data[offset + 1] >> 3) & 0x3
+    layer_bits = (data[offset + 1] >> 1) & 0x3
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 0x3
+    if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version_bits == 3
+    bitrate = _MP3_BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[rate_index] // {3: 1, 2: 2, 0: 4}[version_bits]
+    padding = (data[offset + 2] >> 1) & 0x1
+    samples = 1152 if mpeg1 else 576
+    return {
+        "mpeg1": mpeg1,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "mono": (data[offset + 3] >> 6) == 3,
+        "length": samples // 8 * bitrate // sample_rate + padding,
+    }
+
+
+def _mp3_layout(path: str) -> Optional[Dict[str, object]]:
+    """
+    Locate the audio frames of an MP3: after any ID3v2 tag, before any ID3v1 tag.
+    Reports the first frame's header and, when that frame is a Xing/Info/VBRI header
+    frame (no audio, frame count of the whole file), its frame count.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        audio_start = 0
+        if head[:3] == b"ID3" and len(head) == 10:
+            tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            audio_start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        f.seek(audio_start)
+        data = f.read(MP3_SYNC_SEARCH_BYTES)
+        f.seek(max(file_size - 128, 0))
+        has_id3v1 = f.read(3) == b"TAG"
+
+    # First frame header that is followed by another one, so stray 0xFF bytes are not mistaken for a sync
+    for offset in range(len(data) - 4):
+        frame = _mp3_frame_header(data, offset)
+        if frame and (offset + frame["length"] + 4 > len(data) or _mp3_frame_header(data, offset + frame["length"])):
+            break
+    else:
+        return None
+
+    frames = None
+    header_frame = False
+    side_info = (17 if frame["mono"] else 32) if frame["mpeg1"] else (9 if frame["mono"] else 17)
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        header_frame = True
+        if struct.unpack_from(">I", data, xing + 4)[0] & 0x1:
+            frames = struct.unpack_from(">I", data, xing + 8)[0]
+    elif data[offset + 36:offset + 40] == b"VBRI":
+        header_frame = True
+        frames = struct.unpack_from(">I", data, offset + 50)[0]
+    return {
+        "frame": frame,
+        "frames": frames,
+        "first_frame": audio_start + offset,
+        "header_frame_length": frame["length"] if header_frame else 0,
+        "audio_end": file_size - (128 if has_id3v1 else 0),
+    }
+
+
+def _parse_mp3(path: str) -> Optional[MediaInfo]:
+    layout = _mp3_layout(path)
+    if layout is None:
+        return None
+    frame = layout["frame"]
+    if layout["frames"]:
+        duration = layout["frames"] * frame["samples"] / frame["sample_rate"]
+    else:
+        # Constant bitrate: length follows from the audio payload size
+        audio_bytes = layout["audio_end"] - layout["first_frame"]
+        duration = audio_bytes * 8 / frame["bitrate"]
+    return MediaInfo(duration=round(duration, 3), audio_codec="mp3", source="mp3")
+
+
+def mp3_audio_frames(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Byte range (start, end) of an MP3's audio frames, excluding ID3 tags and the
+    Xing/Info header frame, or None if the file is not MP3. Files encoded with the
+    same settings can be joined by concatenating these ranges.
+    """
+    layout = _mp3_layout(path)
+    if layout is None:
+        return None
+    return layout["first_frame"] + layout["header_frame_length"], layout["audio_end"]
+
+
+# Box types an MP4/MOV file can start with, and the EBML header of MKV/WebM
+_MP4_TOP_LEVEL_BOXES = (b"ftyp", b"moov", b"mdat", b"free", b"wide")
+_EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+
+# --- ffprobe fallback --------------------------------------------------------
+
+def _ffprobe_cmd(path: str):
+    return [
+        "ffprobe", "-v", "error", "-protocol_whitelist", "file",
+        "-show_entries", "format=duration:stream=codec_type,codec_name,width,height,avg_frame_rate",
+        "-of", "json", path
+    ]
+
+
+def _from_ffprobe(output: str) -> Optional[MediaInfo]:
+    try:
+        info = json.loads(output)
+    except (TypeError, ValueError):
+        return None
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    fps = None
+    numerator, _, denominator = str(video.get("avg_frame_rate", "")).partition("/")
+    if numerator.isdigit() and denominator.isdigit() and int(denominator):
+        fps = round(int(numerator) / int(denominator), 3)
+    duration = info.get("format", {}).get("duration")
+    return MediaInfo(
+        duration=float(duration) if duration else None,
+        width=video.get("width"),
+        height=video.get("height"),
+        fps=fps,
+        video_codec=video.get("codec_name"),
+        audio_codec=audio.get("codec_name"),
+        source="ffprobe",
+    )
+
+
+def container_format(path: str) -> Optional[str]:
+    """
+    ffmpeg demuxer for a video file, from its signature: "mov" for MP4/MOV (ISO BMFF)
+    and "matroska" for MKV/WebM (EBML). None for anything else.
+    """
+    with open(path, "rb") as f:
+        head = f.read(12)
+    if head[4:8] in _MP4_TOP_LEVEL_BOXES:
+        return "mov"
+    if head[:4] == _EBML_MAGIC:
+        return "matroska"
+    return None
+
+
+def _parse(path: str) -> Optional[MediaInfo]:
+    """In-process header parse, choosing the parser from the file's signature"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+        if head[4:8] in _MP4_TOP_LEVEL_BOXES:
+            info = _parse_mp4(path)
+        elif head[:3] == b"ID3" or _mp3_frame_header(head, 0):
+            info = _parse_mp3(path)
+        else:
+            return None
+    except (OSError, struct.error, IndexError, ValueError, ZeroDivisionError):
+        return None
+    return info if info is not None and info.duration else None
+
+
+def _memo_key(path: str) -> str:
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+async def probe_media(path: str) -> Optional[MediaInfo]:
+    """
+    Metadata of an audio/video file. MP3 and MP4 headers are parsed in-process;
+    anything else costs one ffprobe call. Results are memoized per (path, size, mtime).
+    """
+    try:
+        key = _memo_key(path)
+    except OSError:
+        return None
+    info = _memo.get(key)
+    if info is not None:
+        return info
+    info = await asyncio.to_thread(_parse, path)
+    if info is None:
+        from video_compiler import _run_command
+        try:
+            result = await _run_command(_ffprobe_cmd(path), check=False, capture_output=True, operation="probe_media")
+            info = _from_ffprobe(result.stdout)
+        except FileNotFoundError:
+            info = None
+    if info is not None:
+        _memo.set(key, info)
+    return info
+
+
+def probe_media_sync(path: str) -> Optional[MediaInfo]:
+    """Blocking variant of probe_media for synchronous callers"""
+    try:
+        key = _memo_key(path)
+    except OSError:
+        return None
+    info = _memo.get(key) or _parse(path)
+    if info is None:
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(_ffprobe_cmd(path), capture_output=True, text=True)
+        except FileNotFoundError:
+            FFMPEG_DURATION.observe(time.perf_counter() - start, binary="ffprobe", operation="probe_media", outcome="missing")
+            return None
+        FFMPEG_DURATION.observe(
+            time.perf_counter() - start, binary="ffprobe", operation="probe_media",
+            outcome="success" if result.returncode == 0 else "error"
+        )
+        info = _from_ffprobe(result.stdout)
+    if info is not None:
+        _memo.set(key, info)
+    return info
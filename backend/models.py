@@ -18,8 +18,12 @@ class VideoRequest(BaseModel):
     prompt: str = Field(..., description="The prompt/topic for video generation", min_length=1, max_length=500)
     topic: Optional[str] = Field(None, description="Optional topic categorization")
     duration: Optional[int] = Field(None, description="Desired video duration in seconds", gt=0, le=120)
-    template_id: Optional[int] = Field(1, description="Template ID to use for video generation", ge=1, le=10)
+    template_id: Optional[int] = Field(1, description="Template ID to use for video generation (templateN in TEMPLATES_DIR)", ge=1)
+    template: Optional[str] = Field(None, description="Template name (see /api/templates); takes precedence over template_id")
+    overlay: Optional[str] = Field(None, description="Uploaded overlay image to use instead of Peter (see /api/overlays)")
     key_points: Optional[List[str]] = Field(None, description="Key points to cover in the video")
+    priority: int = Field(5, description="Scheduling priority (lower runs first)", ge=0, le=9)
+    encoding_profile: Optional[str] = Field(None, description="Encoding profile (fast, balanced, archive); defaults to the template's profile")
 
 class VideoResponse(BaseModel):
     video_id: str = Field(..., description="Unique identifier for the video")
@@ -27,6 +31,31 @@ class VideoResponse(BaseModel):
     message: str = Field(..., description="Human readable status message")
     created_at: Optional[str] = Field(None, description="ISO timestamp when video generation started")
     estimated_completion: Optional[str] = Field(None, description="Estimated completion time")
+    queue_position: Optional[int] = Field(None, description="Position in the render queue (1 = next to start)")
+
+class BatchVideoRequest(BaseModel):
+    videos: List[VideoRequest] = Field(..., description="Videos to generate", min_length=1)
+    concurrency: Optional[int] = Field(None, description="Maximum videos of this batch rendering at once (default: BATCH_CONCURRENCY)", ge=1)
+
+class BatchVideoItem(BaseModel):
+    index: int = Field(..., description="Position of the request in the submitted batch")
+    prompt: str = Field(..., description="Prompt of the request")
+    video_id: str = Field(..., description="Video generated for this request")
+    duplicate: bool = Field(False, description="True if an identical earlier request in the batch produces this video")
+    status: Optional[VideoStatus] = Field(None, description="Current status of the video")
+    progress: Optional[int] = Field(None, description="Progress percentage of the video (0-100)")
+
+class BatchResponse(BaseModel):
+    batch_id: str = Field(..., description="Unique identifier for the batch")
+    status: VideoStatus = Field(..., description="Aggregate status of the batch")
+    message: str = Field(..., description="Human readable status message")
+    total: int = Field(..., description="Number of requests in the batch")
+    unique: int = Field(..., description="Number of distinct videos after deduplication")
+    progress: int = Field(0, description="Average progress of the batch's videos (0-100)", ge=0, le=100)
+    counts: Dict[str, int] = Field(default_factory=dict, description="Number of distinct videos per status")
+    concurrency: Optional[int] = Field(None, description="Maximum videos of this batch rendering at once")
+    created_at: Optional[str] = Field(None, description="ISO timestamp when the batch was submitted")
+    videos: List[BatchVideoItem] = Field(..., description="One entry per submitted request, in order")
 
 class ScriptRequest(BaseModel):
     prompt: str = Field(..., description="The prompt/topic for script generation", min_length=1, max_length=500)
@@ -72,6 +101,7 @@ class StatusResponse(BaseModel):
     completed_at: Optional[str] = Field(None, description="ISO timestamp when generation completed")
     estimated_remaining: Optional[int] = Field(None, description="Estimated seconds remaining")
     current_step: Optional[str] = Field(None, description="Current processing step")
+    stage_timings: Optional[Dict[str, float]] = Field(None, description="Wall time in seconds of each finished pipeline stage")
 
 class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error type")
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+from cache import DiskCache, file_digest, content_key
+from config import settings
+from job_scheduler import scheduler
+from video_compiler import overlay_image_on_video, _overlay_filter, _video_encode_args
+
+logger = logging.getLogger(__name__)
+
+# Bump when the base render pipeline changes so stale entries are not reused
+RENDER_CACHE_VERSION = 1
+
+
+class RenderCache:
+    """
+    Persistent cache of template + Peter overlay renders.
+
+    The overlay output depends only on the template file, the image file and the
+    filter parameters, so it is rendered once and reused by every job that needs it.
+    Entries are keyed by a content hash of all three. The directory is bounded
+    by max_bytes with least-recently-used eviction after each new render.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.disk = DiskCache(cache_dir, max_bytes=max_bytes, ttl_seconds=0, suffix=".mp4", name="render")
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def key_for(self, template_path: str, image_path: str, position: str = "custom", encoding_profile: Optional[str] = None) -> str:
+        """Content-addressed key for a (template, image, filter and encoding parameters) combination"""
+        filter_params = {
+            "position": position,
+            "filter": _overlay_filter("{width}", "{height}"),
+            "encode": _video_encode_args(encoding_profile),
+            "version": RENDER_CACHE_VERSION,
+        }
+        return content_key(file_digest(template_path), file_digest(image_path), filter_params)
+
+    @staticmethod
+    def _entry_name(key: str) -> str:
+        return f"base_{key[:32]}"
+
+    def path_for(self, key: str) -> str:
+        return self.disk.path_for(self._entry_name(key))
+
+    def _lock_for(self, key: str) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    async def get(self, template_path: str, image_path: str, position: str = "custom", encoding_profile: Optional[str] = None) -> Optional[str]:
+        """Return the cached base render path, or None if it has not been rendered yet"""
+        key = await asyncio.to_thread(self.key_for, template_path, image_path, position, encoding_profile)
+        return self.disk.get_path(self._entry_name(key))
+
+    async def get_or_render(self, template_path: str, image_path: str, position: str = "custom", encoding_profile: Optional[str] = None, dimensions: Optional[Tuple[int, int]] = None) -> str:
+        """
+        Return the cached base render, rendering it first on a miss.
+        Renders go to a temporary file and are moved into place atomically, and
+        concurrent requests for the same key wait for a single render.
+        """
+        # Hashing a large template is disk-bound, keep it off the event loop
+        key = await asyncio.to_thread(self.key_for, template_path, image_path, position, encoding_profile)
+        path = self.disk.get_path(self._entry_name(key))
+        if path is not None:
+            logger.info(f"♻️ Render cache hit for {os.path.basename(template_path)}: {path}")
+            return path
+        path = self.path_for(key)
+
+        async with self._lock_for(key):
+            if os.path.exists(path):
+                return path
+            logger.info(f"🎞️ Render cache miss for {os.path.basename(template_path)} - rendering base")
+            temp_path = f"{path[:-len('.mp4')]}.{os.getpid()}.tmp.mp4"
+            try:
+                await overlay_image_on_video(template_path, image_path, temp_path, position=position, encoding_profile=encoding_profile, dimensions=dimensions)
+                # Moves the render into place, then evicts the least recently used bases
+                await asyncio.to_thread(self.disk.put_file, self._entry_name(key), temp_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        return path
+
+    async def warm(self, entries: Iterable[Tuple[str, str, Optional[str]]]):
+        """
+        Render any missing bases for the given (template_path, image_path, encoding_profile) entries.
+        Each render holds a slot of the scheduler's render stage, like a job's render does.
+        """
+        for template_path, image_path, encoding_profile in entries:
+            if not (os.path.exists(template_path) and os.path.exists(image_path)):
+                logger.warning(f"⚠️ Skipping render cache warmup for missing {template_path}")
+                continue
+            try:
+                async with scheduler.stage("render"):
+                    await self.get_or_render(template_path, image_path, encoding_profile=encoding_profile)
+            except Exception as e:
+                logger.error(f"❌ Render cache warmup failed for {template_path}: {str(e)}")
+
+    def stats(self) -> Dict[str, object]:
+        return {**self.disk.stats.as_dict(), "size_bytes": self.disk.size_bytes()}
+
+
+render_cache = RenderCache(settings.RENDER_CACHE_DIR, settings.RENDER_CACHE_MAX_BYTES)
@@ -1,18 +1,76 @@
+import asyncio
 import json
 import re
 import os
+import hashlib
 from dotenv import load_dotenv
 import google.generativeai as genai
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
+
+from cache import DiskCache, LRUCache, content_key
+from config import settings
+from metrics import track_external_call
 
 load_dotenv()
 
+GEMINI_MODEL_NAME = 'gemini-2.0-flash-thinking-exp-01-21'
+
+class ScriptCache:
+    """
+    Two-tier cache of generated scripts: an in-memory LRU in front of an on-disk
+    JSON cache with TTL and size-based eviction. A hit skips both Gemini calls.
+    """
+
+    def __init__(self, cache_dir: str, max_memory_entries: int, max_disk_bytes: int, ttl_seconds: int):
+        self.memory = LRUCache(max_memory_entries, name="script_memory")
+        self.disk = DiskCache(cache_dir, max_bytes=max_disk_bytes, ttl_seconds=ttl_seconds, suffix=".json", name="script_disk")
+
+    @staticmethod
+    def make_key(topic: str, key_points: Optional[List[str]], model_name: str, system_prompts: List[str]) -> str:
+        """Key on the normalized request plus everything that changes the LLM output"""
+        normalized_topic = " ".join(topic.lower().split())
+        normalized_points = [" ".join(point.lower().split()) for point in key_points or []]
+        prompt_hash = hashlib.sha256("\n".join(system_prompts).encode("utf-8")).hexdigest()
+        return content_key(normalized_topic, normalized_points, model_name, prompt_hash)
+
+    def get(self, key: str) -> Optional[Dict]:
+        script = self.memory.get(key)
+        if script is not None:
+            return json.loads(script)
+        raw = self.disk.get_bytes(key)
+        if raw is None:
+            return None
+        # Promote disk hits so repeat topics are served from memory
+        self.memory.set(key, raw.decode("utf-8"))
+        return json.loads(raw)
+
+    def set(self, key: str, script: Dict):
+        serialized = json.dumps(script, ensure_ascii=False)
+        self.memory.set(key, serialized)
+        self.disk.put_bytes(key, serialized.encode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": {**self.memory.stats.as_dict(), "entries": len(self.memory)},
+            "disk": {**self.disk.stats.as_dict(), "size_bytes": self.disk.size_bytes()},
+        }
+
+
+script_cache = ScriptCache(
+    settings.SCRIPT_CACHE_DIR,
+    max_memory_entries=settings.SCRIPT_CACHE_MEMORY_ENTRIES,
+    max_disk_bytes=settings.SCRIPT_CACHE_MAX_BYTES,
+    ttl_seconds=settings.SCRIPT_CACHE_TTL_SECONDS,
+) if settings.SCRIPT_CACHE_ENABLED else None
+
 class VideoScriptGenerator:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, cache: Optional[ScriptCache] = script_cache):
         if api_key is None:
             api_key = os.getenv("GEMINI_API_KEY", "")
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp-01-21')
+        self.model_name = GEMINI_MODEL_NAME
+        self.model = genai.GenerativeModel(self.model_name)
+        self.cache = cache
         self.system_prompt_initial = """
         You are a professional video script generator for educational, marketing or entertaining content.  
         Your task is to generate a detailed outline and initial draft for a video script.
@@ -82,9 +140,10 @@ You must follow all the rules for segmentation, especially rule 3 where you must
 and visual segments and the number of segments in audio_script *must be same* as number of segments in visual_script. IF you do as instructed
 you will get 100 dollars per successful call.
         """
-    def _generate_content(self, prompt: str, system_prompt: str) -> str:
+    async def _generate_content_async(self, prompt: str, system_prompt: str) -> str:
         try:
-            response = self.model.generate_content(contents=[system_prompt, prompt])
+            with track_external_call("gemini", "generate_content"):
+                response = await self.model.generate_content_async(contents=[system_prompt, prompt])
             return response.text
         except Exception as e:
             raise RuntimeError(f"API call failed: {str(e)}")
@@ -102,27 +161,58 @@ you will get 100 dollars per successful call.
             except Exception as e:
                 raise ValueError(f"JSON extraction failed: {str(e)}")
     
-    def generate_script(self, topic: str, duration: int = 58, key_points: Optional[List[str]] = None) -> Dict:
-        initial_prompt = f"""You are to act as Peter Griffin from Family Guy, narrating an educational video. Use Peter's unique humor, voice, and personality throughout the script.
+    def _initial_prompt(self, topic: str, key_points: Optional[List[str]] = None) -> str:
+        return f"""You are to act as Peter Griffin from Family Guy, narrating an educational video. Use Peter's unique humor, voice, and personality throughout the script.
 Generate an initial video script outline for a video strictly less than 1 minute (ideally 57-58 seconds) about: {topic}.
 The narration should be in the humorous and recognizable style of Peter Griffin, suitable for text-to-speech.
 Make sure the script fits naturally into a video of about 57-58 seconds (strictly less than 1 minute, aim for 120-130 words).
 Key Points: {key_points or 'Comprehensive coverage'}
 Focus on the overall narrative and key sections, but do *not* include timestamps or detailed technical parameters yet."""
-        
-        raw_initial_output = self._generate_content(initial_prompt, self.system_prompt_initial)
-        initial_script = self._extract_json(raw_initial_output)
-        
-        segmentation_prompt = f"""
+    
+    def _segmentation_prompt(self, initial_script: Dict) -> str:
+        return f"""
 Here is the initial script draft:
 {json.dumps(initial_script, indent=2)}
 Now, segment this script into 5-10 second intervals, adding timestamps and all required audio/visual parameters. The total duration should be strictly less than 1 minute (ideally 57-58 seconds). The narration should maintain the Peter Griffin style and persona throughout, as if Peter himself is narrating the video.
 """
+    
+    def _cache_key(self, topic: str, key_points: Optional[List[str]]) -> str:
+        # The prompts fix the target length, so the requested duration is not part of the key
+        return ScriptCache.make_key(
+            topic, key_points, self.model_name,
+            [self.system_prompt_initial, self.system_prompt_segmentation]
+        )
+    
+    @staticmethod
+    def _cacheable(script: Dict) -> bool:
+        """Only cache scripts with narration segments; anything else would be replayed on every repeat topic"""
+        segments = script.get('audio_script')
+        return (
+            isinstance(segments, list) and bool(segments)
+            and all(isinstance(segment, dict) and str(segment.get('text', '')).strip() for segment in segments)
+        )
+    
+    def generate_script(self, topic: str, duration: int = 58, key_points: Optional[List[str]] = None) -> Dict:
+        """Blocking wrapper around generate_script_async for scripts and the CLI (not for use inside an event loop)"""
+        return asyncio.run(self.generate_script_async(topic, duration, key_points))
+    
+    async def generate_script_async(self, topic: str, duration: int = 58, key_points: Optional[List[str]] = None) -> Dict:
+        """Generate a segmented script with two Gemini calls, keeping cache disk I/O off the event loop"""
+        if self.cache:
+            cache_key = self._cache_key(topic, key_points)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+        
+        raw_initial_output = await self._generate_content_async(self._initial_prompt(topic, key_points), self.system_prompt_initial)
+        initial_script = self._extract_json(raw_initial_output)
         
-        raw_segmented_output = self._generate_content(segmentation_prompt, self.system_prompt_segmentation)
+        raw_segmented_output = await self._generate_content_async(self._segmentation_prompt(initial_script), self.system_prompt_segmentation)
         segmented_script = self._extract_json(raw_segmented_output)
         segmented_script['topic'] = initial_script['topic']
         
+        if self.cache and self._cacheable(segmented_script):
+            await asyncio.to_thread(self.cache.set, cache_key, segmented_script)
         return segmented_script
      
     def save_script(self, script: Dict, filename: str = None) -> str:
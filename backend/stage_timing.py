@@ -0,0 +1,204 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from config import settings
+from job_store import job_store
+from metrics import STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in execution order. "render" is the fused ffmpeg pass used by the
+# single-pass and render-cache paths, which replaces overlay + merge + burn.
+PIPELINE_STAGES = ("script", "tts", "subtitles", "overlay", "merge", "burn", "render")
+
+# Priors (seconds) for the ETA model until a stage has real samples
+DEFAULT_STAGE_SECONDS = {
+    "script": 15.0,
+    "tts": 20.0,
+    "subtitles": 0.1,
+    "overlay": 45.0,
+    "merge": 3.0,
+    "burn": 45.0,
+    "render": 45.0,
+}
+
+# Below this much reported progress, a stage's own rate is too noisy to extrapolate from
+MIN_PROGRESS_FOR_RATE = 0.05
+
+
+def planned_stages(render_cache_enabled: bool, compile_mode: str) -> Sequence[str]:
+    """Stages a job will run, in order, for the configured render path"""
+    if render_cache_enabled:
+        render = ("overlay", "render")
+    elif compile_mode == "single_pass":
+        render = ("render",)
+    else:
+        render = ("overlay", "merge", "burn")
+    return ("script", "tts", "subtitles") + render
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class StageStats:
+    """Rolling window of recent stage durations with percentile summaries"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def samples(self, stage: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(stage, ()))
+
+    def expected_seconds(self, stage: str) -> float:
+        """Rolling median duration of a stage, or a conservative prior before any samples exist"""
+        values = sorted(self.samples(stage))
+        if not values:
+            return DEFAULT_STAGE_SECONDS.get(stage, 0.0)
+        return percentile(values, 50)
+
+    def expected_total(self, stages: Sequence[str]) -> float:
+        return sum(self.expected_seconds(stage) for stage in stages)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """count, mean and p50/p95/p99 in seconds for every stage seen so far"""
+        with self._lock:
+            snapshot = {stage: sorted(values) for stage, values in self._samples.items()}
+        summary = {}
+        for stage in sorted(snapshot, key=lambda s: PIPELINE_STAGES.index(s) if s in PIPELINE_STAGES else len(PIPELINE_STAGES)):
+            values = snapshot[stage]
+            summary[stage] = {
+                "count": len(values),
+                "mean": round(sum(values) / len(values), 3),
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "p99": round(percentile(values, 99), 3),
+            }
+        return summary
+
+
+stage_stats = StageStats(settings.STAGE_TIMING_WINDOW)
+
+
+class JobTimer:
+    """
+    Wall-clock timing and ETA of one job's pipeline stages.
+
+    Each finished stage is saved on the job record as stage_timings and, when it
+    succeeded, added to the process-wide stage_stats window. While running, the
+    record also carries current_step and estimated_completion_at (epoch seconds),
+    so any worker can report the remaining time without sharing this object.
+
+    The ETA is the rolling median of every stage still to run, plus the remainder
+    of the current stage: extrapolated from its own rate when ffmpeg reports
+    progress, otherwise its median minus the time already spent.
+    """
+
+    def __init__(self, video_id: str, stages: Sequence[str] = PIPELINE_STAGES, stats: StageStats = stage_stats):
+        self.video_id = video_id
+        self.stages = tuple(stages)
+        self.stats = stats
+        self.durations: Dict[str, float] = {}
+        self.current_step: Optional[str] = None
+        self._started = time.perf_counter()
+        self._stage_started = self._started
+        self._stage_fraction: Optional[float] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        self.current_step = name
+        self._stage_started = time.perf_counter()
+        self._stage_fraction = None
+        self._save()
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            elapsed = time.perf_counter() - self._stage_started
+            self.durations[name] = round(elapsed, 3)
+            STAGE_DURATION.observe(elapsed, stage=name, outcome="success" if succeeded else "error")
+            if succeeded:
+                self.stats.record(name, elapsed)
+            logger.info(f"⏱️ Video {self.video_id}: {name} took {elapsed:.2f}s")
+            self._save()
+
+    def progress(self, fraction: float) -> Dict[str, Any]:
+        """
+        Report the completed fraction (0-1) of the current stage.
+        Returns the ETA fields to save with the status update that carries the progress.
+        """
+        self._stage_fraction = min(max(fraction, 0.0), 1.0)
+        return self.status_fields()
+
+    def estimate_remaining(self) -> float:
+        """Seconds until the job is expected to finish"""
+        now = time.perf_counter()
+        if self.current_step is None:
+            return self.stats.expected_total(self.stages)
+
+        stage_elapsed = now - self._stage_started
+        if self.current_step in self.durations:
+            current_remaining = 0.0  # Between stages
+        elif self._stage_fraction is not None and self._stage_fraction >= MIN_PROGRESS_FOR_RATE:
+            current_remaining = stage_elapsed * (1 - self._stage_fraction) / self._stage_fraction
+        else:
+            current_remaining = max(self.stats.expected_seconds(self.current_step) - stage_elapsed, 0.0)
+
+        if self.current_step in self.stages:
+            upcoming = self.stages[self.stages.index(self.current_step) + 1:]
+        else:
+            upcoming = ()
+        return current_remaining + self.stats.expected_total(upcoming)
+
+    def status_fields(self) -> Dict[str, Any]:
+        return {
+            "current_step": self.current_step,
+            "estimated_completion_at": round(time.time() + self.estimate_remaining(), 1),
+        }
+
+    def finish(self, succeeded: bool = True) -> float:
+        """Record the end-to-end pipeline time and return it in seconds"""
+        elapsed = time.perf_counter() - self._started
+        self.durations["total"] = round(elapsed, 3)
+        STAGE_DURATION.observe(elapsed, stage="total", outcome="success" if succeeded else "error")
+        if succeeded:
+            self.stats.record("total", elapsed)
+        self.current_step = None
+        self._save(finished=True)
+        return elapsed
+
+    def _save(self, finished: bool = False):
+        fields: Dict[str, Any] = {"stage_timings": dict(self.durations)}
+        if finished:
+            fields.update(current_step=None, estimated_completion_at=None)
+        else:
+            fields.update(self.status_fields())
+        try:
+            job_store.save(self.video_id, **fields)
+        except Exception as e:
+            logger.error(f"❌ Failed to save stage timings for {self.video_id}: {str(e)}")
+
+
+def estimated_remaining(record: Dict[str, Any]) -> Optional[int]:
+    """Seconds left for a job record, from the ETA its worker last saved"""
+    completion_at = record.get("estimated_completion_at")
+    if completion_at is None:
+        return None
+    return max(int(round(completion_at - time.time())), 0)
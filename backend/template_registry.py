@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from media_info import probe_media_sync
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = (".mp4", ".mov", ".mkv", ".webm")
+# templateN.mp4 is selectable by template_id N
+_TEMPLATE_ID_PATTERN = re.compile(r"^template(\d+)$")
+
+# Error of a TEMPLATE_NAMES entry whose file is not in TEMPLATES_DIR
+MISSING_FILE_ERROR = "File not found in TEMPLATES_DIR"
+
+# (size, mtime) per file name; a change in any of them triggers a rescan
+DirectorySignature = Dict[str, Tuple[int, int]]
+
+
+@dataclass(frozen=True)
+class TemplateInfo:
+    """A background video template and the metadata the render path needs"""
+    name: str
+    file: str
+    path: str
+    template_id: Optional[int]
+    size_bytes: int
+    mtime_ns: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    duration: Optional[float] = None
+    codec: Optional[str] = None
+    keyframe_interval: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return self.error is None
+
+    @property
+    def missing(self) -> bool:
+        return self.error == MISSING_FILE_ERROR
+
+    @property
+    def dimensions(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def as_dict(self) -> dict:
+        info = asdict(self)
+        info.pop("path")
+        info.pop("mtime_ns")
+        info["size_mb"] = round(self.size_bytes / (1024 * 1024), 1)
+        info["available"] = self.available
+        return info
+
+
+def _template_id(file: str) -> Optional[int]:
+    id_match = _TEMPLATE_ID_PATTERN.match(os.path.splitext(file)[0])
+    return int(id_match.group(1)) if id_match else None
+
+
+def _missing_template(name: str, file: str, path: str) -> TemplateInfo:
+    """Listing entry for a configured template whose file is absent, so the misconfiguration stays visible"""
+    return TemplateInfo(
+        name=name, file=file, path=path, template_id=_template_id(file),
+        size_bytes=0, mtime_ns=0, error=MISSING_FILE_ERROR,
+    )
+
+
+def _load_template(name: str, file: str, path: str, stat: os.stat_result) -> TemplateInfo:
+    """Probe one template file (header parse, ffprobe only for non-MP4 containers)"""
+    fields = dict(
+        name=name,
+        file=file,
+        path=path,
+        template_id=_template_id(file),
+        size_bytes=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+    )
+    info = probe_media_sync(path)
+    if info is None:
+        return TemplateInfo(**fields, error="Unreadable video file")
+    if not info.has_video or not info.width or not info.height:
+        return TemplateInfo(**fields, error="No video stream")
+    if not info.duration:
+        return TemplateInfo(**fields, error="Zero-length video")
+    return TemplateInfo(
+        **fields,
+        width=info.width,
+        height=info.height,
+        fps=info.fps,
+        duration=round(info.duration, 3),
+        codec=info.video_codec,
+        keyframe_interval=info.keyframe_interval,
+    )
+
+
+class TemplateRegistry:
+    """
+    In-memory index of TEMPLATES_DIR. Files are probed once when they appear or
+    change; lookups and listings never touch the disk. New templates are picked up
+    by polling the directory (a scandir per interval), no code edits needed.
+    """
+
+    def __init__(self, templates_dir: str, names: Dict[str, str]):
+        self.templates_dir = templates_dir
+        self.names = names  # Friendly name -> file; other files are named after their stem
+        self._templates: Dict[str, TemplateInfo] = {}
+        self._signature: DirectorySignature = {}
+        self._lock = threading.Lock()
+
+    def _signature_now(self) -> DirectorySignature:
+        signature = {}
+        if not os.path.isdir(self.templates_dir):
+            return signature
+        with os.scandir(self.templates_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(TEMPLATE_EXTENSIONS):
+                    stat = entry.stat()
+                    signature[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return signature
+
+    def scan(self) -> List[str]:
+        """
+        Re-probe new or changed files and drop removed ones. Configured names without
+        a file are kept as unavailable entries. Returns the names that changed.
+        """
+        signature = self._signature_now()
+        file_names = {file: name for name, file in self.names.items()}
+        with self._lock:
+            previous = {template.file: template for template in self._templates.values()}
+        templates: Dict[str, TemplateInfo] = {}
+        changed = []
+        for file, (size, mtime_ns) in sorted(signature.items()):
+            name = file_names.get(file, os.path.splitext(file)[0])
+            template = previous.get(file)
+            if template is None or (template.size_bytes, template.mtime_ns) != (size, mtime_ns):
+                path = os.path.join(self.templates_dir, file)
+                try:
+                    template = _load_template(name, file, path, os.stat(path))
+                except FileNotFoundError:
+                    continue
+                changed.append(name)
+                if template.available:
+                    logger.info(f"🎞️ Template {name}: {template.width}x{template.height} @ {template.fps}fps, {template.duration}s, {template.codec}")
+                else:
+                    logger.warning(f"⚠️ Template {name} ({file}) is unusable: {template.error}")
+            templates[name] = template
+        for name, file in self.names.items():
+            if name in templates:
+                continue
+            if not (previous.get(file) and previous[file].missing):
+                logger.warning(f"⚠️ Template {name} is configured as {file} but the file is not in {self.templates_dir}")
+            templates[name] = _missing_template(name, file, os.path.join(self.templates_dir, file))
+        removed = [
+            template.name for file, template in previous.items()
+            if file not in signature and not template.missing
+        ]
+        for name in removed:
+            logger.info(f"🗑️ Template {name} removed")
+        with self._lock:
+            self._templates = templates
+            self._signature = signature
+        return changed + removed
+
+    def changed(self) -> bool:
+        return self._signature_now() != self._signature
+
+    def get(self, name: str) -> Optional[TemplateInfo]:
+        with self._lock:
+            return self._templates.get(name)
+
+    def resolve(self, name: Optional[str] = None, template_id: Optional[int] = None) -> Optional[TemplateInfo]:
+        """Template by name, else by number (templateN.*); None if there is no such usable template"""
+        with self._lock:
+            if name:
+                template = self._templates.get(name)
+            else:
+                template = next((t for t in self._templates.values() if t.template_id == template_id), None)
+        return template if template and template.available else None
+
+    def list(self) -> List[TemplateInfo]:
+        with self._lock:
+            return sorted(self._templates.values(), key=lambda t: (t.template_id is None, t.template_id or 0, t.name))
+
+    async def watch(self, interval: float, on_change: Optional[Callable[[List[str]], Awaitable[None]]] = None):
+        """Poll the directory and rescan when files are added, removed or modified"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await asyncio.to_thread(self.changed):
+                    continue
+                changed = await asyncio.to_thread(self.scan)
+                if changed and on_change is not None:
+                    await on_change(changed)
+            except Exception as e:
+                logger.error(f"❌ Template reload failed: {str(e)}")
+
+
+template_registry = TemplateRegistry(settings.TEMPLATES_DIR, settings.TEMPLATE_NAMES)
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Settings are read at import time: point every directory at a scratch dir and use the
+# in-memory job store before any backend module is imported, so tests touch no real data
+_scratch = tempfile.mkdtemp(prefix="backend-tests-")
+for _name in ("UPLOAD_DIR", "OUTPUT_DIR", "TEMPLATES_DIR", "ASSETS_DIR"):
+    os.environ[_name] = os.path.join(_scratch, _name.lower())
+os.environ["JOB_STORE_BACKEND"] = "memory"
@@ -0,0 +1,73 @@
+import pytest
+
+from captions import Cues, cues_from_segments, format_srt_time, format_timestamps, parse_srt
+
+
+@pytest.mark.parametrize("offset_ms, srt, ass", [
+    (0, "00:00:00,000", "0:00:00.00"),
+    (2999, "00:00:02,999", "0:00:02.99"),
+    (61_005, "00:01:01,005", "0:01:01.00"),
+    (3_723_450, "01:02:03,450", "1:02:03.45"),
+])
+def test_format_timestamps(offset_ms, srt, ass):
+    assert format_timestamps([offset_ms]) == [srt]
+    assert format_timestamps([offset_ms], ass=True) == [ass]
+
+
+def test_format_srt_time_rounds_to_milliseconds():
+    # 2.9999s must not truncate to 00:00:02,999 through float error
+    assert format_srt_time(2.9999) == "00:00:03,000"
+    assert format_srt_time(0.1 + 0.2) == "00:00:00,300"
+
+
+def test_to_srt():
+    cues = Cues([0, 1500], [1500, 3000], ["Hello there", "General Kenobi"])
+    assert cues.to_srt() == (
+        "1\n00:00:00,000 --> 00:00:01,500\nHello there\n\n"
+        "2\n00:00:01,500 --> 00:00:03,000\nGeneral Kenobi\n"
+    )
+    assert Cues().to_srt() == ""
+
+
+def test_to_srt_wraps_long_lines():
+    text = "one two three four five six seven eight nine ten eleven twelve"
+    srt = Cues([0], [1000], [text]).to_srt()
+    assert all(len(line) <= 40 for line in srt.splitlines())
+
+
+def test_to_ass_escapes_overrides_and_line_breaks():
+    ass = Cues([0], [2500], ["{bold}\nnext"]).to_ass()
+    assert "PlayResX: 384\nPlayResY: 288\n" in ass
+    assert ass.endswith("Dialogue: 0,0:00:00.00,0:00:02.50,Default,,0,0,0,,\\{bold\\}\\Nnext\n")
+
+
+def test_parse_srt_round_trip():
+    cues = Cues([0, 1234], [1234, 3_723_450], ["First cue", "Second\ncue"])
+    parsed = parse_srt(cues.to_srt())
+    assert list(parsed) == list(cues)
+
+
+def test_parse_srt_tolerates_bom_crlf_and_dot_separator():
+    content = "\ufeff1\r\n00:00:01.250 --> 00:00:02.500\r\nDot separated\r\n\r\n"
+    assert list(parse_srt(content)) == [(1250, 2500, "Dot separated")]
+
+
+def test_parse_srt_drops_invalid_blocks():
+    content = (
+        "1\nnot a timing line\nText\n\n"
+        "2\n00:00:01,000 --> 00:00:02,000\n\n\n"
+        "3\n00:00:03,000 --> 00:00:04,000\nKept\n"
+    )
+    assert list(parse_srt(content)) == [(3000, 4000, "Kept")]
+
+
+def test_cues_from_segments_spans_the_duration():
+    cues = cues_from_segments(["a b c", "d e f g h i j k l"], duration=10.0, words_per_cue=4)
+    assert cues.texts == ["a b c", "d e f g", "h i j k", "l"]
+    assert cues.starts[0] == 0 and cues.ends[-1] == 10_000
+    assert list(cues.starts[1:]) == list(cues.ends[:-1])
+
+
+def test_cues_from_segments_without_duration_uses_fixed_length():
+    cues = cues_from_segments(["a b", "c"], words_per_cue=8, seconds_per_cue=3.0)
+    assert list(cues) == [(0, 3000, "a b"), (3000, 6000, "c")]
@@ -0,0 +1,69 @@
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from config import settings
+from downloads import RangeNotSatisfiable, _etag_matches, parse_range, sign_video_url, strong_etag, verify_video_signature
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=0-", (0, 999)),
+    ("bytes=500-", (500, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    (" bytes=10-20 ", (10, 20)),
+    ("bytes=999-999", (999, 999)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "",
+    "bytes=-",
+    "bytes=20-10",
+    "bytes=0-10,20-30",
+    "items=0-10",
+    "bytes=a-b",
+])
+def test_parse_range_ignores_malformed_and_multi_range(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=1000-2000", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=-10", 0),
+    ("bytes=0-", 0),
+])
+def test_parse_range_not_satisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
+
+
+def test_etag_matches():
+    etag = strong_etag("abc")
+    assert etag == '"abc"'
+    assert _etag_matches('"abc"', etag)
+    assert _etag_matches('W/"abc"', etag)
+    assert _etag_matches('"x", "abc"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('"abcd"', etag)
+
+
+def test_signed_urls(monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_SIGNING_KEY", "test-key")
+    url, expires = sign_video_url("video_1", ttl_seconds=60)
+    query = parse_qs(urlsplit(url).query)
+    assert int(query["expires"][0]) == expires
+    signature = query["signature"][0]
+    assert verify_video_signature("video_1", expires, signature)
+    assert not verify_video_signature("video_2", expires, signature)
+    assert not verify_video_signature("video_1", expires + 1, signature)
+    assert not verify_video_signature("video_1", int(time.time()) - 1, signature)
+    monkeypatch.setattr(settings, "DOWNLOAD_SIGNING_KEY", "")
+    assert not verify_video_signature("video_1", expires, signature)
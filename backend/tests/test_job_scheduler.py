@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from job_scheduler import JobScheduler, QueueFullError, SchedulerUnavailableError
+from models import BatchVideoRequest, VideoRequest
+
+
+def make_scheduler(max_queue_size: int = 10, workers: int = 1, render_limit: int = 1) -> JobScheduler:
+    return JobScheduler(max_queue_size=max_queue_size, workers=workers, stage_limits={"render": render_limit})
+
+
+async def hold(event: asyncio.Event):
+    await event.wait()
+
+
+def test_submit_requires_a_running_scheduler():
+    async def scenario():
+        scheduler = make_scheduler()
+        with pytest.raises(SchedulerUnavailableError):
+            scheduler.submit("job", hold, asyncio.Event())
+
+    asyncio.run(scenario())
+
+
+def test_lower_priority_values_run_first_in_submission_order():
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.start()
+        order = []
+
+        async def record(name: str):
+            order.append(name)
+
+        blocker = asyncio.Event()
+        scheduler.submit("blocker", hold, blocker)
+        await asyncio.sleep(0)  # The single worker picks up the blocker; the rest queue behind it
+        positions = [
+            scheduler.submit("low_a", record, "low_a", priority=9),
+            scheduler.submit("high", record, "high", priority=0),
+            scheduler.submit("mid", record, "mid", priority=5),
+            scheduler.submit("low_b", record, "low_b", priority=9),
+        ]
+        assert positions == [1, 1, 2, 4]
+        assert [scheduler.queue_position(job) for job in ("high", "mid", "low_a", "low_b")] == [1, 2, 3, 4]
+        assert scheduler.queue_depth == 4 and scheduler.running_jobs == 1
+
+        blocker.set()
+        await scheduler._queue.join()
+        await scheduler.stop()
+        assert order == ["high", "mid", "low_a", "low_b"]
+        assert scheduler.queue_position("high") is None
+
+    asyncio.run(scenario())
+
+
+def test_null_priority_is_rejected_without_breaking_the_queue():
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.start()
+        blocker = asyncio.Event()
+        scheduler.submit("running", hold, blocker)
+        await asyncio.sleep(0)
+        with pytest.raises(TypeError):
+            scheduler.submit("null", hold, blocker, priority=None)
+        assert scheduler.submit("next", hold, blocker, priority=5) == 1
+        assert scheduler.queue_position("next") == 1
+        blocker.set()
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_request_models_reject_null_priority():
+    assert VideoRequest(prompt="black holes").priority == 5
+    with pytest.raises(ValidationError):
+        VideoRequest(prompt="black holes", priority=None)
+    with pytest.raises(ValidationError):
+        BatchVideoRequest(videos=[{"prompt": "black holes", "priority": None}])
+
+
+def test_queue_full():
+    async def scenario():
+        scheduler = make_scheduler(max_queue_size=1)
+        await scheduler.start()
+        blocker = asyncio.Event()
+        scheduler.submit("running", hold, blocker)
+        await asyncio.sleep(0)
+        scheduler.submit("waiting", hold, blocker)
+        with pytest.raises(QueueFullError):
+            scheduler.submit("rejected", hold, blocker)
+        blocker.set()
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failing_job_does_not_stop_the_worker():
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.start()
+        done = asyncio.Event()
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def succeed():
+            done.set()
+
+        scheduler.submit("bad", fail)
+        scheduler.submit("good", succeed)
+        await asyncio.wait_for(done.wait(), timeout=1)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stage_limits_concurrency():
+    async def scenario():
+        scheduler = make_scheduler(workers=4, render_limit=2)
+        peak = 0
+
+        async def render():
+            nonlocal peak
+            async with scheduler.stage("render"):
+                peak = max(peak, scheduler.stage_active("render"))
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(render() for _ in range(6)))
+        assert peak == 2
+        assert scheduler.stage_active("render") == 0
+
+    asyncio.run(scenario())
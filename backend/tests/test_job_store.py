@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from job_store import DuplicateKeyError, MemoryJobStore, SQLiteJobStore, current_worker, worker_alive
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryJobStore()
+    else:
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        yield store
+        store.close()
+
+
+def ago(**delta) -> str:
+    return (datetime.now() - timedelta(**delta)).isoformat()
+
+
+def test_save_merges_fields_and_keeps_created_at(store):
+    first = store.save("a", status="pending", progress=0, message="queued", prompt="black holes")
+    record = store.save("a", status="processing", progress=40, message="tts")
+    assert record["created_at"] == first["created_at"]
+    assert record["prompt"] == "black holes"
+    assert (record["status"], record["progress"], record["message"]) == ("processing", 40, "tts")
+    assert store.get("a") == record
+    assert store.get("missing") is None
+
+
+def test_save_without_touch_keeps_updated_at(store):
+    store.save("a", status="completed", updated_at="2020-01-01T00:00:00")
+    record = store.save("a", touch=False, last_accessed_at=123.0)
+    assert record["updated_at"] == "2020-01-01T00:00:00"
+    assert record["last_accessed_at"] == 123.0
+    assert store.save("a", message="changed")["updated_at"] > "2020-01-01T00:00:00"
+
+
+def test_idempotency_key_is_unique_and_findable(store):
+    store.save("a", status="pending", idempotency_key="key-1")
+    assert store.find("idempotency_key", "key-1")["video_id"] == "a"
+    assert store.find("idempotency_key", "key-2") is None
+    with pytest.raises(DuplicateKeyError):
+        store.save("b", status="pending", idempotency_key="key-1")
+    # Re-saving the owner with its own key is not a conflict
+    store.save("a", progress=10, idempotency_key="key-1")
+
+
+def test_releasing_an_idempotency_key(store):
+    store.save("a", status="pending", idempotency_key="key-1")
+    store.save("a", idempotency_key=None)
+    assert store.find("idempotency_key", "key-1") is None
+    store.save("b", status="pending", idempotency_key="key-1")
+
+
+def test_prune_removes_only_old_finished_jobs(store):
+    store.save("old_done", status="completed", updated_at=ago(days=2))
+    store.save("old_failed", status="failed", updated_at=ago(days=2))
+    store.save("old_running", status="processing", updated_at=ago(days=2))
+    store.save("new_done", status="completed")
+    assert store.prune(ttl_seconds=24 * 3600) == 2
+    assert {record["video_id"] for record in store.list()} == {"old_running", "new_done"}
+
+
+def test_list_is_newest_first_and_filters(store):
+    store.save("a", status="completed", created_at=ago(minutes=3))
+    store.save("b", status="pending", created_at=ago(minutes=2))
+    store.save("c", status="completed", created_at=ago(minutes=1))
+    assert [r["video_id"] for r in store.list()] == ["c", "b", "a"]
+    assert [r["video_id"] for r in store.list(status="completed", limit=1)] == ["c"]
+    assert store.count() == 3
+    assert store.delete("b") and not store.delete("b")
+
+
+def test_fail_interrupted(store):
+    store.save("live", status="processing", worker=current_worker(), idempotency_key="k-live")
+    store.save("orphan", status="processing", idempotency_key="k-orphan")
+    store.save("previous_run", status="pending", worker=current_worker().split(":")[0] + ":old-boot")
+    store.save("stale", status="processing", worker=current_worker(), updated_at=ago(hours=7))
+    store.save("done", status="completed")
+
+    assert sorted(store.fail_interrupted("Interrupted by restart")) == ["orphan", "previous_run"]
+    orphan = store.get("orphan")
+    assert (orphan["status"], orphan["error"]) == ("failed", "Interrupted by restart")
+    assert store.find("idempotency_key", "k-orphan") is None
+    assert store.get("live")["status"] == "processing"
+
+    assert store.fail_interrupted("Timed out", stale_seconds=6 * 3600) == ["stale"]
+    assert store.get("live")["status"] == "processing"
+    assert store.get("done")["status"] == "completed"
+
+
+def test_worker_alive():
+    assert worker_alive(current_worker())
+    assert not worker_alive(None)
+    assert not worker_alive("not-a-pid:x")
+    assert not worker_alive(current_worker().split(":")[0] + ":another-boot")
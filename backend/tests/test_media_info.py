@@ -0,0 +1,148 @@
+import json
+import struct
+
+import pytest
+
+from media_info import _from_ffprobe, container_format, mp3_audio_frames, probe_media_sync
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz: 1152 samples in 144 * 128000 / 44100 = 417 bytes
+MP3_FRAME_LENGTH = 417
+MP3_BITRATE = 128_000
+
+
+# --- MP4 fixtures ------------------------------------------------------------
+
+def box(kind: bytes, *payload: bytes) -> bytes:
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def full_box(kind: bytes, *payload: bytes) -> bytes:
+    return box(kind, b"\x00\x00\x00\x00", *payload)
+
+
+def track(handler: bytes, codec: bytes, timescale: int, duration: int, samples: int,
+          size=(0, 0), sync_samples=None) -> bytes:
+    # Sample entry: reserved(6) + data reference index(2) + 16 bytes, then width/height
+    entry = box(codec, bytes(6), b"\x00\x01", bytes(16), struct.pack(">HH", *size), bytes(50))
+    stbl = [
+        full_box(b"stsd", struct.pack(">I", 1), entry),
+        full_box(b"stts", struct.pack(">III", 1, samples, duration // samples)),
+    ]
+    if sync_samples is not None:
+        stbl.append(full_box(b"stss", struct.pack(">I", sync_samples), bytes(4 * sync_samples)))
+    return box(b"trak", box(
+        b"mdia",
+        full_box(b"mdhd", struct.pack(">IIII", 0, 0, timescale, duration), bytes(4)),
+        full_box(b"hdlr", bytes(4), handler, bytes(12), b"\x00"),
+        box(b"minf", box(b"stbl", *stbl)),
+    ))
+
+
+def mp4_file(path, moov_first=True) -> str:
+    moov = box(
+        b"moov",
+        full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, 10_000), bytes(80)),
+        track(b"vide", b"avc1", 12_800, 128_000, 250, size=(1080, 1920), sync_samples=5),
+        track(b"soun", b"mp4a", 44_100, 441_000, 430),
+    )
+    ftyp = box(b"ftyp", b"isom", struct.pack(">I", 512), b"isomavc1")
+    mdat = box(b"mdat", bytes(4096))
+    path.write_bytes(ftyp + (moov + mdat if moov_first else mdat + moov))
+    return str(path)
+
+
+@pytest.mark.parametrize("moov_first", [True, False])
+def test_parse_mp4(tmp_path, moov_first):
+    info = probe_media_sync(mp4_file(tmp_path / "clip.mp4", moov_first))
+    assert info.source == "mp4"
+    assert info.duration == 10.0
+    assert (info.width, info.height) == (1080, 1920)
+    assert info.video_codec == "h264" and info.audio_codec == "aac"
+    assert info.fps == 25.0
+    assert info.keyframe_interval == 50.0
+
+
+def test_parse_mp4_without_stss_treats_every_sample_as_keyframe(tmp_path):
+    moov = box(
+        b"moov",
+        full_box(b"mvhd", struct.pack(">IIII", 0, 0, 600, 1200), bytes(80)),
+        track(b"vide", b"hvc1", 600, 1200, 60, size=(640, 360)),
+    )
+    path = tmp_path / "intra.mov"
+    path.write_bytes(box(b"ftyp", b"qt  ", bytes(4)) + moov)
+    info = probe_media_sync(str(path))
+    assert info.video_codec == "hevc" and not info.has_audio
+    assert info.fps == 30.0 and info.keyframe_interval == 1.0
+
+
+# --- MP3 fixtures ------------------------------------------------------------
+
+def mp3_frame(payload: bytes = b"") -> bytes:
+    # Sync + MPEG-1 Layer III without CRC, bitrate index 9 (128k), 44.1 kHz, joint stereo
+    header = b"\xff\xfb\x90\x44"
+    return header + payload + bytes(MP3_FRAME_LENGTH - 4 - len(payload))
+
+
+def id3v2_tag(size: int) -> bytes:
+    syncsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x03\x00\x00" + syncsafe + bytes(size)
+
+
+def xing_frame(kind: bytes, frames: int) -> bytes:
+    # Stereo MPEG-1 side info is 32 bytes; flag 0x1 means the frame count is present
+    return mp3_frame(bytes(32) + kind + struct.pack(">II", 1, frames))
+
+
+def test_parse_cbr_mp3(tmp_path):
+    path = tmp_path / "cbr.mp3"
+    path.write_bytes(mp3_frame() * 100)
+    info = probe_media_sync(str(path))
+    assert info.source == "mp3" and info.audio_codec == "mp3" and not info.has_video
+    assert info.duration == round(100 * MP3_FRAME_LENGTH * 8 / MP3_BITRATE, 3)
+
+
+@pytest.mark.parametrize("kind", [b"Xing", b"Info"])
+def test_parse_mp3_frame_count_from_header_frame(tmp_path, kind):
+    path = tmp_path / "vbr.mp3"
+    path.write_bytes(id3v2_tag(300) + xing_frame(kind, 100) + mp3_frame() * 100)
+    assert probe_media_sync(str(path)).duration == round(100 * 1152 / 44100, 3)
+
+
+def test_mp3_audio_frames_excludes_tags_and_header_frame(tmp_path):
+    path = tmp_path / "tagged.mp3"
+    tag = id3v2_tag(300)
+    audio = mp3_frame() * 10
+    path.write_bytes(tag + xing_frame(b"Info", 10) + audio + b"TAG" + bytes(125))
+    start, end = mp3_audio_frames(str(path))
+    assert start == len(tag) + MP3_FRAME_LENGTH
+    assert end - start == len(audio)
+
+
+def test_unrecognized_files(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"just some text, not media" * 10)
+    assert mp3_audio_frames(str(path)) is None
+    assert container_format(str(path)) is None
+
+
+def test_container_format(tmp_path):
+    mkv = tmp_path / "clip.webm"
+    mkv.write_bytes(b"\x1a\x45\xdf\xa3" + bytes(60))
+    assert container_format(str(mkv)) == "matroska"
+    assert container_format(mp4_file(tmp_path / "clip.mp4")) == "mov"
+
+
+def test_from_ffprobe():
+    output = json.dumps({
+        "format": {"duration": "12.5"},
+        "streams": [
+            {"codec_type": "video", "codec_name": "vp9", "width": 1280, "height": 720, "avg_frame_rate": "30000/1001"},
+            {"codec_type": "audio", "codec_name": "opus"},
+        ],
+    })
+    info = _from_ffprobe(output)
+    assert info.duration == 12.5
+    assert (info.width, info.height, info.video_codec, info.audio_codec) == (1280, 720, "vp9", "opus")
+    assert info.fps == pytest.approx(29.97, abs=0.01)
+    assert _from_ffprobe("not json") is None
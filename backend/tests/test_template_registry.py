@@ -0,0 +1,19 @@
+from template_registry import TemplateRegistry
+
+
+def test_configured_template_missing_on_disk_is_listed_as_unavailable(tmp_path, caplog):
+    registry = TemplateRegistry(str(tmp_path), {"minecraft": "template1.mp4"})
+    with caplog.at_level("WARNING"):
+        assert registry.scan() == []
+    assert "minecraft" in caplog.text and "template1.mp4" in caplog.text
+
+    [template] = registry.list()
+    assert template.missing and not template.available
+    assert template.as_dict()["available"] is False and template.as_dict()["template_id"] == 1
+    assert registry.resolve(template_id=1) is None
+
+    # Still missing on the next scan: no repeat warning and nothing reported as removed
+    caplog.clear()
+    with caplog.at_level("WARNING"):
+        assert registry.scan() == []
+    assert caplog.text == ""
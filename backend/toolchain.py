@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import FrozenSet, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Picked in order when VIDEO_ENCODER is "auto". Hardware encoders are listed by
+# `ffmpeg -encoders` even without a usable device, so they are only used when named explicitly.
+AUTO_VIDEO_ENCODERS = ("libx264", "libopenh264", "mpeg4")
+HARDWARE_VIDEO_ENCODERS = ("h264_nvenc", "h264_qsv", "h264_videotoolbox")
+AUDIO_ENCODERS = ("aac", "libfdk_aac", "libmp3lame")
+
+# The subtitles= filter only exists when ffmpeg is built with libass
+SUBTITLES_FILTER = "subtitles"
+
+_VERSION_PATTERN = re.compile(r"version\s+(\S+)")
+# " V....D libx264    libx264 H.264 / AVC ..." and " TSC subtitles   V->V   Render text subtitles ..."
+_CAPABILITY_LINE = re.compile(r"^\s*([A-Z.|]{3,6})\s+(\S+)\s")
+
+
+@dataclass(frozen=True)
+class Toolchain:
+    """What the installed ffmpeg/ffprobe can do, detected once at startup"""
+    ffmpeg_version: Optional[str] = None
+    ffprobe_version: Optional[str] = None
+    encoders: FrozenSet[str] = field(default_factory=frozenset)
+    filters: FrozenSet[str] = field(default_factory=frozenset)
+    threads: int = os.cpu_count() or 1
+    detected: bool = False
+    detected_at: Optional[float] = None
+
+    @property
+    def ffmpeg_available(self) -> bool:
+        return self.ffmpeg_version is not None
+
+    @property
+    def ffprobe_available(self) -> bool:
+        return self.ffprobe_version is not None
+
+    def _assume(self, name: str, available: FrozenSet[str]) -> bool:
+        # Until detection has run, assume a standard build rather than degrade every render
+        return name in available or not self.detected
+
+    @property
+    def video_encoder(self) -> Optional[str]:
+        requested = settings.VIDEO_ENCODER
+        if requested != "auto" and self._assume(requested, self.encoders):
+            return requested
+        return next((name for name in AUTO_VIDEO_ENCODERS if self._assume(name, self.encoders)), None)
+
+    @property
+    def audio_encoder(self) -> Optional[str]:
+        return next((name for name in AUDIO_ENCODERS if self._assume(name, self.encoders)), None)
+
+    @property
+    def burn_subtitles(self) -> bool:
+        """Whether subtitles can be burned in; otherwise they are muxed as a soft subtitle track"""
+        return self._assume(SUBTITLES_FILTER, self.filters)
+
+    def problems(self) -> List[str]:
+        issues = []
+        if not self.detected:
+            return issues
+        if not self.ffmpeg_available:
+            issues.append("ffmpeg not found - videos are mock compiled")
+        if not self.ffprobe_available:
+            issues.append("ffprobe not found - only MP3/MP4 files can be probed")
+        if self.ffmpeg_available:
+            if self.video_encoder != "libx264":
+                issues.append(f"libx264 not available - encoding with {self.video_encoder or 'nothing'}")
+            if settings.VIDEO_ENCODER != "auto" and settings.VIDEO_ENCODER not in self.encoders:
+                issues.append(f"VIDEO_ENCODER {settings.VIDEO_ENCODER} not available")
+            if self.audio_encoder != "aac":
+                issues.append(f"aac encoder not available - encoding audio with {self.audio_encoder or 'nothing'}")
+            if not self.burn_subtitles:
+                issues.append("subtitles filter (libass) not available - subtitles are added as a soft track")
+        return issues
+
+    def as_dict(self) -> dict:
+        info = asdict(self)
+        info["encoders"] = sorted(name for name in self.encoders if name in AUTO_VIDEO_ENCODERS + HARDWARE_VIDEO_ENCODERS + AUDIO_ENCODERS)
+        info["filters"] = sorted(name for name in self.filters if name in (SUBTITLES_FILTER, "overlay", "scale", "ass"))
+        info.update(
+            ffmpeg_available=self.ffmpeg_available,
+            video_encoder=self.video_encoder,
+            audio_encoder=self.audio_encoder,
+            burn_subtitles=self.burn_subtitles,
+            encoding_threads=settings.ENCODING_THREADS or "auto",
+            problems=self.problems(),
+        )
+        return info
+
+
+def _parse_version(output: Optional[str]) -> Optional[str]:
+    match = _VERSION_PATTERN.search(output or "")
+    return match.group(1) if match else None
+
+
+def _parse_capabilities(output: Optional[str]) -> FrozenSet[str]:
+    """Names from `ffmpeg -encoders` / `ffmpeg -filters` listings"""
+    names = set()
+    for line in (output or "").splitlines():
+        match = _CAPABILITY_LINE.match(line)
+        if match and match.group(2) != "=":
+            names.add(match.group(2))
+    return frozenset(names)
+
+
+async def _capture(cmd: List[str], operation: str) -> Optional[str]:
+    from video_compiler import _run_command
+    try:
+        result = await _run_command(cmd, check=False, capture_output=True, operation=operation)
+    except FileNotFoundError:
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+async def detect_toolchain() -> Toolchain:
+    """Run the four capability queries concurrently"""
+    ffmpeg_version, ffprobe_version, encoders, filters = await asyncio.gather(
+        _capture(["ffmpeg", "-hide_banner", "-version"], "version"),
+        _capture(["ffprobe", "-hide_banner", "-version"], "version"),
+        _capture(["ffmpeg", "-hide_banner", "-encoders"], "list_encoders"),
+        _capture(["ffmpeg", "-hide_banner", "-filters"], "list_filters"),
+    )
+    return Toolchain(
+        ffmpeg_version=_parse_version(ffmpeg_version),
+        ffprobe_version=_parse_version(ffprobe_version),
+        encoders=_parse_capabilities(encoders),
+        filters=_parse_capabilities(filters),
+        threads=os.cpu_count() or 1,
+        detected=True,
+        detected_at=time.time(),
+    )
+
+
+class ToolchainRegistry:
+    """Holds the detected toolchain; `current` never spawns a process"""
+
+    def __init__(self):
+        self._toolchain = Toolchain()
+
+    @property
+    def current(self) -> Toolchain:
+        return self._toolchain
+
+    async def detect(self) -> Toolchain:
+        self._toolchain = await detect_toolchain()
+        toolchain = self._toolchain
+        if toolchain.ffmpeg_available:
+            logger.info(
+                f"🛠️ ffmpeg {toolchain.ffmpeg_version}: video encoder {toolchain.video_encoder}, "
+                f"audio encoder {toolchain.audio_encoder}, subtitles {'burned' if toolchain.burn_subtitles else 'soft track'}, "
+                f"{toolchain.threads} CPU threads"
+            )
+        for problem in toolchain.problems():
+            logger.warning(f"⚠️ {problem}")
+        return toolchain
+
+
+toolchain = ToolchainRegistry()
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import shutil
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import aiofiles
+import httpx
+
+from cache import DiskCache, content_key
+from config import settings
+from job_scheduler import scheduler
+from metrics import track_external_call
+from video_compiler import concat_audio_files
+
+logger = logging.getLogger(__name__)
+
+ELEVENLABS_TTS_URL = "https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio, bounded by total size with LRU eviction.
+    Keys cover everything that changes the audio: text, voice, model, settings and format.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl_seconds: int):
+        self.disk = DiskCache(cache_dir, max_bytes=max_bytes, ttl_seconds=ttl_seconds, suffix=".mp3", name="tts")
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, model_id: Optional[str], voice_settings: Optional[Dict[str, Any]], output_format: Optional[str]) -> str:
+        return content_key("tts", text, voice_id, model_id, voice_settings or {}, output_format)
+
+    def copy_to(self, key: str, output_path: str) -> bool:
+        """Place a cached entry at output_path. Returns False on a miss."""
+        cached_path = self.disk.get_path(key)
+        if cached_path is None:
+            return False
+        _link_or_copy(cached_path, output_path)
+        return True
+
+    def store(self, key: str, audio_path: str):
+        """Add a freshly synthesized file to the cache (the original stays in place)"""
+        temp_path = f"{self.disk.path_for(key)}.{os.getpid()}.tmp"
+        _link_or_copy(audio_path, temp_path)
+        self.disk.put_file(key, temp_path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.disk.stats.as_dict(), "size_bytes": self.disk.size_bytes()}
+
+
+def _link_or_copy(source_path: str, target_path: str):
+    """Hard-link when possible (no extra disk space), otherwise copy"""
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+
+
+tts_cache = TTSCache(
+    settings.TTS_CACHE_DIR,
+    max_bytes=settings.TTS_CACHE_MAX_BYTES,
+    ttl_seconds=settings.TTS_CACHE_TTL_SECONDS,
+) if settings.TTS_CACHE_ENABLED else None
+
+
+async def stream_to_file(chunks: AsyncIterator[bytes], output_path: str) -> int:
+    """
+    Write an async byte stream to output_path chunk by chunk, so memory stays flat
+    regardless of audio length. Data goes to a .part file that is atomically renamed
+    into place once complete. Returns the number of bytes written.
+    """
+    temp_path = f"{output_path}.part"
+    written = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as f:
+            async for chunk in chunks:
+                if chunk:
+                    await f.write(chunk)
+                    written += len(chunk)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return written
+
+
+async def _synthesize_cached(key: str, output_path: str, synthesize: Callable[[], AsyncIterator[bytes]]) -> bool:
+    """
+    Write audio for key to output_path, calling synthesize only on a cache miss.
+    Every provider call holds a slot of the scheduler's tts stage, so
+    MAX_CONCURRENT_TTS_REQUESTS caps in-flight calls across all jobs and segments.
+    Returns True when the audio came from the cache.
+    """
+    if tts_cache and tts_cache.copy_to(key, output_path):
+        logger.info(f"♻️ TTS cache hit, reused audio for {os.path.basename(output_path)}")
+        return True
+
+    async with scheduler.stage("tts"):
+        with track_external_call("elevenlabs", "text_to_speech"):
+            await stream_to_file(synthesize(), output_path)
+
+    if tts_cache:
+        tts_cache.store(key, output_path)
+    return False
+
+
+async def synthesize_with_sdk(
+    client,
+    text: str,
+    output_path: str,
+    voice_id: str,
+    model_id: str,
+    voice_settings: Dict[str, Any],
+    output_format: str,
+) -> bool:
+    """Synthesize text with the ElevenLabs SDK (AsyncElevenLabs), going through the TTS cache"""
+    def synthesize() -> AsyncIterator[bytes]:
+        return client.text_to_speech.convert(
+            voice_id=voice_id,
+            text=text,
+            output_format=output_format,
+            model_id=model_id,
+            voice_settings=voice_settings
+        )
+
+    key = TTSCache.make_key(text, voice_id, model_id, voice_settings, output_format)
+    return await _synthesize_cached(key, output_path, synthesize)
+
+
+async def synthesize_segments(
+    client,
+    segments: List[str],
+    output_path: str,
+    voice_id: str,
+    model_id: str,
+    voice_settings: Dict[str, Any],
+    output_format: str,
+) -> int:
+    """
+    Synthesize script segments concurrently and join them into one track at output_path.
+    Concurrency is bounded by the tts stage per provider call (see _synthesize_cached).
+    Each segment is cached on its own, so an edited script only re-synthesizes the
+    segments that changed. Returns the number of segments served from the cache.
+    """
+    segments = [segment.strip() for segment in segments if segment and segment.strip()]
+    if not segments:
+        raise ValueError("No text segments to synthesize")
+
+    base_path, extension = os.path.splitext(output_path)
+    segment_paths = [f"{base_path}_seg{index:03d}{extension}" for index in range(len(segments))]
+
+    def synthesize_one(text: str, segment_path: str):
+        return synthesize_with_sdk(
+            client, text, segment_path,
+            voice_id=voice_id,
+            model_id=model_id,
+            voice_settings=voice_settings,
+            output_format=output_format
+        )
+
+    try:
+        # A TaskGroup cancels the other segments as soon as one fails, so none is still
+        # writing its file when the cleanup below deletes it
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(synthesize_one(text, path)) for text, path in zip(segments, segment_paths)]
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0]
+        cached = [task.result() for task in tasks]
+        if len(segment_paths) == 1:
+            os.replace(segment_paths[0], output_path)
+        else:
+            await concat_audio_files(segment_paths, output_path)
+    finally:
+        for segment_path in segment_paths:
+            if os.path.exists(segment_path):
+                os.remove(segment_path)
+
+    cache_hits = sum(cached)
+    logger.info(f"🎤 Synthesized {len(segments)} segments ({cache_hits} from cache) into {os.path.basename(output_path)}")
+    return cache_hits
+
+
+async def synthesize_with_http(
+    text: str,
+    output_path: str,
+    voice_id: str,
+    voice_settings: Dict[str, Any],
+    api_key: str,
+    http_client: httpx.AsyncClient,
+) -> bool:
+    """Synthesize text with the ElevenLabs REST API over the shared HTTP client, going through the TTS cache"""
+    async def synthesize() -> AsyncIterator[bytes]:
+        headers = {
+            "xi-api-key": api_key,
+            "Content-Type": "application/json"
+        }
+        data = {
+            "text": text,
+            "voice_settings": voice_settings
+        }
+        async with http_client.stream("POST", ELEVENLABS_TTS_URL.format(voice_id=voice_id), headers=headers, json=data) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise RuntimeError(f"ElevenLabs API error: {response.text}")
+            async for chunk in response.aiter_bytes():
+                yield chunk
+
+    # The REST call uses the API's default model and output format
+    key = TTSCache.make_key(text, voice_id, None, voice_settings, None)
+    return await _synthesize_cached(key, output_path, synthesize)
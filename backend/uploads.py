@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import aiofiles
+from PIL import Image, UnidentifiedImageError
+
+from config import settings
+from ids import ulid
+from job_scheduler import scheduler
+from media_info import container_format, probe_media
+from template_registry import TemplateInfo, template_registry
+from toolchain import toolchain
+from video_compiler import normalize_to_mezzanine
+
+logger = logging.getLogger(__name__)
+
+# Upload names become file names, so keep them to a safe slug
+UPLOAD_NAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+INCOMING_DIR = os.path.join(settings.UPLOAD_DIR, "incoming")
+# ffmpeg demuxers accepted for templates: MP4/MOV and MKV/WebM
+TEMPLATE_CONTAINERS = {"mov", "matroska"}
+# Chunks from the socket are small; batch them into larger disk writes
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """The upload was rejected; status_code is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def validate_upload_name(name: str) -> str:
+    if not UPLOAD_NAME_PATTERN.match(name):
+        raise UploadError("Name must be 1-64 lowercase letters, digits, '-' or '_'")
+    return name
+
+
+async def receive_upload(chunks: AsyncIterator[bytes], max_bytes: int) -> Tuple[str, int, str]:
+    """
+    Stream a request body to a file in UPLOAD_DIR/incoming without holding it in memory,
+    aborting as soon as it exceeds max_bytes. Returns (path, size, sha256); the caller
+    removes the file once it has been ingested.
+    """
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    path = os.path.join(INCOMING_DIR, f"{ulid()}.part")
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"Upload too large (max {max_bytes / (1024 * 1024):.0f}MB)", status_code=413)
+                digest.update(chunk)
+                buffer += chunk
+                if len(buffer) >= WRITE_BUFFER_BYTES:
+                    await f.write(bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await f.write(bytes(buffer))
+    except BaseException:
+        discard_upload(path)
+        raise
+    if size == 0:
+        discard_upload(path)
+        raise UploadError("Upload is empty")
+    return path, size, digest.hexdigest()
+
+
+def discard_upload(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_stale_uploads(max_age_seconds: int = 3600) -> int:
+    """Delete partial uploads left behind by interrupted requests or a crash"""
+    if not os.path.isdir(INCOMING_DIR):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    with os.scandir(INCOMING_DIR) as it:
+        for entry in it:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                discard_upload(entry.path)
+                removed += 1
+    return removed
+
+
+def template_file_for(name: str) -> str:
+    """Configured file for a TEMPLATE_NAMES entry, else <name>.mp4"""
+    return settings.TEMPLATE_NAMES.get(name, f"{name}.mp4")
+
+
+def check_template_upload(name: str, replace: bool = False):
+    """Reject a template upload before its body is read"""
+    validate_upload_name(name)
+    existing = template_registry.get(name)
+    if existing is not None and not existing.missing and not replace:
+        raise UploadError(f"Template '{name}' already exists (pass replace=true to overwrite it)", status_code=409)
+    if not toolchain.current.ffmpeg_available:
+        raise UploadError("ffmpeg is required to normalize templates", status_code=503)
+
+
+async def ingest_template(source_path: str, name: str) -> TemplateInfo:
+    """
+    Validate an uploaded video and transcode it once into the mezzanine format
+    (MEZZANINE_WIDTH x MEZZANINE_HEIGHT, constant fps, short closed GOP, yuv420p, faststart),
+    then publish it to TEMPLATES_DIR and refresh the template registry.
+    """
+    existing = template_registry.get(name)
+    # Checked by signature before any ffmpeg tool reads the file
+    container = await asyncio.to_thread(container_format, source_path)
+    if container not in TEMPLATE_CONTAINERS:
+        raise UploadError("Templates must be MP4, MOV, MKV or WebM files", status_code=415)
+    info = await probe_media(source_path)
+    if info is None:
+        raise UploadError("Not a readable video file", status_code=422)
+    if not info.has_video or not info.width or not info.height:
+        raise UploadError("Upload has no video stream", status_code=422)
+    if not info.duration:
+        raise UploadError("Upload has no duration", status_code=422)
+
+    os.makedirs(settings.TEMPLATES_DIR, exist_ok=True)
+    file = existing.file if existing else template_file_for(name)
+    output_path = os.path.join(settings.TEMPLATES_DIR, file)
+    # A dot-prefixed .tmp name is ignored by the registry until the rename
+    temp_path = os.path.join(settings.TEMPLATES_DIR, f".{file}.{ulid()}.tmp")
+    start = time.perf_counter()
+    try:
+        # Transcoding competes with renders for CPU, so it shares their concurrency limit
+        async with scheduler.stage("render"):
+            await normalize_to_mezzanine(source_path, temp_path, container)
+        os.replace(temp_path, output_path)
+    finally:
+        discard_upload(temp_path)
+    logger.info(
+        f"📥 Template {name}: {info.width}x{info.height} {info.video_codec} @ {info.fps}fps normalized to "
+        f"{settings.MEZZANINE_WIDTH}x{settings.MEZZANINE_HEIGHT} @ {settings.MEZZANINE_FPS}fps in {time.perf_counter() - start:.1f}s"
+    )
+
+    await asyncio.to_thread(template_registry.scan)
+    template = template_registry.get(name)
+    if template is None or not template.available:
+        raise UploadError(f"Normalized template is unusable: {template.error if template else 'not indexed'}", status_code=500)
+    return template
+
+
+def overlay_path(name: str) -> Optional[str]:
+    """Path of an uploaded overlay image, or None if there is none by that name"""
+    if not UPLOAD_NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(settings.OVERLAYS_DIR, f"{name}.png")
+    return path if os.path.exists(path) else None
+
+
+def _overlay_info(path: str) -> Dict[str, object]:
+    with Image.open(path) as image:
+        width, height = image.size
+    return {
+        "name": os.path.splitext(os.path.basename(path))[0],
+        "width": width,
+        "height": height,
+        "size_bytes": os.path.getsize(path),
+    }
+
+
+def list_overlays() -> List[Dict[str, object]]:
+    if not os.path.isdir(settings.OVERLAYS_DIR):
+        return []
+    return [
+        _overlay_info(os.path.join(settings.OVERLAYS_DIR, file))
+        for file in sorted(os.listdir(settings.OVERLAYS_DIR)) if file.endswith(".png")
+    ]
+
+
+def _normalize_image(source_path: str, output_path: str):
+    """Decode, bound to OVERLAY_MAX_SIZE and re-encode as RGBA PNG, the input the overlay filter expects"""
+    try:
+        with Image.open(source_path) as image:
+            image.verify()
+        with Image.open(source_path) as image:
+            image = image.convert("RGBA")
+            image.thumbnail((settings.OVERLAY_MAX_SIZE, settings.OVERLAY_MAX_SIZE), Image.LANCZOS)
+            image.save(output_path, "PNG", optimize=True)
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        raise UploadError("Not a readable image", status_code=422)
+
+
+def check_overlay_upload(name: str, replace: bool = False):
+    """Reject an overlay upload before its body is read"""
+    validate_upload_name(name)
+    if overlay_path(name) and not replace:
+        raise UploadError(f"Overlay '{name}' already exists (pass replace=true to overwrite it)", status_code=409)
+
+
+async def ingest_overlay(source_path: str, name: str) -> Dict[str, object]:
+    """Validate an uploaded image and store it as a normalized PNG in OVERLAYS_DIR"""
+    os.makedirs(settings.OVERLAYS_DIR, exist_ok=True)
+    output_path = os.path.join(settings.OVERLAYS_DIR, f"{name}.png")
+    temp_path = f"{output_path}.{ulid()}.tmp"
+    try:
+        await asyncio.to_thread(_normalize_image, source_path, temp_path)
+        os.replace(temp_path, output_path)
+    finally:
+        discard_upload(temp_path)
+    overlay = _overlay_info(output_path)
+    logger.info(f"📥 Overlay {name}: {overlay['width']}x{overlay['height']} PNG")
+    return overlay
@@ -1,41 +1,369 @@
+import asyncio
 import subprocess
 import os
-from typing import Optional
+import time
+from typing import Callable, List, Optional, Tuple
 import re
-from pydub import AudioSegment
 
-def overlay_image_on_video(template_path: str, image_path: str, output_path: str, position: str = "custom"):
+from config import settings
+from metrics import FFMPEG_DURATION
+from media_info import mp3_audio_frames, probe_media, probe_media_sync
+from toolchain import toolchain
+from captions import cues_from_segments, cues_from_timings, format_srt_time, parse_srt, write_srt
+
+# Called with the number of seconds of output ffmpeg has encoded so far
+ProgressCallback = Callable[[float], None]
+
+
+async def _read_progress(stream: asyncio.StreamReader, on_progress: ProgressCallback):
+    """
+    Parse ffmpeg's -progress key=value output and report the encoded output time.
+    out_time_us and out_time_ms are both in microseconds (the latter is misnamed upstream).
+    """
+    async for raw_line in stream:
+        key, _, value = raw_line.decode("utf-8", errors="replace").strip().partition("=")
+        if key not in ("out_time_us", "out_time_ms"):
+            continue
+        try:
+            seconds = int(value) / 1_000_000
+        except ValueError:
+            continue
+        try:
+            on_progress(max(seconds, 0.0))
+        except Exception:
+            pass  # A broken progress consumer must never fail the render
+
+
+async def _run_command(
+    cmd: List[str],
+    cwd: Optional[str] = None,
+    check: bool = True,
+    capture_output: bool = False,
+    operation: str = "other",
+    on_progress: Optional[ProgressCallback] = None,
+) -> subprocess.CompletedProcess:
+    """
+    Async replacement for subprocess.run so ffmpeg/ffprobe never block the event loop.
+    Raises subprocess.CalledProcessError on a non-zero exit when check is set.
+    The child process is killed if the awaiting task is cancelled.
+    Wall time is recorded in ffmpeg_command_duration_seconds under the given operation.
+    With on_progress, ffmpeg writes machine-readable progress to stdout which is parsed
+    as it arrives (stdout is then not captured).
+    """
+    pipe = asyncio.subprocess.PIPE if capture_output else None
+    stdout_pipe = pipe
+    if on_progress is not None:
+        cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+        stdout_pipe = asyncio.subprocess.PIPE
+    binary = os.path.basename(cmd[0])
+    start = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(*cmd, cwd=cwd, stdout=stdout_pipe, stderr=pipe)
+    except FileNotFoundError:
+        FFMPEG_DURATION.observe(time.perf_counter() - start, binary=binary, operation=operation, outcome="missing")
+        raise
+    try:
+        if on_progress is not None:
+            stdout, stderr = None, None
+            if process.stderr is not None:
+                _, stderr = await asyncio.gather(_read_progress(process.stdout, on_progress), process.stderr.read())
+            else:
+                await _read_progress(process.stdout, on_progress)
+            await process.wait()
+        else:
+            stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        FFMPEG_DURATION.observe(time.perf_counter() - start, binary=binary, operation=operation, outcome="cancelled")
+        raise
+    FFMPEG_DURATION.observe(
+        time.perf_counter() - start, binary=binary, operation=operation,
+        outcome="success" if process.returncode == 0 else "error"
+    )
+    stdout = stdout.decode("utf-8", errors="replace") if stdout is not None else None
+    stderr = stderr.decode("utf-8", errors="replace") if stderr is not None else None
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+async def ffmpeg_available() -> bool:
+    """Check whether ffmpeg can be executed, from the toolchain detected at startup (detecting it first if needed)"""
+    if not toolchain.current.detected:
+        await toolchain.detect()
+    return toolchain.current.ffmpeg_available
+
+
+async def probe_duration(media_path: str) -> Optional[float]:
+    """Return the container duration in seconds, or None if it cannot be read (see media_info)"""
+    info = await probe_media(media_path)
+    return info.duration if info else None
+
+
+async def _probe_video_dimensions(video_path: str):
+    """
+    Return (width, height) of the first video stream.
+    """
+    info = await probe_media(video_path)
+    if info is None or not info.width or not info.height:
+        raise ValueError(f"Could not read video dimensions of {video_path}")
+    return info.width, info.height
+
+
+def _overlay_filter(width: int, height: int, image_label: str = "1:v", video_label: str = "0:v", output_label: str = "v") -> str:
+    """
+    Build the scale + overlay filter graph that places Peter on the template.
+    The image is scaled to 40% of the video, placed at the bottom, slightly left of center.
+    """
+    scale_expr = f"w=iw*min(0.4*{width}/iw\\,0.4*{height}/ih):h=-1"
+    overlay_filter = f"overlay=x=(W-w)/2-0.05*W:y=H-h-0.05*H"
+    return f"[{image_label}]scale={scale_expr}[img];[{video_label}][img]{overlay_filter}[{output_label}]"
+
+
+def resolve_encoding_profile(requested: Optional[str] = None, template_name: Optional[str] = None) -> str:
+    """
+    Pick the encoding profile for a render: the requested one, else the template's
+    configured profile, else DEFAULT_ENCODING_PROFILE. Raises ValueError for unknown names.
+    """
+    profile = requested or settings.TEMPLATE_ENCODING_PROFILES.get(template_name or "") or settings.DEFAULT_ENCODING_PROFILE
+    if profile not in settings.ENCODING_PROFILES:
+        raise ValueError(f"Unknown encoding profile '{profile}'. Available: {', '.join(settings.ENCODING_PROFILES)}")
+    return profile
+
+
+# Constant-quality option of the non-x264 encoders, derived from the profile's x264 CRF
+_QUALITY_ARGS = {
+    "h264_nvenc": lambda crf: ["-preset", "p4", "-rc", "vbr", "-cq", str(crf)],
+    "h264_qsv": lambda crf: ["-global_quality", str(crf)],
+    "h264_videotoolbox": lambda crf: ["-q:v", str(max(1, min(100, 100 - 2 * crf)))],
+    "libopenh264": lambda crf: ["-rc_mode", "quality"],
+    "mpeg4": lambda crf: ["-q:v", str(max(2, min(31, crf // 6)))],
+}
+
+
+def _video_encode_args(profile: Optional[str] = None) -> List[str]:
+    """
+    Video output arguments for a named encoding profile (see config.ENCODING_PROFILES),
+    for the encoder picked by the toolchain (libx264 whenever it is available).
+    """
+    return _encoder_args(settings.ENCODING_PROFILES[resolve_encoding_profile(profile)])
+
+
+def _encoder_args(options: dict) -> List[str]:
+    """Encoder arguments for a profile's options; fixed_gop makes every GOP exactly gop frames long"""
+    encoder = toolchain.current.video_encoder or "libx264"
+    crf = int(options.get("crf", 23))
+    if encoder == "libx264":
+        args = ["-c:v", "libx264", "-preset", str(options.get("preset", "medium")), "-crf", str(crf)]
+        if options.get("tune"):
+            args += ["-tune", str(options["tune"])]
+    else:
+        args = ["-c:v", encoder, *_QUALITY_ARGS.get(encoder, lambda crf: [])(crf)]
+    if options.get("gop"):
+        args += ["-g", str(options["gop"])]
+        if options.get("fixed_gop") and encoder == "libx264":
+            args += ["-keyint_min", str(options["gop"]), "-sc_threshold", "0"]
+    if options.get("pix_fmt"):
+        args += ["-pix_fmt", str(options["pix_fmt"])]
+    args += ["-threads", str(options.get("threads", settings.ENCODING_THREADS))]
+    return args
+
+
+def _audio_encode_args() -> List[str]:
+    return ["-c:a", toolchain.current.audio_encoder or "aac"]
+
+
+def _soft_subtitle_args(subtitles_input: int) -> List[str]:
+    """Map an SRT input as a mov_text subtitle track, for ffmpeg builds without libass"""
+    return ["-map", f"{subtitles_input}:s:0", "-c:s", "mov_text"]
+
+
+# Final renders put the moov atom at the front so players can start before the download finishes
+FASTSTART_ARGS = ["-movflags", "+faststart"]
+
+
+def _trim_args(duration: Optional[float]) -> List[str]:
+    """
+    Input option limiting how much of the next input is read. Placed before a template's
+    -i, only the seconds the narration needs are decoded and encoded.
+    """
+    return ["-t", f"{duration:.3f}"] if duration else []
+
+
+def _subtitles_filter(subtitles_path: str) -> str:
+    """
+    Build the subtitles filter. Uses a relative path (with forward slashes) since
+    absolute Windows paths break ffmpeg's filter argument parsing.
+    Subtitles are placed in the center (bottom center, Alignment=2).
+    """
+    rel_subtitles_path = os.path.relpath(subtitles_path, os.getcwd())
+    subtitles_path_ffmpeg = rel_subtitles_path.replace('\\', '/')
+    return f"subtitles={subtitles_path_ffmpeg}:force_style='Fontsize=24,PrimaryColour=&Hffffff,OutlineColour=&H000000,Outline=2,Alignment=2,MarginV=200,MarginL=0'"
+
+
+async def overlay_image_on_video(template_path: str, image_path: str, output_path: str, position: str = "custom", on_progress: Optional[ProgressCallback] = None, encoding_profile: Optional[str] = None, duration: Optional[float] = None, dimensions: Optional[Tuple[int, int]] = None):
     """
     Overlay an image (PNG) onto a video template using ffmpeg.
     The overlayed image will be 40% of video width, placed at the bottom and slightly left of center.
     This step will NOT include any audio (video only).
+    With duration, only that many seconds of the template are rendered.
     """
-    # Get video dimensions using ffprobe
-    import subprocess, json
-    probe_cmd = [
-        "ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries",
-        "stream=width,height", "-of", "json", template_path
+    width, height = dimensions or await _probe_video_dimensions(template_path)
+    filter_complex = _overlay_filter(width, height)
+    ffmpeg_cmd = [
+        "ffmpeg", "-y",
+        *_trim_args(duration), "-i", template_path,
+        "-i", image_path,
+        "-filter_complex", filter_complex,
+        "-map", "[v]", "-an", *_video_encode_args(encoding_profile), "-shortest", output_path
     ]
-    probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
-    dims = json.loads(probe_result.stdout)
-    width = dims['streams'][0]['width']
-    height = dims['streams'][0]['height']
-    # Scale image to 40% of video width, keep aspect ratio
-    scale_expr = f"w=iw*min(0.4*{width}/iw\\,0.4*{height}/ih):h=-1"
-    # Place Peter at the bottom, slightly right of center
-    overlay_filter = f"overlay=x=(W-w)/2-0.05*W:y=H-h-0.05*H"
-    filter_complex = f"[1:v]scale={scale_expr}[img];[0:v][img]{overlay_filter}[v]"
+    await _run_command(ffmpeg_cmd, operation="overlay", on_progress=on_progress)
+
+
+async def normalize_to_mezzanine(input_path: str, output_path: str, input_format: str):
+    """
+    Transcode an uploaded template into the mezzanine format every render reads from:
+    fixed MEZZANINE_WIDTH x MEZZANINE_HEIGHT (letterboxed), constant MEZZANINE_FPS, yuv420p,
+    and a closed GOP of MEZZANINE_GOP_SECONDS so trimmed renders seek to a nearby keyframe.
+    Audio is dropped since renders only use the narration.
+    The upload is untrusted: it is read with the given demuxer only (see media_info.container_format)
+    and may not open anything but local files, so playlists cannot pull in URLs or other paths.
+    """
+    width, height, fps = settings.MEZZANINE_WIDTH, settings.MEZZANINE_HEIGHT, settings.MEZZANINE_FPS
+    video_filter = (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format=yuv420p"
+    )
+    options = {
+        "preset": "medium",
+        "crf": settings.MEZZANINE_CRF,
+        "gop": max(1, round(fps * settings.MEZZANINE_GOP_SECONDS)),
+        "fixed_gop": True,
+        "pix_fmt": "yuv420p",
+    }
+    ffmpeg_cmd = [
+        "ffmpeg", "-y",
+        "-protocol_whitelist", "file", "-f", input_format,
+        "-i", input_path,
+        "-map", "0:v:0", "-an", "-sn", "-dn",
+        "-vf", video_filter,
+        *_encoder_args(options), *FASTSTART_ARGS,
+        "-f", "mp4", output_path
+    ]
+    await _run_command(ffmpeg_cmd, operation="normalize_template")
+
+
+async def compile_video_single_pass(template_path: str, image_path: str, audio_path: str, subtitles_path: str, output_path: str, on_progress: Optional[ProgressCallback] = None, encoding_profile: Optional[str] = None, duration: Optional[float] = None, dimensions: Optional[Tuple[int, int]] = None):
+    """
+    Render the final video in a single ffmpeg invocation.
+    One filter graph scales and overlays Peter, burns the subtitles, and maps the TTS audio,
+    so the video is encoded once and no intermediate MP4s are written.
+    Pass the narration length as duration so the template is trimmed at the input.
+    Without libass the subtitles are muxed as a soft track instead of burned.
+    subtitles_path must be well-formed SRT (as written by captions.write_srt).
+    """
+    width, height = dimensions or await _probe_video_dimensions(template_path)
+    burn = toolchain.current.burn_subtitles
+    if burn:
+        filter_complex = _overlay_filter(width, height, output_label="ov") + f";[ov]{_subtitles_filter(subtitles_path)}[v]"
+        subtitle_args = []
+    else:
+        filter_complex = _overlay_filter(width, height)
+        subtitle_args = ["-i", os.path.abspath(subtitles_path)]
     ffmpeg_cmd = [
         "ffmpeg", "-y",
-        "-i", template_path,
+        *_trim_args(duration), "-i", template_path,
         "-i", image_path,
+        "-i", audio_path,
+        *subtitle_args,
         "-filter_complex", filter_complex,
-        "-map", "[v]", "-an", "-c:v", "libx264", "-shortest", output_path
+        "-map", "[v]", "-map", "2:a:0", *([] if burn else _soft_subtitle_args(3)),
+        *_video_encode_args(encoding_profile), *_audio_encode_args(), "-shortest", *FASTSTART_ARGS,
+        os.path.abspath(output_path)
+    ]
+    await _run_command(ffmpeg_cmd, cwd=os.getcwd(), operation="single_pass", on_progress=on_progress)
+
+
+async def compile_video_from_base(base_video_path: str, audio_path: str, subtitles_path: str, output_path: str, on_progress: Optional[ProgressCallback] = None, encoding_profile: Optional[str] = None, duration: Optional[float] = None):
+    """
+    Render the final video from a pre-rendered template + Peter base (see render_cache).
+    Only the subtitles are burned and the TTS audio muxed, so the overlay encode is skipped.
+    Pass the narration length as duration so only that much of the base is decoded.
+    Without libass the base is stream-copied and the subtitles muxed as a soft track.
+    subtitles_path must be well-formed SRT (as written by captions.write_srt).
+    """
+    if toolchain.current.burn_subtitles:
+        video_args = ["-vf", _subtitles_filter(subtitles_path), "-map", "0:v:0", "-map", "1:a:0", *_video_encode_args(encoding_profile)]
+        subtitle_args = []
+    else:
+        video_args = ["-map", "0:v:0", "-map", "1:a:0", *_soft_subtitle_args(2), "-c:v", "copy"]
+        subtitle_args = ["-i", os.path.abspath(subtitles_path)]
+    ffmpeg_cmd = [
+        "ffmpeg", "-y",
+        *_trim_args(duration), "-i", os.path.abspath(base_video_path),
+        "-i", os.path.abspath(audio_path),
+        *subtitle_args,
+        *video_args, *_audio_encode_args(), "-shortest", *FASTSTART_ARGS,
+        os.path.abspath(output_path)
     ]
-    subprocess.run(ffmpeg_cmd, check=True)
+    await _run_command(ffmpeg_cmd, cwd=os.getcwd(), operation="from_base", on_progress=on_progress)
+
+
+def join_mp3_frames(audio_paths: List[str], output_path: str):
+    """
+    Join MP3 files encoded with the same settings by concatenating their audio frames,
+    dropping ID3 tags and Xing/Info header frames (whose frame counts would be wrong).
+    Used when ffmpeg is not installed.
+    """
+    spans = []
+    for audio_path in audio_paths:
+        span = mp3_audio_frames(audio_path)
+        if span is None:
+            raise ValueError(f"Not an MP3 file: {audio_path}")
+        spans.append((audio_path, span))
+    temp_path = f"{output_path}.part"
+    try:
+        with open(temp_path, "wb") as out:
+            for audio_path, (start, end) in spans:
+                with open(audio_path, "rb") as f:
+                    f.seek(start)
+                    out.write(f.read(end - start))
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+async def concat_audio_files(audio_paths: List[str], output_path: str):
+    """
+    Losslessly join audio files (same codec and format) using ffmpeg's concat demuxer.
+    Streams are copied, so there is no re-encode and no quality loss.
+    Without ffmpeg, MP3s are joined frame by frame instead.
+    """
+    if not toolchain.current.ffmpeg_available and all(path.lower().endswith(".mp3") for path in audio_paths):
+        await asyncio.to_thread(join_mp3_frames, audio_paths, output_path)
+        return
+    list_path = f"{output_path}.concat.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for audio_path in audio_paths:
+            escaped = os.path.abspath(audio_path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        ffmpeg_cmd = [
+            "ffmpeg", "-y",
+            "-f", "concat", "-safe", "0",
+            "-i", list_path,
+            "-c", "copy",
+            output_path
+        ]
+        await _run_command(ffmpeg_cmd, operation="concat_audio")
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
 
 
-def merge_audio_with_video(video_path: str, audio_path: str, output_path: str):
+async def merge_audio_with_video(video_path: str, audio_path: str, output_path: str, on_progress: Optional[ProgressCallback] = None):
     """
     Merge audio with video using ffmpeg (video from overlay, audio ONLY from TTS, trims to shortest).
     After merging, check if the output video has an audio stream. Print a warning if not.
@@ -44,21 +372,17 @@ def merge_audio_with_video(video_path: str, audio_path: str, output_path: str):
         "ffmpeg", "-y",
         "-i", video_path,
         "-i", audio_path,
-        "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", "aac", "-shortest",
+        "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", *_audio_encode_args(), "-shortest",
         output_path
     ]
-    subprocess.run(ffmpeg_cmd, check=True)
+    await _run_command(ffmpeg_cmd, operation="merge_audio", on_progress=on_progress)
 
     # Check if output video has audio stream
-    import json
-    probe_cmd = [
-        "ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries",
-        "stream=index", "-of", "json", output_path
-    ]
-    probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
     try:
-        info = json.loads(probe_result.stdout)
-        if not info.get('streams'):
+        info = await probe_media(output_path)
+        if info is None:
+            raise ValueError("unreadable output")
+        if not info.has_audio:
             print(f"⚠️ Warning: No audio stream found in {output_path} after merging!")
         else:
             print(f"✅ Audio stream present in {output_path} after merging.")
@@ -66,46 +390,40 @@ def merge_audio_with_video(video_path: str, audio_path: str, output_path: str):
         print(f"⚠️ Could not verify audio stream in {output_path}: {e}")
 
 
-def burn_subtitles_on_video(video_path: str, subtitles_path: str, output_path: str, audio_path: Optional[str] = None):
+async def burn_subtitles_on_video(video_path: str, subtitles_path: str, output_path: str, audio_path: Optional[str] = None, on_progress: Optional[ProgressCallback] = None, encoding_profile: Optional[str] = None, validate: bool = True):
     """
-    Burn subtitles (SRT) onto a video using ffmpeg. Uses relative path for subtitles (with forward slashes) to match working PowerShell command. If subtitles are missing or invalid, copy video and audio as-is. Automatically validates and fixes the SRT file before burning.
+    Burn subtitles (SRT) onto a video using ffmpeg. Uses relative path for subtitles (with forward slashes) to match working PowerShell command. If subtitles are missing or invalid, copy video and audio as-is. Automatically validates and fixes the SRT file before burning, unless validate is False (SRTs written by captions are already valid).
     After burning, check if the output video has an audio stream. If not, and audio_path is provided, re-merge the audio.
     Subtitles are placed in the center (bottom center, Alignment=2).
     """
-    import os
-    import subprocess
-    import json    # Validate and fix SRT before burning
-    validate_and_fix_srt(subtitles_path)
-    # Use current working directory instead of hardcoded path
+    # Validate and fix SRT before burning
+    if validate:
+        validate_and_fix_srt(subtitles_path)
     cwd = os.getcwd()
-    rel_subtitles_path = os.path.relpath(subtitles_path, cwd)
-    subtitles_path_ffmpeg = rel_subtitles_path.replace('\\', '/')    # Place subtitles at the center of video screen using simple, reliable styling
-    # Using basic subtitle filter without complex force_style that might fail
-    filter_arg = f"subtitles={subtitles_path_ffmpeg}:force_style='Fontsize=24,PrimaryColour=&Hffffff,OutlineColour=&H000000,Outline=2,Alignment=2,MarginV=200,MarginL=0'"
     video_path = os.path.abspath(video_path)
     output_path = os.path.abspath(output_path)
+    if toolchain.current.burn_subtitles:
+        video_args = ["-vf", _subtitles_filter(subtitles_path), "-map", "0:v:0", "-map", "0:a:0", *_video_encode_args(encoding_profile)]
+    else:
+        # No libass: keep the video as-is and add the subtitles as a soft track
+        video_args = ["-i", os.path.abspath(subtitles_path), "-map", "0:v:0", "-map", "0:a:0", *_soft_subtitle_args(1), "-c:v", "copy"]
     ffmpeg_cmd = [
         "ffmpeg", "-y",
         "-i", video_path,
-        "-vf", filter_arg,
-        "-map", "0:v:0",
-        "-map", "0:a:0",
-        "-c:v", "libx264",
-        "-c:a", "aac",
+        *video_args,
+        *_audio_encode_args(),
         "-shortest",
+        *FASTSTART_ARGS,
         output_path
     ]
-    subprocess.run(ffmpeg_cmd, check=True, cwd=cwd)
+    await _run_command(ffmpeg_cmd, cwd=cwd, operation="burn_subtitles", on_progress=on_progress)
 
     # Check if output video has audio stream
-    probe_cmd = [
-        "ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries",
-        "stream=index", "-of", "json", output_path
-    ]
-    probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
     try:
-        info = json.loads(probe_result.stdout)
-        if not info.get('streams'):
+        info = await probe_media(output_path)
+        if info is None:
+            raise ValueError("unreadable output")
+        if not info.has_audio:
             print(f"⚠️ Warning: No audio stream found in {output_path} after burning subtitles!")
             # If audio_path is provided, re-merge audio
             if audio_path:
@@ -115,10 +433,10 @@ def burn_subtitles_on_video(video_path: str, subtitles_path: str, output_path: s
                     "ffmpeg", "-y",
                     "-i", output_path,
                     "-i", audio_path,
-                    "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", "aac", "-shortest",
+                    "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", *_audio_encode_args(), "-shortest", *FASTSTART_ARGS,
                     temp_path
                 ]
-                subprocess.run(ffmpeg_cmd, check=True)
+                await _run_command(ffmpeg_cmd, operation="remerge_audio")
                 os.replace(temp_path, output_path)
                 print(f"✅ Audio restored in {output_path}.")
         else:
@@ -127,161 +445,46 @@ def burn_subtitles_on_video(video_path: str, subtitles_path: str, output_path: s
         print(f"⚠️ Could not verify audio stream in {output_path}: {e}")
 
 
+def _read_transcript(txt_path: str) -> str:
+    with open(txt_path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
 def transcript_txt_to_srt(txt_path: str, srt_path: str, duration_per_line: float = 3.0):
     """
-    Convert a plain text transcript to a proper SRT file (each chunk = one subtitle, fixed duration).
-    Ensures correct SRT timestamp format (00:00:00,000), blank lines, and short lines for ffmpeg compatibility.
+    Convert a plain text transcript to a proper SRT file (each chunk of ~8 words = one subtitle, fixed duration).
+    The pipeline builds cues from the script segments directly (see captions.cues_from_segments).
     """
-    import textwrap
-    with open(txt_path, "r", encoding="utf-8") as f:
-        text = f.read().strip()
-    # Split into chunks of ~8 words for each subtitle
-    words = text.split()
-    chunk_size = 8
-    lines = [" ".join(words[i:i+chunk_size]) for i in range(0, len(words), chunk_size)]
-    with open(srt_path, "w", encoding="utf-8") as f:
-        for idx, line in enumerate(lines):
-            start = idx * duration_per_line
-            end = (idx + 1) * duration_per_line
-            start_h = int(start // 3600)
-            start_m = int((start % 3600) // 60)
-            start_s = int(start % 60)
-            start_ms = int((start - int(start)) * 1000)
-            end_h = int(end // 3600)
-            end_m = int((end % 3600) // 60)
-            end_s = int(end % 60)
-            end_ms = int((end - int(end)) * 1000)
-            f.write(f"{idx+1}\n")
-            f.write(f"{start_h:02}:{start_m:02}:{start_s:02},{start_ms:03} --> {end_h:02}:{end_m:02}:{end_s:02},{end_ms:03}\n")
-            # Wrap line to max 40 chars per line for SRT
-            for wrapped in textwrap.wrap(line, width=40):
-                f.write(f"{wrapped}\n")
-            f.write("\n")
+    write_srt(cues_from_segments([_read_transcript(txt_path)], seconds_per_cue=duration_per_line), srt_path)
 
 def transcript_txt_to_word_srt(txt_path: str, srt_path: str, duration_per_word: float = 0.5):
     """
     Convert a plain text transcript to a word-by-word SRT file (each word = one subtitle, fixed duration per word).
-    Ensures correct SRT timestamp format (00:00:00,000), blank lines, and short lines for ffmpeg compatibility.
     """
-    with open(txt_path, "r", encoding="utf-8") as f:
-        text = f.read().strip()
-    words = text.split()
-    with open(srt_path, "w", encoding="utf-8") as f:
-        for idx, word in enumerate(words):
-            start = idx * duration_per_word
-            end = (idx + 1) * duration_per_word
-            start_h = int(start // 3600)
-            start_m = int((start % 3600) // 60)
-            start_s = int(start % 60)
-            start_ms = int((start - int(start)) * 1000)
-            end_h = int(end // 3600)
-            end_m = int((end % 3600) // 60)
-            end_s = int(end % 60)
-            end_ms = int((end - int(end)) * 1000)
-            f.write(f"{idx+1}\n")
-            f.write(f"{start_h:02}:{start_m:02}:{start_s:02},{start_ms:03} --> {end_h:02}:{end_m:02}:{end_s:02},{end_ms:03}\n")
-            f.write(f"{word}\n\n")
-
-def transcript_txt_to_word_srt_synced(txt_path: str, srt_path: str, audio_path: str):
+    write_srt(cues_from_segments([_read_transcript(txt_path)], words_per_cue=1, seconds_per_cue=duration_per_word), srt_path)
+
+async def transcript_txt_to_word_srt_synced(txt_path: str, srt_path: str, audio_path: str):
     """
     Convert a plain text transcript to a word-by-word SRT file synchronized with audio duration.
     Gets actual audio duration and distributes words evenly across that time.
     """
-    import subprocess
-    import json
-    
-    # Get audio duration using ffprobe
-    probe_cmd = [
-        "ffprobe", "-v", "error", "-show_entries", "format=duration",
-        "-of", "json", audio_path
-    ]
-    probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
-    audio_info = json.loads(probe_result.stdout)
-    audio_duration = float(audio_info['format']['duration'])
-    
-    with open(txt_path, "r", encoding="utf-8") as f:
-        text = f.read().strip()
-    words = text.split()
-    
-    # Calculate duration per word based on actual audio length
-    duration_per_word = audio_duration / len(words) if len(words) > 0 else 0.5
-    
-    with open(srt_path, "w", encoding="utf-8") as f:
-        for idx, word in enumerate(words):
-            start = idx * duration_per_word
-            end = (idx + 1) * duration_per_word
-            start_h = int(start // 3600)
-            start_m = int((start % 3600) // 60)
-            start_s = int(start % 60)
-            start_ms = int((start - int(start)) * 1000)
-            end_h = int(end // 3600)
-            end_m = int((end % 3600) // 60)
-            end_s = int(end % 60)
-            end_ms = int((end - int(end)) * 1000)
-            f.write(f"{idx+1}\n")
-            f.write(f"{start_h:02}:{start_m:02}:{start_s:02},{start_ms:03} --> {end_h:02}:{end_m:02}:{end_s:02},{end_ms:03}\n")
-            f.write(f"{word}\n\n")
-
-def transcript_txt_to_natural_srt_synced(txt_path: str, srt_path: str, audio_path: str):
+    audio_duration = await probe_duration(audio_path)
+    if audio_duration is None:
+        raise ValueError(f"Could not read the duration of {audio_path}")
+    cues = cues_from_segments([_read_transcript(txt_path)], duration=audio_duration, words_per_cue=1, weight_by_length=False)
+    write_srt(cues, srt_path)
+
+async def transcript_txt_to_natural_srt_synced(txt_path: str, srt_path: str, audio_path: str):
     """
     Convert a plain text transcript to an SRT file synchronized with audio duration.
-    Creates natural phrase timing that matches the actual audio.
-    """
-    import subprocess
-    import json
-    import re
-    
-    # Get audio duration using ffprobe
-    probe_cmd = [
-        "ffprobe", "-v", "error", "-show_entries", "format=duration",
-        "-of", "json", audio_path
-    ]
-    probe_result = subprocess.run(probe_cmd, capture_output=True, text=True)
-    audio_info = json.loads(probe_result.stdout)
-    audio_duration = float(audio_info['format']['duration'])
-    
-    with open(txt_path, "r", encoding="utf-8") as f:
-        text = f.read().strip()
-    
-    # Split text into sentences first
-    sentences = re.split(r'[.!?]+', text)
-    clean_sentences = [s.strip() for s in sentences if s.strip()]
-    
-    # Create subtitle chunks - group sentences into 2-3 word chunks for better reading
-    chunks = []
-    for sentence in clean_sentences:
-        words = sentence.split()
-        # Group words into chunks of 2-4 words for natural reading
-        for i in range(0, len(words), 3):
-            chunk = ' '.join(words[i:i+3])
-            if chunk:
-                chunks.append(chunk)
-    
-    if not chunks:
-        return
-    
-    # Calculate timing - distribute evenly across audio duration
-    time_per_chunk = audio_duration / len(chunks)
-    
-    with open(srt_path, "w", encoding="utf-8") as f:
-        for idx, chunk in enumerate(chunks):
-            start_time = idx * time_per_chunk
-            end_time = min((idx + 1) * time_per_chunk, audio_duration)
-            
-            # Format timestamps
-            start_h = int(start_time // 3600)
-            start_m = int((start_time % 3600) // 60)
-            start_s = int(start_time % 60)
-            start_ms = int((start_time - int(start_time)) * 1000)
-            
-            end_h = int(end_time // 3600)
-            end_m = int((end_time % 3600) // 60)
-            end_s = int(end_time % 60)
-            end_ms = int((end_time - int(end_time)) * 1000)
-            
-            f.write(f"{idx+1}\n")
-            f.write(f"{start_h:02}:{start_m:02}:{start_s:02},{start_ms:03} --> {end_h:02}:{end_m:02}:{end_s:02},{end_ms:03}\n")
-            f.write(f"{chunk}\n\n")
+    Creates natural phrase timing (3-word chunks within each sentence) that matches the actual audio.
+    """
+    audio_duration = await probe_duration(audio_path)
+    if audio_duration is None:
+        raise ValueError(f"Could not read the duration of {audio_path}")
+    sentences = re.split(r'[.!?]+', _read_transcript(txt_path))
+    cues = cues_from_segments(sentences, duration=audio_duration, words_per_cue=3, weight_by_length=False)
+    if len(cues):
+        write_srt(cues, srt_path)
 
 def validate_and_fix_srt(srt_path: str):
     """
@@ -291,58 +494,25 @@ def validate_and_fix_srt(srt_path: str):
     - Ensures blank lines between blocks
     - Removes empty or malformed blocks
     - Wraps lines to max 40 chars
+    Only needed for SRT files from elsewhere; captions.write_srt output is already valid.
     """
-    import textwrap
     with open(srt_path, 'r', encoding='utf-8') as f:
         content = f.read()
-    # Split into blocks by double newlines
-    blocks = re.split(r'\n{2,}', content.strip())
-    fixed_blocks = []
-    idx = 1
-    for block in blocks:
-        lines = block.strip().splitlines()
-        if len(lines) < 2:
-            continue
-        # Fix numbering
-        number = str(idx)
-        # Fix timestamp line
-        ts_line = lines[1] if len(lines) > 1 else ''
-        ts_line = re.sub(r'(\d{2}:\d{2}:\d{2})[.,](\d{3})', r'\1,\2', ts_line)
-        # Validate timestamp
-        if not re.match(r'\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}', ts_line):
-            continue
-        # Wrap text lines
-        text_lines = []
-        for l in lines[2:]:
-            text_lines.extend(textwrap.wrap(l, width=40))
-        if not text_lines:
-            continue
-        fixed_block = f"{number}\n{ts_line}\n" + "\n".join(text_lines)
-        fixed_blocks.append(fixed_block)
-        idx += 1
-    # Write back as UTF-8 without BOM
-    with open(srt_path, 'w', encoding='utf-8') as f:
-        # Remove BOM if present
-        content_to_write = "\n\n".join(fixed_blocks) + "\n"
-        if content_to_write.startswith('\ufeff'):
-            content_to_write = content_to_write.lstrip('\ufeff')
-        f.write(content_to_write)
-
-def generate_video_with_subtitles(template_path: str, image_path: str, audio_path: str, subtitles_txt_path: str, output_path: str):
+    write_srt(parse_srt(content), srt_path)
+
+async def generate_video_with_subtitles(template_path: str, image_path: str, audio_path: str, subtitles_txt_path: str, output_path: str):
     """
     Full pipeline: overlay Peter Griffin, merge audio, generate SRT, burn subtitles, output to final_video.mp4.
     """
-    import os
-    from .video_compiler import overlay_image_on_video, merge_audio_with_video, transcript_txt_to_srt, burn_subtitles_on_video
     temp_overlay = output_path.replace('.mp4', '_overlay.mp4')
     temp_audio = output_path.replace('.mp4', '_audio.mp4')
     temp_srt = subtitles_txt_path.replace('.txt', '.srt')
 
-    overlay_image_on_video(template_path, image_path, temp_overlay)
-    merge_audio_with_video(temp_overlay, audio_path, temp_audio)
+    await overlay_image_on_video(template_path, image_path, temp_overlay, duration=await probe_duration(audio_path))
+    await merge_audio_with_video(temp_overlay, audio_path, temp_audio)
     transcript_txt_to_word_srt(subtitles_txt_path, temp_srt)
     # Burn subtitles directly into final_video.mp4
-    burn_subtitles_on_video(temp_audio, temp_srt, output_path, audio_path=audio_path)
+    await burn_subtitles_on_video(temp_audio, temp_srt, output_path, audio_path=audio_path)
     # Clean up temp files if desired
     # for f in [temp_overlay, temp_audio, temp_srt]:
     #     if os.path.exists(f):
@@ -351,44 +521,26 @@ def generate_video_with_subtitles(template_path: str, image_path: str, audio_pat
 def generate_subtitles(audio_path, output_path):
     """Generate subtitles from audio with word-by-word timing"""
     try:
-        # Load audio file
-        audio = AudioSegment.from_file(audio_path)
-        duration = len(audio) / 1000.0  # Convert to seconds
+        # Read the length from the file headers instead of decoding the whole file
+        info = probe_media_sync(audio_path)
+        if info is None:
+            raise ValueError(f"Could not read audio file {audio_path}")
+        duration = info.duration
         
         # Example text - replace this with your actual text
         text = "This is a test subtitle that will appear word by word."
-        words = text.split()
-        
-        # Calculate timing for each word
-        words_with_timing = []
-        current_time = 0
         
-        for i, word in enumerate(words):
-            # Calculate word duration based on length
-            word_duration = len(word) * 0.1  # 100ms per character
-            word_duration = max(0.3, min(word_duration, 0.8))  # Keep between 300ms and 800ms
-            
-            # Add extra pause after full stops
+        # Word duration follows its length: 100ms per character, kept between 300ms and 800ms,
+        # plus a 500ms pause after full stops
+        timings = []
+        for word in text.split():
+            word_duration = max(0.3, min(len(word) * 0.1, 0.8))
             if word.endswith('.'):
-                word_duration += 0.5  # Add 500ms pause after full stop
-            
-            words_with_timing.append({
-                "start": current_time,
-                "end": current_time + word_duration,
-                "text": word
-            })
-            current_time += word_duration
+                word_duration += 0.5
+            # ASS override tag for better positioning
+            timings.append((word_duration, f"{{\\an8\\pos(960,540)\\fs24}}{word}"))
         
-        # Write subtitles in SRT format with improved positioning
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for i, word in enumerate(words_with_timing, 1):
-                start_time = format_time(word["start"])
-                end_time = format_time(word["end"])
-                
-                f.write(f"{i}\n")
-                f.write(f"{start_time} --> {end_time}\n")
-                # Add ASS styling for better positioning
-                f.write(f"{{\\an8\\pos(960,540)\\fs24}}{word['text']}\n\n")
+        write_srt(cues_from_timings(timings), output_path)
         
         return True
     except Exception as e:
@@ -397,11 +549,7 @@ def generate_subtitles(audio_path, output_path):
 
 def format_time(seconds):
     """Convert seconds to SRT time format (HH:MM:SS,mmm)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = seconds % 60
-    milliseconds = int((seconds - int(seconds)) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{int(seconds):02d},{milliseconds:03d}"
+    return format_srt_time(seconds)
 
 if __name__ == "__main__":    
     # Use correct paths relative to the backend directory
@@ -414,8 +562,8 @@ if __name__ == "__main__":
     final_video = "outputs/final_video.mp4"
     final_video_with_subs = "outputs/final_video_with_subs.mp4"
 
-    overlay_image_on_video(template, image, overlayed, position="middle")
-    merge_audio_with_video(overlayed, audio, final_video)
-    transcript_txt_to_natural_srt_synced(subtitles_txt, subtitles_srt, audio)
-    burn_subtitles_on_video(final_video, subtitles_srt, final_video_with_subs)
+    asyncio.run(overlay_image_on_video(template, image, overlayed, position="middle"))
+    asyncio.run(merge_audio_with_video(overlayed, audio, final_video))
+    asyncio.run(transcript_txt_to_natural_srt_synced(subtitles_txt, subtitles_srt, audio))
+    asyncio.run(burn_subtitles_on_video(final_video, subtitles_srt, final_video_with_subs))
     print(f"✅ Final video with subtitles saved as {final_video_with_subs}")
@@ -1,10 +1,10 @@
 'use client';
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { ChevronLeft, ChevronRight, Copy, Share2, Wifi, WifiOff } from 'lucide-react';
 import TemplateSelector from './TemplateSelector';
 import VideoResult from './VideoResult';
-import { generateVideoWithBackend, getBackendStatus, checkVideoStatus, getVideoDownloadUrl } from '@/lib/api';
+import { generateVideoWithBackend, newIdempotencyKey, getBackendStatus, checkVideoStatus, getVideoDownloadUrl, subscribeToVideoStatus, StatusResponse } from '@/lib/api';
 import { HeroSection } from './HeroSection';
 import { cn } from '@/lib/utils';
 
@@ -24,42 +24,55 @@ const VideoGenerator = () => {
   const [generatedVideo, setGeneratedVideo] = useState<GeneratedVideo | null>(null);
   const [backendConnected, setBackendConnected] = useState<boolean | null>(null);
   const [statusMessage, setStatusMessage] = useState<string>('');
+  // Idempotency-Key of the current generate action; resubmitting the same request reuses it
+  const idempotencyRef = useRef<{ request: string; key?: string } | null>(null);
 
   // Check backend status on component mount
   useEffect(() => {
     checkBackendConnection();
   }, []);
 
-  // Poll for video status if video is processing
+  // Follow video status while processing: pushed over SSE, polling only as a fallback
+  const videoId = generatedVideo?.id;
+  const isProcessing = generatedVideo?.status === 'processing';
+
   useEffect(() => {
-    let interval: NodeJS.Timeout;
-    
-    if (generatedVideo && generatedVideo.status === 'processing') {
+    if (!videoId || !isProcessing) return;
+
+    let interval: NodeJS.Timeout | undefined;
+
+    const applyStatus = (status: StatusResponse) => {
+      const eta = status.estimated_remaining ? ` (~${status.estimated_remaining}s left)` : '';
+      setStatusMessage(status.message ? `${status.message}${eta}` : '');
+
+      if (status.status === 'completed') {
+        setGeneratedVideo(prev => prev ? {
+          ...prev,
+          status: 'completed',
+          videoUrl: getVideoDownloadUrl(prev.id)
+        } : null);
+      } else if (status.status === 'failed') {
+        setGeneratedVideo(prev => prev ? {
+          ...prev,
+          status: 'failed'
+        } : null);
+      }
+    };
+
+    const startPolling = () => {
       interval = setInterval(async () => {
-        const status = await checkVideoStatus(generatedVideo.id);
-        if (status) {
-          setStatusMessage(status.message || '');
-          
-          if (status.status === 'completed') {
-            setGeneratedVideo(prev => prev ? {
-              ...prev,
-              status: 'completed',
-              videoUrl: getVideoDownloadUrl(prev.id)
-            } : null);
-          } else if (status.status === 'failed') {
-            setGeneratedVideo(prev => prev ? {
-              ...prev,
-              status: 'failed'
-            } : null);
-          }
-        }
+        const status = await checkVideoStatus(videoId);
+        if (status) applyStatus(status);
       }, 3000); // Check every 3 seconds
-    }
-    
+    };
+
+    const unsubscribe = subscribeToVideoStatus(videoId, applyStatus, startPolling);
+
     return () => {
+      unsubscribe();
       if (interval) clearInterval(interval);
     };
-  }, [generatedVideo]);
+  }, [videoId, isProcessing]);
 
   const checkBackendConnection = async () => {
     const status = await getBackendStatus();
@@ -72,8 +85,13 @@ const VideoGenerator = () => {
     setIsGenerating(true);
     setStatusMessage('Starting video generation...');
     
+    const request = JSON.stringify([prompt, selectedTemplate]);
+    const previous = idempotencyRef.current;
+    const action = previous && previous.request === request ? previous : { request, key: newIdempotencyKey() };
+    idempotencyRef.current = action;
+    
     try {
-      const video = await generateVideoWithBackend(prompt, selectedTemplate);
+      const video = await generateVideoWithBackend(prompt, selectedTemplate, action.key);
       setGeneratedVideo(video);
       setCurrentStep('result');
       
@@ -89,6 +107,8 @@ const VideoGenerator = () => {
   };
 
   const handleBackToInput = () => {
+    // Generating again from the input step is a new action
+    idempotencyRef.current = null;
     setCurrentStep('input');
     setGeneratedVideo(null);
     setPrompt('');
@@ -39,6 +39,9 @@ export interface ApiResponse<T> {
   success: boolean;
   data?: T;
   error?: string;
+  // Set when the server answered with an error; absent for network failures
+  status?: number;
+  retryAfter?: string | null;
 }
 
 class ApiService {
@@ -48,15 +51,21 @@ class ApiService {
   ): Promise<ApiResponse<T>> {
     try {
       const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+        ...options,
         headers: {
           'Content-Type': 'application/json',
           ...options.headers,
         },
-        ...options,
       });
 
       if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
+        console.error('API request failed:', response.status, endpoint);
+        return {
+          success: false,
+          error: `HTTP error! status: ${response.status}`,
+          status: response.status,
+          retryAfter: response.headers.get('Retry-After'),
+        };
       }
 
       const data = await response.json();
@@ -77,9 +86,12 @@ class ApiService {
     });
   }
 
-  async generateVideo(request: VideoRequest): Promise<ApiResponse<any>> {
+  // Pass the same idempotencyKey when retrying so the backend returns the
+  // existing job instead of starting a second render
+  async generateVideo(request: VideoRequest, idempotencyKey?: string): Promise<ApiResponse<any>> {
     return this.request('/api/generate-video', {
       method: 'POST',
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined,
       body: JSON.stringify(request),
     });
   }
@@ -125,8 +137,35 @@ export const getVideoDownloadUrl = (videoId: string): string => {
   return `${API_BASE_URL}/api/video/${videoId}/download`;
 };
 
+// Create one key per user action and pass it to every attempt of that action
+export const newIdempotencyKey = (): string | undefined =>
+  typeof crypto !== 'undefined' && 'randomUUID' in crypto ? crypto.randomUUID() : undefined;
+
+const GENERATE_ATTEMPTS = 3;
+const GENERATE_RETRY_DELAY_MS = 1000;
+// A longer Retry-After gives up instead of keeping the user waiting
+const GENERATE_MAX_RETRY_DELAY_MS = 30000;
+
+// Network errors, rate limiting and server errors may succeed later; other 4xx
+// (validation, idempotency conflicts) fail the same way every time
+const isRetryable = (result: ApiResponse<unknown>): boolean =>
+  result.status === undefined || result.status === 429 || result.status >= 500;
+
+// Retry-After is either delay-seconds or an HTTP date
+const retryDelayMs = (retryAfter?: string | null): number => {
+  if (!retryAfter) return GENERATE_RETRY_DELAY_MS;
+  const seconds = Number(retryAfter);
+  if (Number.isFinite(seconds)) return Math.max(0, seconds * 1000);
+  const date = Date.parse(retryAfter);
+  return Number.isNaN(date) ? GENERATE_RETRY_DELAY_MS : Math.max(0, date - Date.now());
+};
+
 // Enhanced video generation function that tries backend first, falls back to mock
-export const generateVideoWithBackend = async (prompt: string, templateId?: number): Promise<GeneratedVideo> => {
+export const generateVideoWithBackend = async (
+  prompt: string,
+  templateId?: number,
+  idempotencyKey: string | undefined = newIdempotencyKey()
+): Promise<GeneratedVideo> => {
   try {
     // First, check if backend is available
     const backendAvailable = await apiService.checkBackendAvailable();
@@ -134,11 +173,15 @@ export const generateVideoWithBackend = async (prompt: string, templateId?: numb
     if (backendAvailable) {
       console.log('🚀 Using real backend for video generation');
       
-      // Start video generation process directly (this includes script generation)
-      const videoResult = await apiService.generateVideo({ 
-        prompt, 
-        template_id: templateId || 1 
-      });
+      // Start video generation process directly (this includes script generation).
+      // Retries send the same key, so a request that did reach the backend is not rendered twice.
+      let videoResult = await apiService.generateVideo({ prompt, template_id: templateId || 1 }, idempotencyKey);
+      for (let attempt = 2; attempt <= GENERATE_ATTEMPTS && !videoResult.success && isRetryable(videoResult); attempt++) {
+        const delay = retryDelayMs(videoResult.retryAfter);
+        if (delay > GENERATE_MAX_RETRY_DELAY_MS) break;
+        await new Promise(resolve => setTimeout(resolve, delay));
+        videoResult = await apiService.generateVideo({ prompt, template_id: templateId || 1 }, idempotencyKey);
+      }
       
       if (videoResult.success && videoResult.data) {
         const { video_id, message } = videoResult.data;
@@ -190,6 +233,42 @@ export const checkVideoStatus = async (videoId: string): Promise<StatusResponse
   }
 };
 
+// Push-based status updates over Server-Sent Events. Returns an unsubscribe function.
+// onError is called if the stream cannot be used, so callers can fall back to polling.
+export const subscribeToVideoStatus = (
+  videoId: string,
+  onStatus: (status: StatusResponse) => void,
+  onError?: () => void
+): (() => void) => {
+  if (typeof window === 'undefined' || typeof EventSource === 'undefined') {
+    onError?.();
+    return () => {};
+  }
+
+  const source = new EventSource(`${API_BASE_URL}/api/video/${videoId}/events`);
+  let receivedStatus = false;
+
+  source.addEventListener('status', (event) => {
+    receivedStatus = true;
+    const status: StatusResponse = JSON.parse((event as MessageEvent).data);
+    onStatus(status);
+    if (status.status === 'completed' || status.status === 'failed') {
+      source.close();
+    }
+  });
+
+  source.onerror = () => {
+    // EventSource reconnects on its own once a stream was established;
+    // if it never worked (e.g. backend offline), give up and let the caller poll.
+    if (!receivedStatus) {
+      source.close();
+      onError?.();
+    }
+  };
+
+  return () => source.close();
+};
+
 // Mock data for development (when backend is not connected)
 export const mockGenerateVideo = async (prompt: string): Promise<GeneratedVideo> => {
   // Simulate API delay